@@ -0,0 +1,47 @@
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from text_analyzer import analyze_chunks
+
+
+class AnalysisWorker(QObject):
+    """
+    Runs the chunked analysis of a text outside the GUI thread.
+    The results of each chunk are emitted as soon as they are ready, so the document can be reviewed while the rest
+    of the text is still being analyzed. The analysis stops after the current chunk once cancel() is called.
+    """
+
+    chunkAnalyzed = pyqtSignal(int, int, list)  # Chunks done, total chunks, results of the last chunk
+    failed = pyqtSignal(str)  # Error message
+    finished = pyqtSignal(bool)  # True if the analysis was cancelled before the end
+
+    def __init__(self, chunks, nlp, lexiconIndex, analysisCache=None, parent=None):
+        super().__init__(parent)
+        self.chunks = chunks
+        self.nlp = nlp
+        self.lexiconIndex = lexiconIndex
+        self.analysisCache = analysisCache
+        # An event rather than a slot, since cancel() is called from the GUI thread while run() blocks this one
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def isCancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        total = len(self.chunks)
+        chunkResults = analyze_chunks(self.chunks, self.nlp, self.lexiconIndex, analysis_cache=self.analysisCache)
+        try:
+            for done, (_, _, results) in enumerate(chunkResults, start=1):
+                if self.isCancelled():
+                    break
+                self.chunkAnalyzed.emit(done, total, results)
+        except Exception as e:
+            print(e)
+            self.failed.emit(str(e))
+        finally:
+            chunkResults.close()  # Also stops the spaCy worker processes when the analysis is cancelled
+        self.finished.emit(self.isCancelled())
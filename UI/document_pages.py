@@ -0,0 +1,168 @@
+from bisect import bisect_right
+
+from PyQt5.QtCore import QObject, QFile, QIODevice, pyqtSignal, pyqtSlot
+from PyQt5.QtWebChannel import QWebChannel
+from PyQt5.QtWebEngineWidgets import QWebEngineScript
+
+from settings import formatHTMLPage
+from text_analyzer import split_text_into_chunks
+
+"""
+document_pages.py
+
+This module splits the document shown by the review window into pages, so the web view only holds the pages around the
+word being reviewed. The HTML loaded at first is a list of empty placeholders, one per page, sized after an estimate of
+their content; pages are rendered when the user navigates to them or scrolls them into view, and unloaded again when
+they are far from both. The size of the HTML and of the DOM stays the same whatever the size of the document.
+"""
+
+# Estimated size of the text, used to give the placeholders of the pages not loaded yet a plausible height
+ESTIMATED_LINE_HEIGHT = 20  # Pixels
+ESTIMATED_LINE_LENGTH = 120  # Characters
+
+# The API Python drives the view with, and the observer asking Python for the pages scrolled to. Python sends every
+# change made during an event loop iteration to applyUpdates() as one list, see DocumentWindow.queueUpdate()
+PAGES_SCRIPT = """
+function setPage(index, html) {
+    var page = document.getElementById('page-' + index);
+    if (page) {
+        page.innerHTML = html;
+        page.style.minHeight = '';
+        page.dataset.loaded = '1';
+    }
+}
+
+function clearPage(index) {
+    var page = document.getElementById('page-' + index);
+    if (page && page.dataset.loaded === '1') {
+        // Keep the height of the page, so unloading it does not move the text the user is reading
+        page.style.minHeight = page.offsetHeight + 'px';
+        page.innerHTML = '';
+        page.dataset.loaded = '0';
+    }
+}
+
+function isInView(element) {
+    var bounding = element.getBoundingClientRect();
+    return bounding.top >= 0 && bounding.left >= 0 &&
+        bounding.right <= (window.innerWidth || document.documentElement.clientWidth) &&
+        bounding.bottom <= (window.innerHeight || document.documentElement.clientHeight);
+}
+
+function applyUpdates(updates) {
+    updates.forEach(function (update) {
+        if (update.op === 'page') {
+            setPage(update.index, update.html);
+        } else if (update.op === 'clear') {
+            clearPage(update.index);
+        } else {
+            var element = document.getElementById(update.id);
+            if (!element) {
+                return;  // The page of the word is not loaded, it gets the change when it is rendered
+            }
+            if (update.op === 'style') {
+                element.style.color = update.color;
+                element.style.fontWeight = update.bold ? 'bold' : 'normal';
+            } else if (update.op === 'text') {
+                element.textContent = update.text;
+                element.classList.add('resolved');
+            } else if (update.op === 'scroll') {
+                if (update.onTop) {
+                    element.scrollIntoView();
+                } else if (!isInView(element)) {
+                    element.scrollIntoView({behavior: "smooth", block: "nearest", inline: "start"});
+                }
+            }
+        }
+    });
+}
+
+new QWebChannel(qt.webChannelTransport, function (channel) {
+    var bridge = channel.objects.bridge;
+    var observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (entry.isIntersecting && entry.target.dataset.loaded !== '1') {
+                bridge.requestPage(parseInt(entry.target.dataset.index));
+            }
+        });
+    }, {rootMargin: '1000px 0px'});
+    document.querySelectorAll('.page').forEach(function (page) {
+        observer.observe(page);
+    });
+});
+"""
+
+
+class DocumentPages:
+    """
+    This class represents the pages of a text, split at paragraph boundaries, with a lookup of the page holding a
+    position.
+    """
+
+    def __init__(self, text, pageSize):
+        self.pages = split_text_into_chunks(text, pageSize) if text else [(0, text)]
+        self.starts = [offset for offset, _ in self.pages]
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __repr__(self):
+        return f"DocumentPages(pages={len(self.pages)})"
+
+    def bounds(self, pageIndex):
+        # Start and end, excluded, of a page in the text
+        offset, page = self.pages[pageIndex]
+        return offset, offset + len(page)
+
+    def pageOf(self, position):
+        return max(bisect_right(self.starts, position) - 1, 0)
+
+    def estimatedHeight(self, pageIndex):
+        _, page = self.pages[pageIndex]
+        lines = page.count('\n') + len(page) // ESTIMATED_LINE_LENGTH + 1
+        return lines * ESTIMATED_LINE_HEIGHT
+
+    def placeholdersHTML(self):
+        # The page loaded in the web view, with an empty placeholder for every page of the text
+        placeholders = [f'<span class="page" id="page-{pageIndex}" data-index="{pageIndex}" data-loaded="0" '
+                        f'style="min-height: {self.estimatedHeight(pageIndex)}px;"></span>'
+                        for pageIndex in range(len(self.pages))]
+        return formatHTMLPage(''.join(placeholders), PAGES_SCRIPT)
+
+
+class PageBridge(QObject):
+    """
+    The object shared with the web view through a QWebChannel, relaying the requests of the pages scrolled into view.
+    """
+
+    pageRequested = pyqtSignal(int)  # Index of the page
+
+    @pyqtSlot(int)
+    def requestPage(self, pageIndex):
+        self.pageRequested.emit(pageIndex)
+
+
+def installPageBridge(webPage, bridge):
+    """
+    Shares the bridge with the pages loaded in a web view, as the "bridge" object of its web channel.
+
+    :param webPage: The QWebEnginePage, before its HTML is set.
+    :param bridge: The PageBridge.
+    :return: The QWebChannel, which must be kept alive as long as the page.
+    """
+    # qwebchannel.js ships with Qt, injecting it spares loading it from a qrc URL the page may not be allowed to use
+    scriptFile = QFile(":/qtwebchannel/qwebchannel.js")
+    scriptFile.open(QIODevice.ReadOnly)
+    script = QWebEngineScript()
+    script.setName("qwebchannel.js")
+    script.setSourceCode(bytes(scriptFile.readAll()).decode('utf-8'))
+    scriptFile.close()
+    script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+    script.setWorldId(QWebEngineScript.MainWorld)
+    script.setRunsOnSubFrames(False)
+    webPage.scripts().insert(script)
+
+    channel = QWebChannel(webPage)
+    channel.registerObject("bridge", bridge)
+    webPage.setWebChannel(channel)
+    return channel
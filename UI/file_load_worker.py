@@ -0,0 +1,42 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from docx_io import read_docx
+from instrumentation import span
+from settings import MAX_CHARACTERS
+from text_io_operations import TextTooLongError, read_text_file
+
+
+class FileLoadWorker(QObject):
+    """
+    Reads an uploaded file outside the GUI thread, so opening a large file does not freeze the window.
+    Text files are decoded in blocks with their detected encoding and rejected as soon as they exceed MAX_CHARACTERS.
+    """
+
+    loaded = pyqtSignal(str, object)  # Text, DocxDocument the text was read from or None
+    failed = pyqtSignal(str)  # Error message for the user
+
+    def __init__(self, fileName, parent=None):
+        super().__init__(parent)
+        self.fileName = fileName
+
+    def run(self):
+        try:
+            if self.fileName.lower().endswith('.docx'):
+                # Stream the text of .docx files, keeping the position of the runs for the export
+                with span("read_docx"):
+                    document = read_docx(self.fileName)
+                if len(document.text) > MAX_CHARACTERS:
+                    raise TextTooLongError(self.fileName, MAX_CHARACTERS)
+                self.loaded.emit(document.text, document)
+            else:
+                with span("read_text_file"):
+                    text = read_text_file(self.fileName, MAX_CHARACTERS)
+                self.loaded.emit(text, None)
+        except TextTooLongError:
+            self.failed.emit(f"The file's text exceeds the maximum limit of {MAX_CHARACTERS} characters.")
+        except UnicodeDecodeError as e:
+            print(e)
+            self.failed.emit("Failed to decode the file. It might not be a plain text file.")
+        except Exception as e:
+            print(e)
+            self.failed.emit(f"Failed to read the file:\n{e}")
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QColor, QSyntaxHighlighter, QTextCharFormat
+
+from instrumentation import counter, span
+from settings import BACKGROUND_COLOR, LIVE_HIGHLIGHTING_DELAY, LIVE_HIGHLIGHTING_CACHE_SIZE, \
+    LIVE_HIGHLIGHTING_MAX_BATCH_CHARACTERS
+from text_analyzer import analyze_chunks
+
+"""
+live_highlighter.py
+
+This module underlines the ambiguous words of the input editor while the user types. Qt asks the highlighter to format
+only the text blocks (paragraphs) that changed; a block whose text was already analyzed is formatted from a cache keyed
+by its text, the other ones are collected and, once the user pauses typing, analyzed together on a worker thread.
+The blocks are formatted again when their results come back. Editing one paragraph of a long text therefore only sends
+that paragraph through spaCy.
+"""
+
+
+def utf16Range(text, start, length):
+    """
+    Converts a range of a Python string, counted in code points, to the UTF-16 code units Qt counts in. A character
+    outside the Basic Multilingual Plane, such as an emoji, is one code point but two code units.
+
+    :param text: The string.
+    :param start: The start of the range, in code points.
+    :param length: The length of the range, in code points.
+    :return: The (start, length) tuple in UTF-16 code units.
+    """
+    if len(text.encode('utf-16-le')) // 2 == len(text):
+        return start, length  # Only characters of the Basic Multilingual Plane, the offsets are the same
+    utf16Start = len(text[:start].encode('utf-16-le')) // 2
+    return utf16Start, len(text[start:start + length].encode('utf-16-le')) // 2
+
+
+class BlockAnalysisWorker(QObject):
+    """
+    Analyzes the texts of blocks outside the GUI thread, one batch at a time.
+    """
+
+    analyzed = pyqtSignal(dict)  # Block text -> list of (start, length, word id) tuples, in UTF-16 code units
+
+    def __init__(self, nlp, lexiconIndex, parent=None):
+        super().__init__(parent)
+        self.nlp = nlp
+        self.lexiconIndex = lexiconIndex
+
+    @pyqtSlot(list)
+    def analyze(self, texts):
+        results = {}
+        try:
+            with span("live_analysis", blocks=len(texts)):
+                chunks = [(0, text) for text in texts]
+                for _, text, found in analyze_chunks(chunks, self.nlp, self.lexiconIndex, n_process=1):
+                    results[text] = [utf16Range(text, position, len(word)) + (wordId,)
+                                     for word, position, wordId, *_ in found]
+        except Exception as e:
+            print(e)
+        # Always answer, so the highlighter sends the next batch; texts that failed are analyzed again when edited
+        self.analyzed.emit(results)
+
+
+class LiveHighlighter(QSyntaxHighlighter):
+    """
+    This class represents the as-you-type highlighting of the ambiguous words of a QTextDocument.
+    """
+
+    analysisRequested = pyqtSignal(list)  # Block texts to analyze, sent to the worker thread
+
+    def __init__(self, document, nlp, lexiconIndex):
+        super().__init__(document)
+        self.blockResults = OrderedDict()  # Block text -> results, least recently used first
+        self.pendingBlocks = OrderedDict()  # Block text -> numbers of the blocks waiting for it
+        self.sentBlocks = []  # Texts of the batch being analyzed, the next batch waits for its results
+        self.ambiguousFormat = QTextCharFormat()
+        self.ambiguousFormat.setFontUnderline(True)
+        self.ambiguousFormat.setBackground(QColor(BACKGROUND_COLOR))
+
+        # Analyze once the user pauses typing rather than at every keystroke
+        self.debounceTimer = QTimer(self)
+        self.debounceTimer.setSingleShot(True)
+        self.debounceTimer.setInterval(LIVE_HIGHLIGHTING_DELAY)
+        self.debounceTimer.timeout.connect(self.analyzePendingBlocks)
+
+        self.workerThread = QThread(self)
+        self.worker = BlockAnalysisWorker(nlp, lexiconIndex)
+        self.worker.moveToThread(self.workerThread)
+        self.analysisRequested.connect(self.worker.analyze)
+        self.worker.analyzed.connect(self.onBlocksAnalyzed)
+        self.workerThread.finished.connect(self.worker.deleteLater)
+        self.workerThread.start()
+
+    def highlightBlock(self, text):
+        results = self.blockResults.get(text)
+        if results is not None:
+            self.blockResults.move_to_end(text)
+            for start, length, _ in results:
+                self.setFormat(start, length, self.ambiguousFormat)
+        elif text.strip():
+            self.pendingBlocks.setdefault(text, []).append(self.currentBlock().blockNumber())
+            self.debounceTimer.start()
+
+    def analyzePendingBlocks(self):
+        if self.sentBlocks or not self.pendingBlocks:
+            return  # The blocks still pending are sent when the current batch comes back
+
+        texts = []
+        characters = 0
+        for text in self.pendingBlocks:
+            if texts and characters + len(text) > LIVE_HIGHLIGHTING_MAX_BATCH_CHARACTERS:
+                break
+            texts.append(text)
+            characters += len(text)
+        counter("live_blocks", len(texts))
+        self.sentBlocks = texts
+        self.analysisRequested.emit(texts)
+
+    def onBlocksAnalyzed(self, results):
+        for text in self.sentBlocks:
+            if text not in results:
+                self.pendingBlocks.pop(text, None)  # The analysis failed, the block is retried once edited again
+        self.sentBlocks = []
+        document = self.document()
+        moved = False
+        for text, found in results.items():
+            self.blockResults[text] = found
+            for blockNumber in self.pendingBlocks.pop(text, []):
+                block = document.findBlockByNumber(blockNumber) if document else None
+                if block is not None and block.isValid() and block.text() == text:
+                    self.rehighlightBlock(block)
+                else:
+                    moved = True  # Lines were added or removed above the block since it was queued
+        if moved and document is not None:
+            block = document.begin()
+            while block.isValid():
+                if block.text() in results:
+                    self.rehighlightBlock(block)
+                block = block.next()
+
+        while len(self.blockResults) > LIVE_HIGHLIGHTING_CACHE_SIZE:
+            self.blockResults.popitem(last=False)
+
+        if self.pendingBlocks:
+            self.debounceTimer.start()
+
+    def onLexiconChanged(self):
+        # Results of the old lexicon are worthless, highlight every block again with the new one
+        self.blockResults.clear()
+        self.cancelPending()
+        self.rehighlight()
+
+    def cancelPending(self):
+        # Drop the blocks waiting to be analyzed, a batch already sent still comes back
+        self.debounceTimer.stop()
+        self.pendingBlocks.clear()
+
+    def stop(self):
+        self.cancelPending()
+        self.workerThread.quit()
+        self.workerThread.wait()
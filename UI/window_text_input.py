@@ -1,24 +1,53 @@
 from PyQt5.QtWidgets import QMainWindow, QPushButton, QVBoxLayout, QWidget, QFileDialog, \
     QMessageBox, QScrollArea, QLabel, QProgressDialog, QApplication
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, QTimer
 
+from UI.analysis_worker import AnalysisWorker
+from UI.file_load_worker import FileLoadWorker
+from UI.live_highlighter import LiveHighlighter
 from UI.window_text_interaction import DocumentWindow
-from settings import WINDOW_WIDTH, WINDOW_HEIGHT, MAX_CHARACTERS, ALLOWED_FORMATS
+from settings import WINDOW_WIDTH, WINDOW_HEIGHT, MAX_CHARACTERS, ALLOWED_FORMATS, ANALYSIS_CACHE_ENABLED, \
+    ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_MAX_BYTES, LIVE_HIGHLIGHTING_ENABLED, LEXICON_RELOAD_INTERVAL
 from UI.plain_text_edit import PlainTextOnlyEdit
-from docx import Document
 
-from text_analyzer import find_ambiguous_words
+from analysis_cache import analysis_cache_namespace, open_analysis_cache
+from instrumentation import counter, span
+from data_model import build_lexicon_index
+from lexicon_reload import LexiconReloader
+from text_analyzer import split_text_into_chunks
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, nlp, ambiguousWords):
+    def __init__(self, nlp, ambiguousWords, lexiconPath=None):
         super().__init__()
         self.nlp = nlp
         self.ambiguousWords = ambiguousWords
+        self.lexiconIndex = build_lexicon_index(ambiguousWords)
+        self.analysisCache = open_analysis_cache(nlp, ambiguousWords, ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_MAX_BYTES) \
+            if ANALYSIS_CACHE_ENABLED else None
         self.textEdit = None
         self.uploadButton = None
+        self.documentWindow = None
+        self.progressDialog = None
+        self.analysisThread = None
+        self.analysisWorker = None
+        self.analysisText = ""
+        self.analysisChunks = []
+        self.analysisError = None
+        self.currentDocument = None  # The .docx file the text was read from, replacements can be saved back into it
+        self.loadThread = None
+        self.loadWorker = None
+        self.liveHighlighter = None
         self.setWindowTitle("New Text")
         self.initUI()
+        # Apply the edits made to the lexicon file while the application runs, without restarting it
+        self.lexiconReloader = LexiconReloader(lexiconPath, ambiguousWords) \
+            if lexiconPath and LEXICON_RELOAD_INTERVAL > 0 else None
+        if self.lexiconReloader is not None:
+            self.lexiconTimer = QTimer(self)
+            self.lexiconTimer.setInterval(LEXICON_RELOAD_INTERVAL)
+            self.lexiconTimer.timeout.connect(self.onLexiconPoll)
+            self.lexiconTimer.start()
         self.resize(WINDOW_WIDTH, WINDOW_HEIGHT)  # Increase the window size
         self.centerWindow()
         #self.showFullScreen()
@@ -45,6 +74,10 @@ class MainWindow(QMainWindow):
         self.textEdit = PlainTextOnlyEdit()
         self.textEdit.setPlaceholderText("Copy and paste your text here...")
         layout.addWidget(self.textEdit)
+        if LIVE_HIGHLIGHTING_ENABLED:
+            # Underline the ambiguous words while typing, analyzing only the edited paragraphs
+            self.liveHighlighter = LiveHighlighter(self.textEdit.document(), self.nlp, self.lexiconIndex)
+            QApplication.instance().aboutToQuit.connect(self.liveHighlighter.stop)
 
         # Button to confirm pasted text setup as before
         self.confirmButton = QPushButton("Confirm Text")
@@ -67,35 +100,130 @@ class MainWindow(QMainWindow):
 
     def onTextChanged(self):
         """Check if the pasted text exceeds the maximum number of characters allowed."""
-        text = self.textEdit.toPlainText()
-        if len(text) > MAX_CHARACTERS:
+        # Called at every keystroke, so the length is read from the document instead of copying the whole text
+        length = self.textEdit.document().characterCount() - 1  # The count includes the final paragraph separator
+        if length > MAX_CHARACTERS:
             QMessageBox.warning(self, "Error", f"The text exceeds the maximum limit of {MAX_CHARACTERS} characters.")
             self.textEdit.clear()  # Clear the text or set it to a previous valid state
         else:
-            self.confirmButton.setEnabled(bool(text))
+            self.confirmButton.setEnabled(length > 0)
+
+    def setLiveHighlighting(self, enabled):
+        # Detach the live highlighter while a text that is analyzed anyway is shown, attaching it highlights every block
+        if self.liveHighlighter is not None:
+            self.liveHighlighter.cancelPending()
+            document = self.textEdit.document() if enabled else None
+            if self.liveHighlighter.document() is not document:
+                self.liveHighlighter.setDocument(document)
+
+    def onLexiconPoll(self):
+        # The lexicon is updated in place, which must not happen while a worker thread analyzes with it
+        if self.analysisThread is not None and self.analysisThread.isRunning():
+            return
+        if self.liveHighlighter is not None and self.liveHighlighter.sentBlocks:
+            return
+
+        try:
+            diff = self.lexiconReloader.poll()
+        except Exception as e:
+            # An exception escaping a slot aborts the application
+            print(f"Failed to reload the lexicon: {e}")
+            return
+        if not diff:
+            return
+        print(f"Lexicon reloaded: {diff}")
+        if self.analysisCache is not None:
+            self.analysisCache.namespace = analysis_cache_namespace(self.nlp, self.ambiguousWords)
+        if self.liveHighlighter is not None:
+            self.liveHighlighter.onLexiconChanged()
+        if self.documentWindow is not None and self.documentWindow.isVisible():
+            self.documentWindow.onLexiconChanged(diff, self.nlp, self.analysisCache)
 
     def onConfirmText(self):
         """Handle text confirmation."""
         text = self.textEdit.toPlainText()
-        print("Text confirmed:", text)
+        lineCount = text.count('\n') + 1
+        print(f"Text confirmed: {len(text)} characters, {lineCount} lines")
+        counter("document_characters", len(text))
 
-        # Setup the progress dialog
-        progressDialog = QProgressDialog("Analyzing text, please wait...", None, 0, 0, self)
-        progressDialog.setCancelButton(None)  # Disable the Cancel button
-        progressDialog.setWindowModality(Qt.WindowModal)
-        progressDialog.setWindowTitle("Processing")
-        progressDialog.show()
-        QApplication.processEvents()
+        self.analysisText = text
+        if self.liveHighlighter is not None:
+            self.liveHighlighter.cancelPending()  # The whole text is analyzed now
+        # Replacements can only be written back into the .docx file if the text was not edited after loading it
+        if self.currentDocument is not None and self.currentDocument.text != text:
+            self.currentDocument = None
+        with span("split_chunks", characters=len(text)):
+            self.analysisChunks = split_text_into_chunks(text)
+        counter("chunks", len(self.analysisChunks))
+        self.analysisError = None
+        self.documentWindow = None
 
-        results = find_ambiguous_words(text, self.ambiguousWords, self.nlp)
+        # Setup the progress dialog, shown until the first chunk is analyzed
+        self.progressDialog = QProgressDialog("Analyzing text, please wait...", "Cancel", 0, 0, self)
+        self.progressDialog.setWindowModality(Qt.WindowModal)
+        self.progressDialog.setWindowTitle("Processing")
+        self.progressDialog.show()
+        self.progressDialog.canceled.connect(self.onAnalysisCanceled)
 
-        progressDialog.close()
+        # Run the analysis on a worker thread, so the window stays responsive
+        self.analysisThread = QThread(self)
+        self.analysisWorker = AnalysisWorker(self.analysisChunks, self.nlp, self.lexiconIndex, self.analysisCache)
+        self.analysisWorker.moveToThread(self.analysisThread)
+        self.analysisThread.started.connect(self.analysisWorker.run)
+        self.analysisWorker.chunkAnalyzed.connect(self.onChunkAnalyzed)
+        self.analysisWorker.failed.connect(self.onAnalysisFailed)
+        self.analysisWorker.finished.connect(self.onAnalysisFinished)
+        self.analysisWorker.finished.connect(self.analysisThread.quit)
+        self.analysisThread.finished.connect(self.analysisWorker.deleteLater)
+        self.analysisThread.start()
+
+    def closeProgressDialog(self):
+        # Closing a QProgressDialog emits canceled, which must not stop the analysis
+        self.progressDialog.canceled.disconnect(self.onAnalysisCanceled)
+        self.progressDialog.close()
+
+    def onAnalysisCanceled(self):
+        # The worker thread is busy running the analysis, so the worker is cancelled directly instead of through a slot
+        self.analysisWorker.cancel()
+
+    def onChunkAnalyzed(self, done, total, results):
+        if self.documentWindow is None:
+            # Open the document as soon as its first chunk is analyzed, the rest is streamed into it
+            self.closeProgressDialog()
+            self.openDocumentWindow(results, done)
+        else:
+            self.documentWindow.addChunkResults(done - 1, results)
 
+    def onAnalysisFinished(self, cancelled):
+        stopped = cancelled or self.analysisError is not None
+        if self.documentWindow is not None:
+            self.documentWindow.onAnalysisFinished(stopped)
+            return
+
+        self.closeProgressDialog()
+        if not stopped:
+            # No chunk was emitted, the text is empty
+            self.openDocumentWindow([], len(self.analysisChunks))
+        else:
+            self.setLiveHighlighting(True)  # The user stays in the editor
+
+    def onAnalysisFailed(self, message):
+        self.analysisError = message
+        QMessageBox.warning(self, "Error", f"Failed to analyze the text:\n{message}")
+
+    def openDocumentWindow(self, results, analyzedChunks):
         # Here, proceed with processing the confirmed text
-        self.documentWindow = DocumentWindow(text, results, self.ambiguousWords)
+        with span("open_document_window", findings=len(results)):
+            self.documentWindow = DocumentWindow(self.analysisText, list(results), self.ambiguousWords,
+                                                 chunks=self.analysisChunks, analyzedChunks=analyzedChunks,
+                                                 sourceDocument=self.currentDocument)
+        self.currentDocument = None
         self.documentWindow.previousWindow = self
+        if analyzedChunks < len(self.analysisChunks):
+            self.documentWindow.attachAnalysisWorker(self.analysisWorker)
         self.documentWindow.show()
         self.textEdit.clear()
+        self.setLiveHighlighting(True)
         self.close()
 
     def onUploadFile(self):
@@ -107,31 +235,33 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Error",
                                     f"The file format is not valid. Allowed formats: {', '.join(ALLOWED_FORMATS)}")
             else:
-                if file_extension == "docx":
-                    # Use python-docx to extract text from .docx files
-                    try:
-                        doc = Document(filename)
-                        self.currentText = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-                    except Exception as e:
-                        QMessageBox.warning(self, "Error", "Failed to read .docx file.")
-                        print(e)
-                        return
-                else:
-                    # Handle other file types as before
-                    try:
-                        with open(filename, 'r') as file:
-                            self.currentText = file.read()
-                    except UnicodeDecodeError as e:
-                        QMessageBox.warning(self, "Error",
-                                            "Failed to decode the file. It might not be a plain text file.")
-                        print(e)
-                        return
-
-                if len(self.currentText) > MAX_CHARACTERS:
-                    QMessageBox.warning(self, "Error",
-                                        f"The file's text exceeds the maximum limit of {MAX_CHARACTERS} characters.")
-                    self.currentText = ""  # Clear the text due to error
-                else:
-                    self.textEdit.setText(self.currentText)  # Display the text
-                    print("File uploaded and text saved for analysis.")
-                    self.onConfirmText()
\ No newline at end of file
+                self.currentDocument = None
+                self.uploadButton.setEnabled(False)
+                self.confirmButton.setEnabled(False)
+
+                # Read the file on a worker thread, the text is shown and analyzed once loaded
+                self.loadThread = QThread(self)
+                self.loadWorker = FileLoadWorker(filename)
+                self.loadWorker.moveToThread(self.loadThread)
+                self.loadThread.started.connect(self.loadWorker.run)
+                self.loadWorker.loaded.connect(self.onFileLoaded)
+                self.loadWorker.failed.connect(self.onFileLoadFailed)
+                self.loadWorker.loaded.connect(self.loadThread.quit)
+                self.loadWorker.failed.connect(self.loadThread.quit)
+                self.loadThread.finished.connect(self.loadWorker.deleteLater)
+                self.loadThread.start()
+
+    def onFileLoaded(self, text, document):
+        self.uploadButton.setEnabled(True)
+        self.currentText = text
+        self.currentDocument = document
+        self.setLiveHighlighting(False)
+        with span("show_text", characters=len(text)):
+            self.textEdit.setPlainText(self.currentText)  # Display the text, never interpreted as HTML
+        print(f"File uploaded: {len(self.currentText)} characters saved for analysis.")
+        self.onConfirmText()
+
+    def onFileLoadFailed(self, message):
+        self.uploadButton.setEnabled(True)
+        self.onTextChanged()
+        QMessageBox.warning(self, "Error", message)
\ No newline at end of file
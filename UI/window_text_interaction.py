@@ -1,26 +1,69 @@
+import json
+from collections import OrderedDict
+
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QLabel, QApplication,
                              QTreeWidget, QTreeWidgetItem, QScrollArea, QFileDialog, QMessageBox)
 from PyQt5.QtCore import Qt, QTimer, QPoint
 from data_model import AmbiguousWord, find_ambiguous_word_by_id
-from settings import WINDOW_WIDTH, WINDOW_HEIGHT, formatTextAsHTML, SELECTED_COLOR, UNSELECTED_COLOR, BACKGROUND_COLOR, \
-    APP_NAME, APP_VERSION
+from docx_io import save_docx_with_replacements
+from instrumentation import counter, span
+from html_renderer import render_highlighted_html
+from result_store import ResultStore
+from settings import WINDOW_WIDTH, WINDOW_HEIGHT, SELECTED_COLOR, UNSELECTED_COLOR, \
+    APP_NAME, APP_VERSION, VIEWER_PAGE_SIZE, VIEWER_PAGES_AROUND, VIEWER_MAX_LOADED_PAGES, SIDE_PANEL_CACHE_SIZE, \
+    REVIEW_JOURNAL_ENABLED, REVIEW_JOURNAL_DIRECTORY, REVIEW_JOURNAL_MAX_FILES
+from UI.document_pages import DocumentPages, PageBridge, installPageBridge
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 from typing import List
 
-from text_replacer import replace_word_and_calculate_offset
+from review_journal import open_review_journal, restore_decisions
+from text_analyzer import reanalyze_after_lexicon_change
+from text_replacer import adapt_case, build_replacement_edits, replace_words
 
 
 class DocumentWindow(QWidget):
-    def __init__(self, text, ambiguous_words_results, ambiguousWords: List[AmbiguousWord] , parent=None, previousWindow=None):
+    def __init__(self, text, ambiguous_words_results, ambiguousWords: List[AmbiguousWord] , parent=None, previousWindow=None,
+                 chunks=None, analyzedChunks=None, sourceDocument=None):
         super().__init__(parent)
         self.currentIndex = 0
         self.sourceText = text
-        self.ambiguousWordsResults = ambiguous_words_results
+        # Results and decisions, kept in a compact store that also counts the resolved words
+        self.ambiguousWordsResults = ambiguous_words_results if isinstance(ambiguous_words_results, ResultStore) \
+            else ResultStore(text, ambiguous_words_results)
+        counter("findings", len(self.ambiguousWordsResults))
         self.ambiguousWords = ambiguousWords
         self.previousWindow = previousWindow
+        self.sourceDocument = sourceDocument  # The .docx file the text was read from, if any
+        # Chunks of the text as (offset, chunk), the results of the chunks not analyzed yet are added while reviewing
+        self.chunks = chunks if chunks is not None else [(0, text)]
+        self.analyzedChunks = analyzedChunks if analyzedChunks is not None else len(self.chunks)
+        self.analysisWorker = None
+        self.pageLoaded = False
+        # Changes to the web view made during the current event loop iteration, sent together by flushUpdates()
+        self.pendingUpdates = {}
+        self.updateTimer = QTimer(self)
+        self.updateTimer.setSingleShot(True)
+        self.updateTimer.setInterval(0)
+        self.updateTimer.timeout.connect(self.flushUpdates)
+        # Pages of the document view, only the ones around the current word and the ones scrolled to are loaded
+        self.pages = DocumentPages(text, VIEWER_PAGE_SIZE)
+        self.loadedPages = set()
+        self.lastRequestedPage = 0  # Last page the user scrolled to
+        self.replacedWords = {}  # Position of each replaced word -> text shown in its place, kept across page reloads
+        # Decisions taken on the same text with the same lexicon in an earlier session, restored as results arrive
+        self.reviewJournal = self.openReviewJournal()
+        self.savedDecisions, self.savedPosition = self.reviewJournal.load() if self.reviewJournal else ({}, None)
+        self.replacedWords.update(restore_decisions(self.ambiguousWordsResults, self.savedDecisions, ambiguousWords))
+        savedIndex = self.findSavedIndex()
+        if savedIndex is not None:
+            self.currentIndex = savedIndex
         # List to keep track of all tree items
         self.treeItems = []
+        # Option groups of the side panel already built, by ambiguous word Id, least recently shown first
+        self.sidePanelGroups = OrderedDict()
+        self.visibleGroup = None
+        self.cleanTextLabel = None
         self.currentOptionArrayIndex = -1
         self.setWindowTitle(f"{APP_NAME} v.{APP_VERSION}")
         self.initUI()
@@ -34,9 +77,6 @@ class DocumentWindow(QWidget):
         qr.moveCenter(cp)  # Set the center of the QRect to the center of the screen
         self.move(qr.topLeft())
     def initUI(self):
-        text = self.highlight_words_in_html(self.sourceText, self.ambiguousWordsResults)
-        text = formatTextAsHTML(text)
-
         mainLayout = QVBoxLayout()
 
         # Navigation Panel
@@ -60,7 +100,12 @@ class DocumentWindow(QWidget):
 
         # Document Visualization
         self.webView = QWebEngineView()  # Use QWebEngineView instead of QTextEdit
-        self.webView.setHtml(text)  # Load the HTML content
+        self.pageBridge = PageBridge(self)
+        self.pageBridge.pageRequested.connect(self.onPageRequested)
+        self.webChannel = installPageBridge(self.webView.page(), self.pageBridge)
+        with span("set_html", pages=len(self.pages)):
+            self.webView.setHtml(self.pages.placeholdersHTML())  # Empty pages, filled on demand
+        self.showPagesAround(self.currentPage())
 
         # Side Panel setup with scroll area
         self.scrollArea = QScrollArea()
@@ -79,29 +124,37 @@ class DocumentWindow(QWidget):
         bottomNavPanel = QHBoxLayout()
 
         # Back arrow button
-        backButton = QPushButton("Previous Word")
-        backButton.clicked.connect(self.onBackClicked)  # Implement onBackClicked method
+        self.backButton = QPushButton("Previous Word")
+        self.backButton.clicked.connect(self.onBackClicked)  # Implement onBackClicked method
 
         # Progress label
-        self.progressLabel = QLabel(f"confused words checked: 0/{len(self.ambiguousWordsResults)}")  # Update this dynamically based on actual progress
+        self.progressLabel = QLabel(f"confused words checked: {self.ambiguousWordsResults.resolved_count}/{len(self.ambiguousWordsResults)}")  # Update this dynamically based on actual progress
         self.progressLabel.setAlignment(Qt.AlignCenter)
 
+        # Analysis progress, shown while the rest of the text is still being analyzed
+        self.analysisLabel = QLabel()
+        self.stopAnalysisButton = QPushButton("Stop Analysis")
+        self.stopAnalysisButton.clicked.connect(self.onStopAnalysisClicked)
+        self.updateAnalysisProgress()
+
         # Next arrow button
-        nextButton = QPushButton("Next Word")
-        nextButton.clicked.connect(self.onNextClicked)  # Implement onNextClicked method
+        self.nextButton = QPushButton("Next Word")
+        self.nextButton.clicked.connect(self.onNextClicked)  # Implement onNextClicked method
 
         if not self.ambiguousWordsResults or len(self.ambiguousWordsResults) == 0:
-            backButton.setEnabled(False)
-            nextButton.setEnabled(False)
-            optionLabel = QLabel("The text looks clean.")
-            self.sidePanel.addWidget(optionLabel)
+            self.backButton.setEnabled(False)
+            self.nextButton.setEnabled(False)
+            self.cleanTextLabel = QLabel("The text looks clean.")
+            self.sidePanel.addWidget(self.cleanTextLabel)
 
         # Add widgets to the bottom navigation panel
-        bottomNavPanel.addWidget(backButton)
+        bottomNavPanel.addWidget(self.backButton)
         bottomNavPanel.addStretch()  # This adds a stretchable space, centering the label
         bottomNavPanel.addWidget(self.progressLabel)
+        bottomNavPanel.addWidget(self.analysisLabel)
+        bottomNavPanel.addWidget(self.stopAnalysisButton)
         bottomNavPanel.addStretch()  # This ensures the label stays centered
-        bottomNavPanel.addWidget(nextButton)
+        bottomNavPanel.addWidget(self.nextButton)
 
         # Add the bottom navigation panel to the main layout
         mainLayout.addLayout(bottomNavPanel)
@@ -120,6 +173,7 @@ class DocumentWindow(QWidget):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         # Close the current window and show the previous one if it exists
         if reply == QMessageBox.Yes:
+            self.stopAnalysis()
             if self.previousWindow:
                 self.previousWindow.show()
             self.close()
@@ -137,16 +191,23 @@ class DocumentWindow(QWidget):
 
 
     def exportText(self):
-        # Placeholder for the export text functionality
-        text = self.prepareSourceTextForExport()
-        # This might involve saving self.sourceText to a file
         # Open a file dialog to let the user choose the file name and location to save
         options = QFileDialog.Options()
         options |= QFileDialog.DontUseNativeDialog
-        fileName, _ = QFileDialog.getSaveFileName(self, "Export Text", "textChecked.txt",
-                                                  "Text Files (*.txt)", options=options)
+        if self.sourceDocument is not None:
+            # Text read from a Word file can be saved back as a Word file, keeping its formatting
+            fileName, selectedFilter = QFileDialog.getSaveFileName(self, "Export Text", "textChecked.docx",
+                                                                   "Word Documents (*.docx);;Text Files (*.txt)",
+                                                                   options=options)
+            if fileName and (fileName.endswith('.docx') or selectedFilter.startswith("Word")):
+                self.exportDocx(fileName if fileName.endswith('.docx') else fileName + '.docx')
+                return
+        else:
+            fileName, _ = QFileDialog.getSaveFileName(self, "Export Text", "textChecked.txt",
+                                                      "Text Files (*.txt)", options=options)
 
         if fileName:
+            text = self.prepareSourceTextForExport()
             # Ensure the fileName has a .txt extension if not provided
             if not fileName.endswith('.txt'):
                 fileName += '.txt'
@@ -160,6 +221,17 @@ class DocumentWindow(QWidget):
             except Exception as e:
                 QMessageBox.warning(self, "Export Failed", f"Failed to export file:\n{e}")
 
+    def exportDocx(self, fileName):
+        # Write the replacements into the runs of the original Word file, the rest of the file is copied as is
+        try:
+            with span("export_docx", resolved=self.ambiguousWordsResults.resolved_count):
+                edits = build_replacement_edits(self.ambiguousWordsResults, self.ambiguousWords)
+                save_docx_with_replacements(self.sourceDocument, fileName, edits)
+            QMessageBox.information(self, "Export Successful",
+                                    f"File has been successfully exported to:\n{fileName}")
+        except Exception as e:
+            QMessageBox.warning(self, "Export Failed", f"Failed to export file:\n{e}")
+
     def onBackClicked(self):
         if not self.ambiguousWordsResults or len(self.ambiguousWordsResults) == 0:
             return
@@ -175,108 +247,324 @@ class DocumentWindow(QWidget):
         #print("Next button clicked")
         self.selectNextAmbigousWordByIndex(self.currentIndex + 1)
 
-    # Example function to highlight words in HTML
-    def highlight_words_in_html(self, text, ambiguous_words_results):
-        highlighted_text = text
-        offset = 0
-        for index, (word, position, _,_,_,_) in enumerate(ambiguous_words_results):
-            # Use underline for styling, and differentiate the first selected word with a different color
-            #color = "#008000" good for corrected words
-            color = SELECTED_COLOR if index == 0 else UNSELECTED_COLOR  # Change 'blue' to any color for the first word, and 'black' for others
-            start_tag = (f'<span id={position} style="text-decoration: underline; color: {color}; background-color: '
-                         f'{BACKGROUND_COLOR};">')
-            end_tag = '</span>'
-            highlighted_text = (highlighted_text[:position + offset] + start_tag + word + end_tag +
-                                highlighted_text[position + offset + len(word):])
-            offset += len(start_tag) + len(end_tag)
-        return highlighted_text
+    def highlight_words_in_html(self, start, end):
+        # Render the slice [start, end) of the source text, with the current word selected and the replacements shown
+        return render_highlighted_html(self.sourceText, self.ambiguousWordsResults, start, end,
+                                       selected_index=self.currentIndex, replacements=self.replacedWords)
+
+    def currentPage(self):
+        if not self.ambiguousWordsResults:
+            return 0
+        return self.pages.pageOf(self.getWordPositionByIndex(self.currentIndex))
+
+    def renderPage(self, pageIndex):
+        start, end = self.pages.bounds(pageIndex)
+        with span("render_page", page=pageIndex, characters=end - start):
+            html = self.highlight_words_in_html(start, end)
+        self.queueUpdate(('page', pageIndex), {'op': 'page', 'index': pageIndex, 'html': html})
+
+    def loadPage(self, pageIndex):
+        if not 0 <= pageIndex < len(self.pages) or pageIndex in self.loadedPages:
+            return
+        self.renderPage(pageIndex)
+        self.loadedPages.add(pageIndex)
+
+    def showPagesAround(self, pageIndex):
+        for neighbour in range(pageIndex - VIEWER_PAGES_AROUND, pageIndex + VIEWER_PAGES_AROUND + 1):
+            self.loadPage(neighbour)
+        self.unloadFarPages()
+
+    def unloadFarPages(self):
+        # Unload the pages farthest from both the current word and the place the user scrolled to
+        currentPage = self.currentPage()
+        while len(self.loadedPages) > VIEWER_MAX_LOADED_PAGES:
+            farthest = max(self.loadedPages,
+                           key=lambda page: min(abs(page - currentPage), abs(page - self.lastRequestedPage)))
+            if min(abs(farthest - currentPage), abs(farthest - self.lastRequestedPage)) <= VIEWER_PAGES_AROUND:
+                break
+            self.queueUpdate(('page', farthest), {'op': 'clear', 'index': farthest})
+            self.loadedPages.discard(farthest)
+
+    def onPageRequested(self, pageIndex):
+        # A page was scrolled into view
+        self.lastRequestedPage = pageIndex
+        self.loadPage(pageIndex)
+        self.unloadFarPages()
+
+    def attachAnalysisWorker(self, worker):
+        # Keep a reference to the worker analyzing the remaining chunks, so the analysis can be stopped
+        self.analysisWorker = worker
+        self.updateAnalysisProgress()
+
+    def addChunkResults(self, chunkIndex, results):
+        firstNewIndex = len(self.ambiguousWordsResults)
+        hadResults = firstNewIndex > 0
+        self.ambiguousWordsResults.extend(results)  # Chunks are analyzed in order, so results stay sorted
+        counter("findings", len(self.ambiguousWordsResults))
+        self.analyzedChunks = chunkIndex + 1
+        self.replacedWords.update(restore_decisions(self.ambiguousWordsResults, self.savedDecisions,
+                                                    self.ambiguousWords, firstNewIndex))
+        savedIndex = self.findSavedIndex()
+
+        # Highlight the new words on the loaded pages, the other pages are rendered with them once loaded
+        offset, chunk = self.chunks[chunkIndex]
+        for pageIndex in sorted(self.loadedPages):
+            start, end = self.pages.bounds(pageIndex)
+            if start < offset + len(chunk) and offset < end:
+                self.renderPage(pageIndex)
+
+        self.updateProgressLabel()
+        self.updateAnalysisProgress()
+        if not hadResults and len(self.ambiguousWordsResults) > 0:
+            # The first ambiguous words arrived, start the review from the first one or from the one saved
+            if savedIndex is not None:
+                self.currentIndex = savedIndex
+            self.backButton.setEnabled(True)
+            self.nextButton.setEnabled(True)
+            self.populateSidePanel()
+            if self.pageLoaded:
+                self.onLoadFinished(True)
+        elif savedIndex is not None:
+            self.selectNextAmbigousWordByIndex(savedIndex)
+
+    def openReviewJournal(self):
+        if not REVIEW_JOURNAL_ENABLED:
+            return None
+        with span("open_review_journal", characters=len(self.sourceText)):
+            return open_review_journal(REVIEW_JOURNAL_DIRECTORY, self.sourceText, self.ambiguousWords,
+                                       REVIEW_JOURNAL_MAX_FILES)
+
+    def findSavedIndex(self):
+        # Index of the word reviewed when the journal was last written, once the results reach it
+        if self.savedPosition is None:
+            return None
+        index = self.ambiguousWordsResults.find_index(self.savedPosition)
+        if index < len(self.ambiguousWordsResults) and self.ambiguousWordsResults.position(index) == self.savedPosition:
+            self.savedPosition = None
+            return index
+        if index < len(self.ambiguousWordsResults) or self.analyzedChunks >= len(self.chunks):
+            self.savedPosition = None  # The word is no longer found, stay where the review is
+        return None
+
+    def onAnalysisFinished(self, stopped):
+        self.analysisWorker = None
+        self.updateAnalysisProgress(stopped)
+
+    def onLexiconChanged(self, diff, nlp, analysisCache=None):
+        # Check the text again for the changed entries only, the lexicon itself was already updated in place
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            results = reanalyze_after_lexicon_change(self.sourceText, self.ambiguousWordsResults, diff,
+                                                     self.ambiguousWords, nlp, analysisCache)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.replaceResults(results)
+        self.switchReviewJournal()
+
+    def switchReviewJournal(self):
+        # The decisions refer to the options of a lexicon version, keep them in the journal of the new version
+        if self.reviewJournal is None:
+            return
+        self.reviewJournal.close()
+        self.reviewJournal = self.openReviewJournal()
+        self.savedDecisions = {}
+        if self.reviewJournal is not None:
+            results = self.ambiguousWordsResults
+            decisions = {}
+            for index in results.indices(True):
+                _, position, wordId, _, option, subOption = results[index]
+                decisions[(position, wordId)] = (option, subOption)
+            currentPosition = results.position(self.currentIndex) if len(results) > 0 else None
+            self.reviewJournal.compact(decisions, currentPosition)
+
+    def replaceResults(self, results):
+        # Show a new list of results for the same text, staying on the word the user was reviewing or the next one
+        position = self.getWordPositionByIndex(self.currentIndex) if self.ambiguousWordsResults else 0
+        self.ambiguousWordsResults = ResultStore(self.sourceText, results)
+        counter("findings", len(self.ambiguousWordsResults))
+        self.currentIndex = min(self.ambiguousWordsResults.find_index(position),
+                                max(len(self.ambiguousWordsResults) - 1, 0))
+        resolvedPositions = {result[1] for result in results if result[3]}
+        self.replacedWords = {wordPosition: text for wordPosition, text in self.replacedWords.items()
+                              if wordPosition in resolvedPositions}
+
+        # The options of the entries may have changed, build the side panel groups again
+        for groupWidget, _ in self.sidePanelGroups.values():
+            self.sidePanel.removeWidget(groupWidget)
+            groupWidget.deleteLater()
+        self.sidePanelGroups.clear()
+        self.visibleGroup = None
+        self.treeItems = []
+        self.currentOptionArrayIndex = -1
+
+        for pageIndex in sorted(self.loadedPages):
+            self.renderPage(pageIndex)
+        self.updateProgressLabel()
+        hasResults = len(self.ambiguousWordsResults) > 0
+        self.backButton.setEnabled(hasResults)
+        self.nextButton.setEnabled(hasResults)
+        if hasResults:
+            self.populateSidePanel()
+            self.showPagesAround(self.currentPage())
+            self.scroll_to_word(self.getWordPositionByIndex(self.currentIndex))
+        elif self.cleanTextLabel is None:
+            self.cleanTextLabel = QLabel("The text looks clean.")
+            self.sidePanel.addWidget(self.cleanTextLabel)
+
+    def onStopAnalysisClicked(self):
+        self.stopAnalysis()
+
+    def stopAnalysis(self):
+        if self.analysisWorker is not None:
+            self.analysisWorker.cancel()
+
+    def updateAnalysisProgress(self, stopped=False):
+        total = len(self.chunks)
+        if stopped and self.analyzedChunks < total:
+            self.analysisLabel.setText(f"(analysis stopped: {self.analyzedChunks}/{total} parts analyzed)")
+            self.analysisLabel.setVisible(True)
+        else:
+            self.analysisLabel.setText(f"(analyzing: {self.analyzedChunks}/{total} parts)")
+            self.analysisLabel.setVisible(self.analyzedChunks < total)
+        self.stopAnalysisButton.setVisible(self.analysisWorker is not None and self.analyzedChunks < total)
+
+    def updateProgressLabel(self):
+        results = self.ambiguousWordsResults
+        self.progressLabel.setText(f"confused words checked: {results.resolved_count}/{len(results)}")
+
+    def queueUpdate(self, key, update):
+        """
+        Queues a change to the web view, sent with the other changes of the same event loop iteration.
+        A later change with the same key replaces the earlier one and moves after the changes queued in between.
+
+        :param key: Identifies what the change applies to, such as ('style', position).
+        :param update: The change, a JSON-serializable dictionary handled by applyUpdates() in the page.
+        """
+        self.pendingUpdates.pop(key, None)
+        self.pendingUpdates[key] = update
+        if self.pageLoaded and not self.updateTimer.isActive():
+            self.updateTimer.start()
+
+    def flushUpdates(self):
+        # Send the queued changes as one message, the data is passed as JSON rather than spliced into code
+        if not self.pageLoaded or not self.pendingUpdates:
+            return
+        updates = list(self.pendingUpdates.values())
+        self.pendingUpdates.clear()
+        with span("flush_updates", updates=len(updates)):
+            self.webView.page().runJavaScript(f"applyUpdates({json.dumps(updates)});")
+
+    def closeEvent(self, event):
+        self.stopAnalysis()
+        if self.reviewJournal is not None:
+            self.reviewJournal.close()
+        super().closeEvent(event)
 
     def getWordPositionByIndex(self, index):
-        return self.ambiguousWordsResults[index][1]
+        return self.ambiguousWordsResults.position(index)
 
     def change_word_color(self, span_id, color, bold):
-        fontWeight = "bold" if bold else "normal"
-        script = f"""
-        var element = document.getElementById('{span_id}');
-        if (element) {{
-            element.style.color = '{color}';
-            element.style.fontWeight = '{fontWeight}';
-        }}
-        """
-        self.webView.page().runJavaScript(script)
+        self.queueUpdate(('style', span_id), {'op': 'style', 'id': str(span_id), 'color': color, 'bold': bold})
 
     def scroll_to_word_on_top(self, span_id):
-        script = f"""
-        var element = document.getElementById('{span_id}');
-        if (element) {{
-            element.scrollIntoView();
-        }}
-        """
-        self.webView.page().runJavaScript(script)
+        # Only the last scroll of an event loop iteration matters
+        self.queueUpdate(('scroll',), {'op': 'scroll', 'id': str(span_id), 'onTop': True})
 
     def scroll_to_word(self, span_id):
-        script = f"""
-        var element = document.getElementById('{span_id}');
-        if (element) {{
-            var bounding = element.getBoundingClientRect();
-            if (
-                bounding.top >= 0 && bounding.left >= 0 &&
-                bounding.right <= (window.innerWidth || document.documentElement.clientWidth) &&
-                bounding.bottom <= (window.innerHeight || document.documentElement.clientHeight)
-            ) {{
-                // The element is in the view, don't scroll
-            }} else {{
-                // The element is not in the view, scroll to the element
-                element.scrollIntoView({{behavior: "smooth", block: "nearest", inline: "start"}});
-            }}
-        }}
-        """
-        self.webView.page().runJavaScript(script)
+        # Scrolls only if the word is out of the view
+        self.queueUpdate(('scroll',), {'op': 'scroll', 'id': str(span_id), 'onTop': False})
 
     def onLoadFinished(self, success):
         if success:
+            self.pageLoaded = True
             if len(self.ambiguousWordsResults) > 0:
+                self.showPagesAround(self.currentPage())
                 firstAmbiguousPosition = self.getWordPositionByIndex(self.currentIndex)
                 #print(f"scroll to {firstAmbiguousPosition}")
                 self.scroll_to_word_on_top(firstAmbiguousPosition)
                 self.change_word_color(firstAmbiguousPosition, SELECTED_COLOR, True)
+            self.flushUpdates()  # Also sends the changes queued while the page was loading
 
     def selectNextAmbigousWordByIndex(self, nextIndex):
-        position = self.ambiguousWordsResults[self.currentIndex][1]
+        position = self.ambiguousWordsResults.position(self.currentIndex)
         self.change_word_color(position, UNSELECTED_COLOR, False)
         self.currentIndex = nextIndex
         self.currentIndex = self.currentIndex % len(self.ambiguousWordsResults)
-        position = self.ambiguousWordsResults[self.currentIndex][1]
+        position = self.ambiguousWordsResults.position(self.currentIndex)
+        self.savedPosition = None  # The user moved on, the saved word is no longer restored
+        if self.reviewJournal is not None:
+            self.reviewJournal.record_current(position)
+        self.showPagesAround(self.pages.pageOf(position))  # Load the page of the word before scrolling to it
         self.change_word_color(position, SELECTED_COLOR, True)
         self.scroll_to_word(position)
         self.populateSidePanel()
 
     def populateSidePanel(self):
+        if self.cleanTextLabel is not None:
+            self.cleanTextLabel.deleteLater()
+            self.cleanTextLabel = None
+
+        currentAmbiguousWordId = self.ambiguousWordsResults.word_id(self.currentIndex)
+        group = self.sidePanelGroups.get(currentAmbiguousWordId)
+        if group is None:
+            with span("build_side_panel_group", word_id=currentAmbiguousWordId):
+                group = self.buildOptionGroup(find_ambiguous_word_by_id(self.ambiguousWords, currentAmbiguousWordId))
+            self.sidePanelGroups[currentAmbiguousWordId] = group
+            self.sidePanel.addWidget(group[0])
+        else:
+            self.sidePanelGroups.move_to_end(currentAmbiguousWordId)
+
+        # Swap the visible group, the options of a group shown before start again unselected
+        groupWidget, treeItems = group
+        if self.visibleGroup is not groupWidget:
+            if self.visibleGroup is not None:
+                self.visibleGroup.setVisible(False)
+            groupWidget.setVisible(True)
+            self.visibleGroup = groupWidget
+        for treeItem in treeItems:
+            treeItem[0].setSelected(False)
+        self.treeItems = treeItems
+        self.evictOptionGroups()  # Once the new group is the visible one, so it cannot be evicted
 
-        self.treeItems.clear()
-        self.clearLayout(self.sidePanel)
+        self.currentOptionSelected()
 
-        currentAmbiguousWordId = self.ambiguousWordsResults[self.currentIndex][2]
-        currentAmbiguousWord = find_ambiguous_word_by_id(self.ambiguousWords, currentAmbiguousWordId)
+    def buildOptionGroup(self, ambiguousWord: AmbiguousWord):
+        # Build the options of a word and of its related ambiguities once, in a widget shown again for the same word
+        groupWidget = QWidget()
+        groupLayout = QVBoxLayout(groupWidget)
+        groupLayout.setContentsMargins(0, 0, 0, 0)
+        treeItems = []
 
-        self.addOptionToSidePanel(currentAmbiguousWord, 0)
+        self.addOptionToSidePanel(ambiguousWord, 0, groupLayout, treeItems)
 
         ambiguityCount = 1
-        for ambiguity in currentAmbiguousWord.find_related_ambiguities(self.ambiguousWords):
-            self.addOptionToSidePanel(ambiguity, ambiguityCount)
+        for ambiguity in ambiguousWord.find_related_ambiguities(self.ambiguousWords):
+            self.addOptionToSidePanel(ambiguity, ambiguityCount, groupLayout, treeItems)
             ambiguityCount += 1
 
-        self.currentOptionSelected()
+        groupWidget.setVisible(False)
+        return groupWidget, treeItems
+
+    def evictOptionGroups(self):
+        # Delete the groups shown least recently beyond the cache size, never the one being shown
+        while len(self.sidePanelGroups) > max(1, SIDE_PANEL_CACHE_SIZE):
+            wordId, (groupWidget, _) = next(iter(self.sidePanelGroups.items()))
+            if groupWidget is self.visibleGroup:
+                self.sidePanelGroups.move_to_end(wordId)
+                continue
+            del self.sidePanelGroups[wordId]
+            self.sidePanel.removeWidget(groupWidget)
+            groupWidget.deleteLater()
 
 
 
-    def addOptionToSidePanel(self, ambiguousWord: AmbiguousWord, index):
+    def addOptionToSidePanel(self, ambiguousWord: AmbiguousWord, index, layout, treeItems):
         titleLabel = QLabel(ambiguousWord.Word)
         titleLabel.setStyleSheet("font-weight: bold;")
-        self.sidePanel.addWidget(titleLabel)
+        layout.addWidget(titleLabel)
 
         descriptionLabel = QLabel(ambiguousWord.Meaning)
-        self.sidePanel.addWidget(descriptionLabel)
+        layout.addWidget(descriptionLabel)
 
         optionsTree = QTreeWidget()
         optionsTree.setHeaderHidden(True)
@@ -297,20 +585,20 @@ class DocumentWindow(QWidget):
             for variant in ambiguousWord.Variants:
                 option = QTreeWidgetItem([variant])
                 optionsTree.addTopLevelItem(option)
-                self.treeItems.append((option,index,i))
-                optionsTree.setMinimumHeight(
-                    optionsTree.sizeHintForRow(0) * len(ambiguousWord.Variants) + 10)
+                treeItems.append((option,index,i))
                 i += 1
+            optionsTree.setMinimumHeight(
+                optionsTree.sizeHintForRow(0) * len(ambiguousWord.Variants) + 10)
         else:
             option = QTreeWidgetItem([ambiguousWord.Word])
             optionsTree.addTopLevelItem(option)
-            self.treeItems.append((option,index,0))
+            treeItems.append((option,index,0))
             optionsTree.setMinimumHeight(
                 optionsTree.sizeHintForRow(0) + 10)
 
         optionsTree.itemClicked.connect(self.onItemClicked)
         optionsTree.expandAll()
-        self.sidePanel.addWidget(optionsTree)
+        layout.addWidget(optionsTree)
 
     def onItemClicked(self, item, column):
         # Deselect all items except the one clicked
@@ -325,87 +613,30 @@ class DocumentWindow(QWidget):
                 self.scrollToWidget(treeItem[0].treeWidget())
                # print(f"{treeItem[0].text(column)} option: {treeItem[1]} position: {treeItem[2]}")
                 # results.append((match.group(), start, word.Id, False, -1, -1))
-                resultWord = self.ambiguousWordsResults[self.currentIndex]
-                if resultWord[3] == False:
-                    count_true = len([item for item in self.ambiguousWordsResults if item[3] == True])
-                   # print("Time to count")
-                    #print(count_true)
-                    self.progressLabel.setText(f"confused words checked: {count_true+1}/{len(self.ambiguousWordsResults)}")
-                self.ambiguousWordsResults[self.currentIndex] = (resultWord[0], resultWord[1], resultWord[2], True, treeItem[1], treeItem[2])
+                self.ambiguousWordsResults.resolve(self.currentIndex, treeItem[1], treeItem[2])
+                if self.reviewJournal is not None:
+                    self.reviewJournal.record_decision(self.ambiguousWordsResults.position(self.currentIndex),
+                                                       self.ambiguousWordsResults.word_id(self.currentIndex),
+                                                       treeItem[1], treeItem[2])
+                self.updateProgressLabel()
                 self.updateCurrentWordOnHTMLText(treeItem[0].text(column))
 
-    def clearLayout(self, layout):
-        while layout.count():
-            child = layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-
     def updateCurrentWordOnHTMLText(self, newText):
 
-        position = self.ambiguousWordsResults[self.currentIndex][1]
-        sourceText = self.ambiguousWordsResults[self.currentIndex][0]
+        position = self.ambiguousWordsResults.position(self.currentIndex)
+        sourceText = self.ambiguousWordsResults.word(self.currentIndex)
         newText = self.adapt_case(sourceText, newText)
-
-        script = f"""
-                var element = document.getElementById('{position}');
-                if (element) {{
-                    element.innerText = '{newText}';
-                    element.style.backgroundColor = '#e0ffcd';
-                }}
-                """
-        self.webView.page().runJavaScript(script)
+        self.replacedWords[position] = newText
+        self.queueUpdate(('text', position), {'op': 'text', 'id': str(position), 'text': newText})
 
     def adapt_case(self, source, target):
-        # Uppercase
-        if source.isupper():
-            return target.upper()
-        # Lowercase
-        elif source.islower():
-            return target.lower()
-        # Capitalized
-        elif source.istitle():
-            return target.capitalize()
-        # Handle more specific mixed case scenarios here if needed
-        else:
-            return target
+        return adapt_case(source, target)
 
     def prepareSourceTextForExport(self):
-
-        offset_accumulator = 0
-        text = self.sourceText
-
-        for result in self.ambiguousWordsResults:
-
-            #print(result)
-
-            if result[3] != False:
-                ambiguousWord = find_ambiguous_word_by_id(self.ambiguousWords, result[2])
-                correctWord = ambiguousWord.Word
-                if result[4] > 0:
-                    ambiguities = ambiguousWord.find_related_ambiguities(self.ambiguousWords)
-                    #print(len(ambiguities))
-                    currentAmbiguity = ambiguities[result[4]-1]
-
-                    if not currentAmbiguity.Variants or len(currentAmbiguity.Variants) == 0:
-                        correctWord = currentAmbiguity.Word
-                    else:
-                        correctWord = currentAmbiguity.Variants[result[5]]
-                else:
-                    if not ambiguousWord.Variants or len(ambiguousWord.Variants) == 0:
-                        correctWord = ambiguousWord.Word
-                    else:
-                        correctWord = ambiguousWord.Variants[result[5]]
-
-                correctWord = self.adapt_case(result[0], correctWord)
-
-                # Update the current word's position with the accumulated offset so far
-                current_position = result[1] + offset_accumulator
-
-                # Replace the word and calculate the offset
-                text, offset = replace_word_and_calculate_offset(text, current_position, result[0], correctWord)
-                # Update the offset accumulator
-                offset_accumulator += offset
-
+        # Apply every decision to the source text in a single pass
+        with span("prepare_export", resolved=self.ambiguousWordsResults.resolved_count):
+            edits = build_replacement_edits(self.ambiguousWordsResults, self.ambiguousWords)
+            text, _ = replace_words(self.sourceText, edits)
         return text
 
     def currentOptionSelected(self):
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data_model import CompiledLexicon
+
+"""
+analysis_cache.py
+
+This module stores the ambiguous words found in each paragraph in an on-disk cache, so paragraphs that were already
+analyzed are never sent through spaCy again. Entries are addressed by a hash of the paragraph text, the words around
+it spaCy saw with it, the spaCy model and the lexicon, so editing the lexicon or changing the model simply stops old
+entries from being found, and the cache is kept under a size limit by evicting the least recently used entries.
+Several processes may share the cache file: its total size is kept in the database and updated in the same
+transaction as the entries, and a cache that cannot be read or written only makes the analysis run without it.
+"""
+
+# Bump when the analysis changes in a way that makes cached results stale
+ANALYSIS_CACHE_VERSION = 2
+
+# Fraction of the size limit the cache is brought back to when it overflows, so eviction does not run at every write
+EVICTION_TARGET = 0.9
+
+
+def lexicon_hash(ambiguous_words) -> str:
+    # Hash of the lexicon content, taken from the JSON file of a compiled lexicon when available
+    if isinstance(ambiguous_words, CompiledLexicon) and ambiguous_words.source_hash:
+        return ambiguous_words.source_hash
+    content = json.dumps([word.to_dict() for word in ambiguous_words], sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def analysis_cache_namespace(nlp, ambiguous_words) -> str:
+    """
+    Builds the part of the cache keys that identifies how the paragraphs were analyzed.
+
+    :param nlp: The spaCy language model used for the analysis.
+    :param ambiguous_words: The lexicon searched for.
+    :return: A string combining the cache version, the model name, version and components, and the lexicon hash.
+    """
+    meta = getattr(nlp, 'meta', {}) or {}
+    model = f"{getattr(nlp, 'lang', '')}_{meta.get('name', '')}-{meta.get('version', '')}"
+    components = ','.join(getattr(nlp, 'pipe_names', []))
+    return f"{ANALYSIS_CACHE_VERSION}|{model}|{components}|{lexicon_hash(ambiguous_words)}"
+
+
+class AnalysisCache:
+    """
+    This class represents a size-bounded, least recently used cache of paragraph results stored in SQLite.
+    Results are lists of (start, end, word id) tuples relative to the paragraph. The cache can be shared between the
+    GUI thread and an analysis worker thread, and its file between processes.
+    """
+
+    def __init__(self, path: str, namespace: str, max_bytes: int):
+        self.path = path
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")  # Readers and the writer of other processes do not wait
+        self._connection.execute("BEGIN IMMEDIATE")  # Another process may be creating the tables as well
+        self._connection.execute("CREATE TABLE IF NOT EXISTS paragraphs ("
+                                 "key TEXT PRIMARY KEY, results TEXT NOT NULL, "
+                                 "size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS paragraphs_last_access ON paragraphs (last_access)")
+        # Total size of the entries, shared by every process writing to the file
+        self._connection.execute("CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._connection.execute("INSERT OR IGNORE INTO totals SELECT 'size', COALESCE(SUM(size), 0) FROM paragraphs")
+        self._size = self._read_size()
+        self._connection.commit()
+
+    def __repr__(self):
+        return f"AnalysisCache(path='{self.path}', size={self._size}, max_bytes={self.max_bytes})"
+
+    def key(self, paragraph: str, context_before: str = "", context_after: str = "") -> str:
+        # The words spaCy saw around the paragraph are part of the key, since they may change the tags it gave
+        digest = hashlib.sha256(self.namespace.encode('utf-8'))
+        for part in (paragraph, context_before, context_after):
+            digest.update(b'\0%d\0' % len(part))
+            digest.update(part.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def _read_size(self) -> int:
+        return self._connection.execute("SELECT value FROM totals WHERE name = 'size'").fetchone()[0]
+
+    def _rollback(self):
+        try:
+            self._connection.rollback()
+        except sqlite3.Error:
+            pass
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[Tuple[int, int, int]]]:
+        """
+        Looks up several paragraphs at once and marks the ones found as recently used.
+
+        :param keys: The keys of the paragraphs, as returned by key().
+        :return: A dictionary mapping each key found to its results, empty if the cache cannot be read.
+        """
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            try:
+                for start in range(0, len(keys), 500):  # Stay below SQLite's limit of bound parameters
+                    batch = keys[start:start + 500]
+                    placeholders = ','.join('?' * len(batch))
+                    rows = self._connection.execute(
+                        f"SELECT key, results FROM paragraphs WHERE key IN ({placeholders})", batch).fetchall()
+                    for key, results in rows:
+                        found[key] = [tuple(result) for result in json.loads(results)]
+            except sqlite3.Error as e:
+                # Such as a database locked by another process for too long, every paragraph is analyzed again
+                print(f"Failed to read the analysis cache {self.path}: {e}")
+                return {}
+            if found:
+                try:
+                    now = time.time()
+                    self._connection.execute("BEGIN IMMEDIATE")
+                    self._connection.executemany("UPDATE paragraphs SET last_access = ? WHERE key = ?",
+                                                 [(now, key) for key in found])
+                    self._connection.commit()
+                except sqlite3.Error as e:
+                    self._rollback()  # The entries found are still valid, only their recency is not updated
+                    print(f"Failed to update the analysis cache {self.path}: {e}")
+        return found
+
+    def get(self, key: str) -> Optional[List[Tuple[int, int, int]]]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries: Dict[str, List[Tuple[int, int, int]]]):
+        """
+        Stores the results of several paragraphs, evicting the least recently used ones if the cache grows too large.
+        The entries are simply not stored if the cache cannot be written, such as when the disk is full.
+
+        :param entries: A dictionary mapping paragraph keys to their results.
+        """
+        if not entries:
+            return
+        now = time.time()
+        rows = []
+        for key, results in entries.items():
+            serialized = json.dumps(results, separators=(',', ':'))
+            rows.append((key, serialized, len(key) + len(serialized), now))
+
+        with self._lock:
+            try:
+                # The write lock is taken first, so the total size cannot change under this write
+                self._connection.execute("BEGIN IMMEDIATE")
+                replaced = 0  # Size of the entries overwritten by this write
+                for start in range(0, len(rows), 500):
+                    batch = [row[0] for row in rows[start:start + 500]]
+                    placeholders = ','.join('?' * len(batch))
+                    replaced += self._connection.execute(
+                        f"SELECT COALESCE(SUM(size), 0) FROM paragraphs WHERE key IN ({placeholders})",
+                        batch).fetchone()[0]
+                self._connection.executemany("INSERT OR REPLACE INTO paragraphs VALUES (?, ?, ?, ?)", rows)
+                self._size = self._read_size() + sum(row[2] for row in rows) - replaced
+                if self._size > self.max_bytes:
+                    self._evict()
+                self._connection.execute("UPDATE totals SET value = ? WHERE name = 'size'", (self._size,))
+                self._connection.commit()
+            except sqlite3.Error as e:
+                self._rollback()
+                print(f"Failed to write the analysis cache {self.path}: {e}")
+
+    def put(self, key: str, results: List[Tuple[int, int, int]]):
+        self.put_many({key: results})
+
+    def _evict(self):
+        # Delete the least recently used entries until the cache is back below the target size
+        target = self.max_bytes * EVICTION_TARGET
+        cursor = self._connection.execute("SELECT key, size FROM paragraphs ORDER BY last_access")
+        evicted = []
+        for key, size in cursor:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._connection.executemany("DELETE FROM paragraphs WHERE key = ?", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute("DELETE FROM paragraphs")
+            self._connection.execute("UPDATE totals SET value = 0 WHERE name = 'size'")
+            self._connection.commit()
+            self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def open_analysis_cache(nlp, ambiguous_words, path: str, max_bytes: int) -> Optional[AnalysisCache]:
+    # Open the cache for a model and lexicon, the analysis simply runs without cache if it cannot be opened
+    try:
+        return AnalysisCache(path, analysis_cache_namespace(nlp, ambiguous_words), max_bytes)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Failed to open the analysis cache {path}: {e}")
+        return None
@@ -0,0 +1,276 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from settings import MAX_CHARACTERS, SPACY_MODEL, ANALYSIS_PROFILE, ANALYSIS_BATCH_SIZE, LEXICON_RELOAD_INTERVAL
+
+"""
+analysis_server.py
+
+This module runs ConfuCheck as a local HTTP service, so the spaCy model and the lexicon index are loaded once and shared
+by every tool on the machine. Requests arriving together are coalesced: a single thread collects them for a few
+milliseconds, splits their texts into chunks and sends all the chunks through one nlp.pipe call, then hands each
+request its own findings, identical to what find_ambiguous_words_in_chunks returns for the text. Edits of the lexicon
+file are applied by the same thread between two batches, unless --no-reload is given.
+
+Usage: python main.py serve [--host 127.0.0.1] [--port 8765] [--lexicon path] [--model name] [--profile name]
+                            [--no-reload]
+
+API:
+    POST /analyze  {"text": "..."}  ->  {"results": [[word, position, id], ...]}
+    GET  /health                    ->  {"status": "ok", "requests": n, "batches": n}
+"""
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_WAIT = 0.005  # Seconds a batch waits for more requests after the first one arrives
+MAX_BATCH_REQUESTS = 64  # Requests coalesced at most in one batch
+MAX_BATCH_CHARACTERS = 1000000  # A batch stops taking requests once it holds this many characters
+
+
+class BatchingAnalyzer:
+    """
+    This class represents the analysis thread of the server. Texts submitted from any thread are queued, and the
+    thread analyzes the texts waiting together in a single nlp.pipe batch. With a LexiconReloader, the thread also
+    checks the lexicon file before each batch and when idle, so the lexicon never changes during an analysis.
+    """
+
+    def __init__(self, nlp, lexicon_index, batch_wait=BATCH_WAIT, max_batch_requests=MAX_BATCH_REQUESTS,
+                 max_batch_characters=MAX_BATCH_CHARACTERS, analysis_cache=None, reloader=None):
+        self.nlp = nlp
+        self.lexicon_index = lexicon_index
+        self.batch_wait = batch_wait
+        self.max_batch_requests = max_batch_requests
+        self.max_batch_characters = max_batch_characters
+        self.analysis_cache = analysis_cache
+        self.reloader = reloader
+        self.requests = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="analysis", daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return f"BatchingAnalyzer(requests={self.requests}, batches={self.batches})"
+
+    def submit(self, text) -> Future:
+        # Queue a text, the future receives its sorted result tuples
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def analyze(self, text):
+        return self.submit(text).result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect_batch(self, first):
+        # Take the requests arriving shortly after the first one, within the limits of a batch
+        batch = [first]
+        characters = len(first[0])
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch_requests and characters < self.max_batch_characters:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Stop after this batch
+                break
+            batch.append(item)
+            characters += len(item[0])
+        return batch
+
+    def _reload_lexicon(self):
+        from analysis_cache import analysis_cache_namespace
+
+        try:
+            diff = self.reloader.poll()
+        except Exception as e:
+            # The analysis thread must survive it, or every later request would wait forever for its result
+            print(f"Failed to reload the lexicon: {e}", file=sys.stderr)
+            return
+        if diff:
+            if self.analysis_cache is not None:
+                self.analysis_cache.namespace = analysis_cache_namespace(self.nlp, self.reloader.lexicon)
+            print(f"Lexicon reloaded: {diff}", file=sys.stderr)
+
+    def _run(self):
+        while True:
+            if self.reloader is None:
+                first = self._queue.get()
+            else:
+                try:
+                    first = self._queue.get(timeout=LEXICON_RELOAD_INTERVAL / 1000)
+                except queue.Empty:
+                    self._reload_lexicon()
+                    continue
+                self._reload_lexicon()
+            if first is None:
+                return
+            batch = self._collect_batch(first)
+            try:
+                self._analyze_batch(batch)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _analyze_batch(self, batch):
+        from text_analyzer import analyze_chunks, split_text_into_chunks
+
+        # The chunks of every text, in order, with the index of the request they belong to
+        chunks = []
+        owners = []
+        for request_index, (text, _) in enumerate(batch):
+            for chunk in split_text_into_chunks(text):
+                chunks.append(chunk)
+                owners.append(request_index)
+
+        results = [[] for _ in batch]
+        chunk_results = analyze_chunks(chunks, self.nlp, self.lexicon_index, batch_size=ANALYSIS_BATCH_SIZE,
+                                       n_process=1, analysis_cache=self.analysis_cache)
+        for owner, (_, _, found) in zip(owners, chunk_results):
+            results[owner].extend(found)
+
+        self.requests += len(batch)
+        self.batches += 1
+        for (_, future), found in zip(batch, results):
+            future.set_result(found)
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    # Handles the requests of one connection, self.server.analyzer is the shared BatchingAnalyzer
+
+    protocol_version = "HTTP/1.1"  # Keep connections open between requests
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_json(404, {"error": "Not found."})
+            return
+        analyzer = self.server.analyzer
+        self.send_json(200, {"status": "ok", "requests": analyzer.requests, "batches": analyzer.batches})
+
+    def do_POST(self):
+        if self.path != "/analyze":
+            self.send_json(404, {"error": "Not found."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            text = json.loads(self.rfile.read(length).decode('utf-8'))["text"]
+            if not isinstance(text, str):
+                raise TypeError("'text' must be a string.")
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": f"Invalid request: {e}"})
+            return
+        if len(text) > MAX_CHARACTERS:
+            self.send_json(413, {"error": f"The text exceeds the maximum limit of {MAX_CHARACTERS} characters."})
+            return
+
+        try:
+            results = self.server.analyzer.analyze(text)
+        except Exception as e:
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self.send_json(200, {"results": [[word, position, word_id] for word, position, word_id, *_ in results]})
+
+    def log_message(self, format, *args):
+        pass  # One line per request would slow down the server under load
+
+
+class AnalysisHTTPServer(ThreadingHTTPServer):
+    # A listen backlog of 5, the default, makes the clients of a burst of connections retry after a second
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def create_server(nlp, lexicon_index, host=DEFAULT_HOST, port=DEFAULT_PORT, analysis_cache=None, reloader=None):
+    """
+    Creates the HTTP server and starts its analysis thread; serve_forever() must then be called on it.
+    A LexiconReloader, given with the lexicon lexicon_index belongs to, keeps the lexicon in step with its file.
+
+    :return: The AnalysisHTTPServer, with the BatchingAnalyzer as its analyzer attribute.
+    """
+    server = AnalysisHTTPServer((host, port), AnalysisRequestHandler)
+    server.analyzer = BatchingAnalyzer(nlp, lexicon_index, analysis_cache=analysis_cache, reloader=reloader)
+    return server
+
+
+class AnalysisClient:
+    """
+    A client of the analysis server, returning the same result tuples as find_ambiguous_words.
+    """
+
+    def __init__(self, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=300):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"AnalysisClient(url='{self.url}')"
+
+    def analyze(self, text):
+        request = urllib.request.Request(f"{self.url}/analyze", data=json.dumps({"text": text}).encode('utf-8'),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = json.loads(response.read().decode('utf-8'))
+        return [(word, position, word_id, False, -1, -1) for word, position, word_id in body["results"]]
+
+    def health(self):
+        with urllib.request.urlopen(f"{self.url}/health", timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+
+def build_parser():
+    from batch_cli import DEFAULT_LEXICON_PATH
+
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serve the analysis of texts over HTTP.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST}).")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT}).")
+    parser.add_argument('--lexicon', default=DEFAULT_LEXICON_PATH, help="Path to the lexicon JSON file.")
+    parser.add_argument('--model', default=SPACY_MODEL, help="Name of the spaCy model.")
+    parser.add_argument('--profile', default=ANALYSIS_PROFILE, help="spaCy analysis profile, see nlp_loader.")
+    parser.add_argument('--no-reload', action='store_true', help="Do not apply the edits of the lexicon file.")
+    return parser
+
+
+def main(argv=None):
+    from data_model import load_compiled_lexicon
+    from lexicon_reload import LexiconReloader
+    from nlp_loader import load_nlp
+
+    args = build_parser().parse_args(argv)
+    lexicon = load_compiled_lexicon(args.lexicon)
+    reloader = LexiconReloader(args.lexicon, lexicon) if not args.no_reload and LEXICON_RELOAD_INTERVAL > 0 else None
+    server = create_server(load_nlp(args.model, args.profile), lexicon.index, args.host, args.port, reloader=reloader)
+    print(f"Serving the analysis on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.analyzer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from settings import MAX_CHARACTERS, SPACY_MODEL, ANALYSIS_PROFILE, ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_MAX_BYTES
+
+"""
+batch_cli.py
+
+This module is the headless entry point of ConfuCheck, meant for build pipelines. It checks many .txt and .docx files
+with a pool of worker processes, each one loading the spaCy model and the lexicon once, and streams the ambiguous words
+found as JSON lines. A summary with the throughput is written to stderr.
+
+Usage: python main.py check [options] <file, directory or glob>...
+"""
+
+BATCH_FORMATS = ['.txt', '.docx']  # Formats the batch mode can read
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ambiguous_words.json')
+
+# State of each worker process, loaded once by _init_worker
+_worker = {}
+
+
+def collect_files(patterns):
+    """
+    Expands the files, directories and glob patterns given on the command line into a sorted list of files.
+    Directories are searched recursively for supported formats.
+
+    :param patterns: The paths or glob patterns to expand.
+    :return: The list of files, without duplicates.
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                files.extend(os.path.join(root, name) for name in sorted(names)
+                             if os.path.splitext(name)[1].lower() in BATCH_FORMATS)
+        elif glob.has_magic(pattern):
+            files.extend(path for path in sorted(glob.glob(pattern, recursive=True)) if os.path.isfile(path))
+        else:
+            files.append(pattern)
+    return list(dict.fromkeys(files))
+
+
+def _init_worker(model, profile, lexicon_path, use_cache):
+    # Load the model and the lexicon once per worker process, they are reused for every file
+    from analysis_cache import open_analysis_cache
+    from data_model import load_compiled_lexicon
+    from nlp_loader import load_nlp
+
+    _worker['nlp'] = load_nlp(model, profile)
+    _worker['lexicon'] = load_compiled_lexicon(lexicon_path)
+    _worker['cache'] = open_analysis_cache(_worker['nlp'], _worker['lexicon'], ANALYSIS_CACHE_PATH,
+                                           ANALYSIS_CACHE_MAX_BYTES) if use_cache else None
+
+
+def _check_file(path):
+    # Analyze one file in a worker process, returning the records to print and the number of characters read
+    from text_analyzer import analyze_chunks, split_text_into_chunks
+    from text_io_operations import iter_text_file_chunks, read_document
+
+    lexicon = _worker['lexicon']
+    records = []
+    characters = 0
+    line = 1  # Line of the position the newlines were counted up to
+    line_start = 0  # Position of the first character of that line
+    try:
+        if path.lower().endswith('.docx'):
+            text = read_document(path)
+            if len(text) > MAX_CHARACTERS:
+                raise ValueError(f"The text exceeds the maximum limit of {MAX_CHARACTERS} characters.")
+            chunks = split_text_into_chunks(text)
+        else:
+            # Text files are streamed, the whole file is never held in memory
+            chunks = iter_text_file_chunks(path, max_characters=MAX_CHARACTERS)
+
+        for offset, chunk, results in analyze_chunks(chunks, _worker['nlp'], lexicon.index, n_process=1,
+                                                     analysis_cache=_worker['cache']):
+            counted = 0  # Position in the chunk the newlines were counted up to
+            for word, position, word_id, _, _, _ in results:
+                local = position - offset
+                newlines = chunk.count('\n', counted, local)
+                if newlines:
+                    line += newlines
+                    line_start = offset + chunk.rfind('\n', counted, local) + 1
+                counted = local
+                ambiguous_word = lexicon.find_by_id(word_id)
+                records.append({
+                    'file': path,
+                    'line': line,
+                    'column': position - line_start + 1,
+                    'position': position,
+                    'word': word,
+                    'id': word_id,
+                    'lexicon_word': ambiguous_word.Word,
+                    'confused_with': [related.Word for related in lexicon.find_related(ambiguous_word)],
+                })
+            newlines = chunk.count('\n', counted)
+            if newlines:
+                line += newlines
+                line_start = offset + chunk.rfind('\n', counted) + 1
+            characters += len(chunk)
+    except Exception as e:
+        return [{'file': path, 'error': f"{type(e).__name__}: {e}"}], 0, 0
+    return records, characters, len(records)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py check",
+                                     description="Find ambiguous words in text and Word files and print them as "
+                                                 "JSON lines.")
+    parser.add_argument('paths', nargs='+', help="Files, directories or glob patterns to check.")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: number of CPU cores).")
+    parser.add_argument('-o', '--output', help="Write the JSON lines to this file instead of stdout.")
+    parser.add_argument('--fail-on-findings', action='store_true',
+                        help="Exit with status 1 when any ambiguous word is found.")
+    parser.add_argument('--lexicon', default=DEFAULT_LEXICON_PATH, help="Path to the lexicon JSON file.")
+    parser.add_argument('--model', default=SPACY_MODEL, help="Name of the spaCy model.")
+    parser.add_argument('--profile', default=ANALYSIS_PROFILE, help="spaCy analysis profile, see nlp_loader.")
+    parser.add_argument('--cache', action='store_true', help="Use the on-disk analysis cache.")
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs the batch check.
+
+    :param argv: The command line arguments, without the program name.
+    :return: The exit status: 0 on success, 1 if findings are present and --fail-on-findings is set,
+             2 if a file could not be checked.
+    """
+    args = build_parser().parse_args(argv)
+    files = collect_files(args.paths)
+    if not files:
+        print("No files to check.", file=sys.stderr)
+        return 2
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    jobs = max(1, min(args.jobs, len(files)))
+    total_characters = 0
+    total_findings = 0
+    errors = 0
+    begin = time.perf_counter()
+
+    try:
+        with multiprocessing.Pool(jobs, initializer=_init_worker,
+                                  initargs=(args.model, args.profile, args.lexicon, args.cache)) as pool:
+            # Results are streamed in the order of the files, as soon as each one is checked
+            for records, characters, findings in pool.imap(_check_file, files):
+                for record in records:
+                    output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    errors += 'error' in record
+                output.flush()
+                total_characters += characters
+                total_findings += findings
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - begin
+    print(f"Checked {len(files)} files ({total_characters} characters) with {jobs} workers in {elapsed:.2f} s: "
+          f"{total_characters / elapsed / 1000:.1f} k chars/s, {len(files) / elapsed:.2f} files/s. "
+          f"{total_findings} ambiguous words found, {errors} files failed.", file=sys.stderr)
+
+    if errors:
+        return 2
+    if args.fail_on_findings and total_findings:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import LEXICON_PATH, generate_corpus
+from covered_spans import CoveredSpans
+from data_model import build_lexicon_index, load_ambiguous_words_from_json
+from settings import MAX_CHARACTERS
+from stub_nlp import StubNlp
+from text_analyzer import find_other_words
+
+"""
+bench_coverage.py
+
+Compares the memory and time needed to track covered positions with a per-character set and with CoveredSpans,
+on synthetic documents built like those of bench_suite. The claims are replayed in the order find_ambiguous_words
+makes them: the 'Other' type matches in lexicon order, as find_other_words returns them, then the tokens the lexicon
+index knows, left to right. Three strategies are measured:
+
+    set          the per-character set of the original analyzer, which only checks the start of each span
+    claim        CoveredSpans.claim() called on each span in turn, inserting most spans in the middle of the arrays
+    CoveredSpans claim_by_priority() for the 'Other' matches and a check of the tokens, as the analyzer does
+
+The set does not detect partial overlaps, so it may skip fewer tokens; the two CoveredSpans strategies must agree.
+
+Usage: python benchmarks/bench_coverage.py [--size 10000000] [--densities 0.01 0.1 0.5]
+"""
+
+
+def generate_workload(size, density, ambiguous_words, lexicon_index):
+    # The claims of the analysis of a synthetic text, in the order the analyzer makes them
+    text = generate_corpus(size, density, ambiguous_words)
+    matches = [(start, end) for start, end, _ in find_other_words(text, lexicon_index)]
+    tokens = [(token.idx, token.idx + len(token.text)) for token in StubNlp(lexicon_index)(text)
+              if lexicon_index.find_words_by_lemma_and_pos(token.lemma_, token.pos_)]
+    return matches, tokens
+
+
+def run_set(matches, tokens):
+    covered_positions = set()
+    for start, end in matches:
+        if start not in covered_positions:
+            covered_positions.update(range(start, end))
+    skipped = 0
+    for start, end in tokens:
+        if start in covered_positions:
+            skipped += 1
+        else:
+            covered_positions.update(range(start, end))
+    return covered_positions, skipped
+
+
+def run_claim(matches, tokens):
+    covered_spans = CoveredSpans()
+    for start, end in matches:
+        covered_spans.claim(start, end)
+    skipped = sum(1 for start, end in tokens if not covered_spans.claim(start, end))
+    return covered_spans, skipped
+
+
+def run_spans(matches, tokens):
+    covered_spans = CoveredSpans()
+    covered_spans.claim_by_priority(matches)
+    skipped = 0
+    tokens_end = 0
+    for start, end in tokens:
+        if start < tokens_end or covered_spans.overlaps(start, end):
+            skipped += 1
+        else:
+            tokens_end = end
+    return covered_spans, skipped
+
+
+def measure(label, function, matches, tokens):
+    # Time and memory are measured in separate runs, since tracing allocations slows the code down
+    begin = time.perf_counter()
+    structure, skipped = function(matches, tokens)
+    elapsed = time.perf_counter() - begin
+    del structure
+
+    tracemalloc.start()
+    structure, _ = function(matches, tokens)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del structure
+    print(f"  {label:<14} time: {elapsed:8.3f} s   peak memory: {peak / 2 ** 20:8.2f} MiB   tokens skipped: {skipped}")
+    return skipped
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Compare the ways of tracking the text covered by findings.")
+    parser.add_argument('--size', type=int, default=MAX_CHARACTERS, help="Characters of each synthetic document.")
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.01, 0.1, 0.5],
+                        help="Fractions of words taken from the lexicon in the synthetic documents.")
+    parser.add_argument('--skip-claim', action='store_true', help="Do not measure claim() on each span, the slowest.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    ambiguous_words = load_ambiguous_words_from_json(LEXICON_PATH)
+    lexicon_index = build_lexicon_index(ambiguous_words)
+    for density in args.densities:
+        matches, tokens = generate_workload(args.size, density, ambiguous_words, lexicon_index)
+        print(f"{args.size} characters, density {density}: {len(matches)} 'Other' matches, {len(tokens)} tokens")
+        measure("set", run_set, matches, tokens)
+        skipped = measure("CoveredSpans", run_spans, matches, tokens)
+        if not args.skip_claim and measure("claim", run_claim, matches, tokens) != skipped:
+            print("claim() and claim_by_priority() disagree.", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_model import load_ambiguous_words_from_json
+from nlp_loader import ANALYSIS_PROFILES, load_nlp
+from settings import ANALYSIS_CHUNK_SIZE
+from text_analyzer import find_ambiguous_words_in_chunks
+
+"""
+bench_pipeline_profiles.py
+
+Measures the analysis throughput of each spaCy profile of nlp_loader on a synthetic document, and checks that every
+profile finds the same ambiguous words as the full pipeline. Requires the spaCy model to be installed.
+
+Usage: python benchmarks/bench_pipeline_profiles.py [characters]
+"""
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ambiguous_words.json')
+FILLER_WORDS = ["the", "system", "should", "be", "configured", "before", "users", "can", "open", "report", "and",
+                "results", "are", "stored", "in", "a", "database", "for", "each", "request"]
+
+
+def generate_text(length, ambiguous_words):
+    random.seed(0)
+    vocabulary = FILLER_WORDS * 4 + [variant for word in ambiguous_words for variant in (word.Variants or [word.Word])]
+    sentences = []
+    size = 0
+    while size < length:
+        sentence = " ".join(random.choice(vocabulary) for _ in range(random.randint(6, 20))).capitalize() + "."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+        if random.random() < 0.2:
+            sentences.append("\n")
+    return " ".join(sentences)[:length]
+
+
+if __name__ == "__main__":
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    ambiguous_words = load_ambiguous_words_from_json(LEXICON_PATH)
+    text = generate_text(length, ambiguous_words)
+
+    reference = None
+    for profile in ANALYSIS_PROFILES:
+        nlp = load_nlp(profile=profile)
+        begin = time.perf_counter()
+        results = find_ambiguous_words_in_chunks(text, ambiguous_words, nlp, chunk_size=ANALYSIS_CHUNK_SIZE, n_process=1)
+        elapsed = time.perf_counter() - begin
+        if reference is None:
+            reference = results
+        print(f"{profile:<6} components: {', '.join(nlp.pipe_names)}")
+        print(f"{'':<6} {len(text) / elapsed / 1000:10.1f} k chars/s   {elapsed:8.2f} s   findings: {len(results)}   "
+              f"same as '{next(iter(ANALYSIS_PROFILES))}': {results == reference}")
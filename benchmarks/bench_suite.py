@@ -0,0 +1,199 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_model import build_lexicon_index, load_ambiguous_words_from_json, load_compiled_lexicon
+from html_renderer import render_highlighted_html
+from settings import VIEWER_PAGE_SIZE
+from stub_nlp import StubNlp
+from text_analyzer import find_ambiguous_words_in_chunks
+from text_replacer import build_replacement_edits, replace_words
+
+"""
+bench_suite.py
+
+Times and memory-profiles the main stages of ConfuCheck on synthetic documents of increasing size: loading the lexicon,
+finding the ambiguous words, rendering the highlighted HTML (the whole document and one page of the viewer) and
+applying the decisions for the export. The analysis runs with the deterministic stub of stub_nlp, and with the spaCy
+model when --nlp model or both is given. Every measurement is stored in a JSON file, and a run can be compared against
+a baseline file, failing when a stage got slower or bigger than the allowed threshold.
+
+Time is the median of --repeat runs; the peak memory is measured by tracemalloc in a separate run, since tracing slows
+Python code down unevenly.
+
+Usage: python benchmarks/bench_suite.py [--sizes 10000 ...] [--density 0.05] [--nlp stub|model|both]
+                                        [--output results.json] [--baseline baseline.json] [--threshold 0.2]
+"""
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ambiguous_words.json')
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+NOISE_FLOOR_SECONDS = 0.005  # Stages faster than this in the baseline are too noisy to flag as slower
+FILLER_WORDS = ["the", "system", "should", "be", "configured", "before", "users", "can", "open", "report", "and",
+                "results", "are", "stored", "in", "a", "database", "for", "each", "request", "with", "data"]
+
+
+def generate_corpus(length, density, ambiguous_words, seed=0):
+    """
+    Builds a text of sentences and paragraphs where about a density fraction of the words come from the lexicon.
+
+    :param length: The number of characters of the text.
+    :param density: The fraction of words taken from the lexicon, between 0 and 1.
+    :param ambiguous_words: The lexicon.
+    :param seed: The seed of the random generator, the same arguments always give the same text.
+    :return: The text.
+    """
+    generator = random.Random(seed)
+    surface_forms = [variant for word in ambiguous_words for variant in (word.Variants or [word.Word])]
+    parts = []
+    size = 0
+    while size < length:
+        words = [generator.choice(surface_forms) if generator.random() < density else generator.choice(FILLER_WORDS)
+                 for _ in range(generator.randint(6, 20))]
+        sentence = " ".join(words).capitalize() + (".\n" if generator.random() < 0.2 else ". ")
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)[:length]
+
+
+def measure(function, repeat):
+    # Median time of repeat runs, then the peak memory of one more run under tracemalloc, and the last result
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        begin = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - begin)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak, result
+
+
+def resolve_all(results):
+    # Decide the first option of every word, the heaviest export
+    return [(word, position, word_id, True, 0, 0) for word, position, word_id, _, _, _ in results]
+
+
+def run_suite(sizes, density, nlp_names, repeat):
+    records = []
+
+    def record(stage, nlp_name, size, seconds, peak, findings=None):
+        entry = {"stage": stage, "nlp": nlp_name, "size": size, "density": density, "seconds": seconds,
+                 "peak_bytes": peak, "chars_per_second": size / seconds if size and seconds else None,
+                 "findings": findings}
+        records.append(entry)
+        print(f"{stage:<18} {nlp_name:<6} {size:>10} chars  {seconds * 1000:10.2f} ms  {peak / 1024:10.0f} KiB"
+              + (f"  findings: {findings}" if findings is not None else ""), flush=True)
+
+    seconds, peak, ambiguous_words = measure(lambda: load_ambiguous_words_from_json(LEXICON_PATH), repeat)
+    record("load_lexicon_json", "-", 0, seconds, peak)
+    load_compiled_lexicon(LEXICON_PATH)  # Make sure the cache exists, the stage measures loading it
+    seconds, peak, _ = measure(lambda: load_compiled_lexicon(LEXICON_PATH), repeat)
+    record("load_lexicon_cache", "-", 0, seconds, peak)
+
+    lexicon_index = build_lexicon_index(ambiguous_words)
+    nlps = {}
+    if "stub" in nlp_names:
+        nlps["stub"] = StubNlp(lexicon_index)
+    if "model" in nlp_names:
+        from nlp_loader import load_nlp
+        nlps["model"] = load_nlp()
+
+    for size in sizes:
+        text = generate_corpus(size, density, ambiguous_words)
+        for nlp_name, nlp in nlps.items():
+            seconds, peak, results = measure(
+                lambda: find_ambiguous_words_in_chunks(text, ambiguous_words, nlp, lexicon_index, n_process=1), repeat)
+            record("analyze", nlp_name, size, seconds, peak, len(results))
+
+            seconds, peak, _ = measure(lambda: render_highlighted_html(text, results), repeat)
+            record("highlight_document", nlp_name, size, seconds, peak)
+            page_start = len(text) // 2
+            seconds, peak, _ = measure(
+                lambda: render_highlighted_html(text, results, page_start, page_start + VIEWER_PAGE_SIZE), repeat)
+            record("highlight_page", nlp_name, size, seconds, peak)
+
+            resolved = resolve_all(results)
+            seconds, peak, _ = measure(
+                lambda: replace_words(text, build_replacement_edits(resolved, ambiguous_words)), repeat)
+            record("export", nlp_name, size, seconds, peak)
+    return records
+
+
+def compare(records, baseline_records, threshold, memory_threshold):
+    """
+    Compares a run with a baseline, matching the measurements by stage, nlp, size and density.
+
+    :return: The list of regressions, as messages.
+    """
+    baseline = {(entry["stage"], entry["nlp"], entry["size"], entry["density"]): entry for entry in baseline_records}
+    regressions = []
+    for entry in records:
+        reference = baseline.get((entry["stage"], entry["nlp"], entry["size"], entry["density"]))
+        if reference is None:
+            continue
+        time_ratio = entry["seconds"] / reference["seconds"] if reference["seconds"] else 1.0
+        memory_ratio = entry["peak_bytes"] / reference["peak_bytes"] if reference["peak_bytes"] else 1.0
+        status = []
+        if time_ratio > 1 + threshold and reference["seconds"] >= NOISE_FLOOR_SECONDS:
+            status.append(f"time +{(time_ratio - 1) * 100:.0f}%")
+        if memory_ratio > 1 + memory_threshold:
+            status.append(f"memory +{(memory_ratio - 1) * 100:.0f}%")
+        label = f"{entry['stage']} ({entry['nlp']}, {entry['size']} chars)"
+        print(f"{label:<45} time x{time_ratio:5.2f}  memory x{memory_ratio:5.2f}  "
+              f"{'REGRESSION: ' + ', '.join(status) if status else 'ok'}")
+        if status:
+            regressions.append(f"{label}: {', '.join(status)}")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis, highlighting and export stages.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Document sizes, in characters.")
+    parser.add_argument('--density', type=float, default=0.05, help="Fraction of words taken from the lexicon.")
+    parser.add_argument('--nlp', choices=['stub', 'model', 'both'], default='stub',
+                        help="Analyze with the stub pipeline, the spaCy model or both (default: stub).")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per measurement, the median is kept.")
+    parser.add_argument('--output', help="Write the measurements to this JSON file.")
+    parser.add_argument('--baseline', help="Compare with the measurements of this JSON file.")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Allowed slowdown compared to the baseline, as a fraction (default: 0.2).")
+    parser.add_argument('--memory-threshold', type=float, default=0.2,
+                        help="Allowed growth of the peak memory compared to the baseline (default: 0.2).")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    nlp_names = ['stub', 'model'] if args.nlp == 'both' else [args.nlp]
+    records = run_suite(args.sizes, args.density, nlp_names, max(1, args.repeat))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": records}, file, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(records, json.load(file)["results"], args.threshold, args.memory_threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond the thresholds.", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
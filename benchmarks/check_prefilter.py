@@ -0,0 +1,161 @@
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_cache import open_analysis_cache
+from bench_suite import LEXICON_PATH, generate_corpus
+from data_model import build_lexicon_index, load_ambiguous_words_from_json
+from settings import SPACY_MODEL, ANALYSIS_PROFILE
+from stub_nlp import StubNlp
+from text_analyzer import candidate_pattern, find_ambiguous_words, find_ambiguous_words_in_chunks
+
+"""
+check_prefilter.py
+
+Checks that the candidate prefilter of text_analyzer does not change the results, with the configured spaCy model.
+Every reference document is analyzed with and without the prefilter, in a single pass, in chunks and through the
+analysis cache, and the results must be identical. Two things can make them differ:
+- A surface form of a noun or verb the candidate pattern misses, so its paragraph never reaches spaCy. Every token the
+  lexicon index finds in the full analysis of a document is checked against the pattern.
+- spaCy tagging a word differently than in the whole text, if the words sent around each run of paragraphs, see
+  ANALYSIS_CONTEXT_WORDS, do not cover what its tagger looks at.
+The reference documents are the files of benchmarks/reference_corpus, synthetic texts built like those of bench_suite
+at several densities of lexicon words, and the files given on the command line. The share of the text spaCy no longer
+sees and the time of both runs are reported for each document.
+
+With --nlp stub, whose tags do not depend on the context, only the first cause is checked. tests/test_prefilter.py
+checks the reference corpus the same way, and also compares the tags of every token spaCy sees with the prefilter.
+
+Usage: python benchmarks/check_prefilter.py [--nlp model|stub] [--model name] [--profile name] [--size 200000]
+                                            [--densities 0.001 0.01 0.05] [--chunk-size 5000] [files ...]
+"""
+
+REFERENCE_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reference_corpus')
+
+
+class CountingNlp:
+    # Wraps a pipeline and counts the characters sent through it
+    def __init__(self, nlp):
+        self.nlp = nlp
+        self.characters = 0
+        self.meta = getattr(nlp, 'meta', {})
+        self.lang = getattr(nlp, 'lang', '')
+        self.pipe_names = getattr(nlp, 'pipe_names', [])
+
+    def __call__(self, text):
+        self.characters += len(text)
+        return self.nlp(text)
+
+    def get_pipe(self, name):
+        return self.nlp.get_pipe(name)
+
+    def pipe(self, texts, batch_size=1, n_process=1):
+        def counted():
+            for text in texts:
+                self.characters += len(text)
+                yield text
+        return self.nlp.pipe(counted(), batch_size=batch_size, n_process=n_process)
+
+
+def analyze(method, text, ambiguous_words, nlp, lexicon_index, chunk_size, prefilter):
+    # Run one analysis method and return its results, the time it took and the characters spaCy received
+    counting_nlp = CountingNlp(nlp)
+    begin = time.perf_counter()
+    if method == "single":
+        results = find_ambiguous_words(text, ambiguous_words, counting_nlp, lexicon_index, prefilter=prefilter)
+    elif method == "chunks":
+        results = find_ambiguous_words_in_chunks(text, ambiguous_words, counting_nlp, lexicon_index, chunk_size,
+                                                 n_process=1, prefilter=prefilter)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = open_analysis_cache(counting_nlp, ambiguous_words, os.path.join(directory, "cache.sqlite3"),
+                                        64 * 1024 * 1024)
+            results = find_ambiguous_words_in_chunks(text, ambiguous_words, counting_nlp, lexicon_index, chunk_size,
+                                                     n_process=1, analysis_cache=cache, prefilter=prefilter)
+            cache.close()
+    return results, time.perf_counter() - begin, counting_nlp.characters
+
+
+def find_missed_forms(text, nlp, lexicon_index, pattern):
+    # Tokens of the full analysis the lexicon index knows but the candidate pattern does not match
+    missed = []
+    for token in nlp(text):
+        if lexicon_index.find_words_by_lemma_and_pos(token.lemma_, token.pos_) and not pattern.match(text, token.idx):
+            missed.append((token.text, token.lemma_, token.pos_, token.idx))
+    return missed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Check that the prefilter leaves the analysis results unchanged.")
+    parser.add_argument('files', nargs='*', help="Text files added to the reference documents.")
+    parser.add_argument('--nlp', choices=['model', 'stub'], default='model',
+                        help="Analyze with the spaCy model or the stub pipeline (default: model).")
+    parser.add_argument('--model', default=SPACY_MODEL, help=f"Name of the spaCy model (default: {SPACY_MODEL}).")
+    parser.add_argument('--profile', default=ANALYSIS_PROFILE,
+                        help=f"spaCy analysis profile, see nlp_loader (default: {ANALYSIS_PROFILE}).")
+    parser.add_argument('--size', type=int, default=200_000, help="Characters of each synthetic document.")
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.001, 0.01, 0.05],
+                        help="Fractions of words taken from the lexicon in the synthetic documents.")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="Characters per chunk of the chunked analysis.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    ambiguous_words = load_ambiguous_words_from_json(LEXICON_PATH)
+    lexicon_index = build_lexicon_index(ambiguous_words)
+    if args.nlp == 'model':
+        from nlp_loader import load_nlp
+        nlp = load_nlp(args.model, args.profile)
+    else:
+        nlp = StubNlp(lexicon_index)
+
+    pattern = candidate_pattern(lexicon_index, nlp)
+    if pattern is None:
+        print(f"The surface forms cannot be listed for the pipeline {getattr(nlp, 'pipe_names', [])}: the prefilter "
+              f"sends every paragraph through spaCy, so the results cannot change.")
+        return 0
+
+    documents = []
+    for path in sorted(glob.glob(os.path.join(REFERENCE_CORPUS, '*.txt'))) + args.files:
+        with open(path, encoding='utf-8') as file:
+            documents.append((os.path.basename(path), file.read()))
+    documents += [(f"synthetic, density {density}", generate_corpus(args.size, density, ambiguous_words))
+                  for density in args.densities]
+
+    failures = 0
+    for name, text in documents:
+        missed = find_missed_forms(text, nlp, lexicon_index, pattern)
+        if missed:
+            failures += 1
+            print(f"{name:<28} forms missed by the candidate pattern: {missed[:10]}")
+        for method in ("single", "chunks", "cache"):
+            expected, seconds, characters = analyze(method, text, ambiguous_words, nlp, lexicon_index,
+                                                    args.chunk_size, prefilter=False)
+            results, filtered_seconds, filtered_characters = analyze(method, text, ambiguous_words, nlp,
+                                                                     lexicon_index, args.chunk_size, prefilter=True)
+            identical = results == expected
+            failures += not identical
+            skipped = 1 - filtered_characters / characters if characters else 0.0
+            print(f"{name:<28} {method:<7} findings {len(expected):>6}  spaCy skipped {skipped * 100:5.1f}%  "
+                  f"{seconds * 1000:9.1f} ms -> {filtered_seconds * 1000:9.1f} ms  "
+                  f"{'identical' if identical else 'DIFFERENT'}")
+            if not identical:
+                missing = sorted(set(expected) - set(results))[:5]
+                extra = sorted(set(results) - set(expected))[:5]
+                print(f"    missing with the prefilter: {missing}\n    extra with the prefilter: {extra}")
+
+    if failures:
+        print(f"{failures} checks failed with the prefilter.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
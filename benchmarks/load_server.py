@@ -0,0 +1,78 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_server import DEFAULT_HOST, DEFAULT_PORT, AnalysisClient
+from bench_suite import LEXICON_PATH, generate_corpus
+from data_model import load_ambiguous_words_from_json
+
+"""
+load_server.py
+
+Sends analysis requests to a running analysis server (python main.py serve) from several threads at once, and reports
+the latency percentiles and the throughput. The texts are synthetic documents built like those of bench_suite.
+
+Usage: python benchmarks/load_server.py [--url http://127.0.0.1:8765] [--concurrency 8] [--requests 200] [--size 2000]
+"""
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_load(client, texts, concurrency):
+    """
+    Sends every text once, from concurrency threads.
+
+    :return: A tuple with the sorted latencies in seconds, the elapsed time and the number of findings.
+    """
+    def send(text):
+        begin = time.perf_counter()
+        results = client.analyze(text)
+        return time.perf_counter() - begin, len(results)
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        outcomes = list(executor.map(send, texts))
+    elapsed = time.perf_counter() - begin
+    return sorted(latency for latency, _ in outcomes), elapsed, sum(findings for _, findings in outcomes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the latency and throughput of the analysis server.")
+    parser.add_argument('--url', default=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", help="URL of the server.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Number of requests in flight.")
+    parser.add_argument('--requests', type=int, default=200, help="Number of requests to send.")
+    parser.add_argument('--size', type=int, default=2000, help="Characters of each text.")
+    parser.add_argument('--density', type=float, default=0.05, help="Fraction of words taken from the lexicon.")
+    args = parser.parse_args(argv)
+
+    ambiguous_words = load_ambiguous_words_from_json(LEXICON_PATH)
+    texts = [generate_corpus(args.size, args.density, ambiguous_words, seed) for seed in range(args.requests)]
+    client = AnalysisClient(args.url)
+    client.analyze(texts[0])  # Warm up the connection path before measuring
+
+    before = client.health()
+    latencies, elapsed, findings = run_load(client, texts, max(1, args.concurrency))
+    after = client.health()
+
+    batches = after["batches"] - before["batches"]
+    print(f"{len(texts)} requests of {args.size} characters, concurrency {args.concurrency}: {elapsed:.2f} s")
+    print(f"latency  p50 {percentile(latencies, 0.5) * 1000:8.1f} ms   p90 {percentile(latencies, 0.9) * 1000:8.1f} ms"
+          f"   p99 {percentile(latencies, 0.99) * 1000:8.1f} ms   max {latencies[-1] * 1000:8.1f} ms"
+          f"   mean {statistics.mean(latencies) * 1000:8.1f} ms")
+    print(f"throughput {len(texts) / elapsed:8.1f} requests/s   {len(texts) * args.size / elapsed / 1000:8.1f} k chars/s"
+          f"   {findings} findings   {len(texts) / max(batches, 1):.1f} requests per batch")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import re
+
+"""
+stub_nlp.py
+
+A deterministic stand-in for a spaCy pipeline, for benchmarks and checks that must run offline and give the same
+results on every machine. Tokens are runs of word characters, their lemma is their lowercase text, and their
+part-of-speech tag is the first of NOUN and VERB under which the lexicon holds that lemma, X otherwise. Every token
+spelled like a Noun or Verb entry of the lexicon is therefore reported, which is enough to exercise the analysis
+without the cost and the variability of a statistical model. Its tags do not depend on the context, so checks whose
+results may change with the context, such as check_prefilter, need the real model to be meaningful.
+"""
+
+TOKEN = re.compile(r"\w+")
+
+
+class StubToken:
+    __slots__ = ('text', 'idx', 'lemma_', 'pos_')
+
+    def __init__(self, text, idx, lemma, pos):
+        self.text = text
+        self.idx = idx
+        self.lemma_ = lemma
+        self.pos_ = pos
+
+
+class StubLookups:
+    # Neither suffix rules nor exceptions: the lemma of a token is its lowercased text
+    def has_table(self, name):
+        return False
+
+    def get_table(self, name):
+        raise KeyError(name)
+
+
+class StubLemmatizer:
+    mode = "rule"
+    lookups = StubLookups()
+
+
+class StubNlp:
+    """
+    This class mimics the parts of spacy.Language the analysis uses: calling it, pipe(), get_pipe(), meta and
+    pipe_names.
+    """
+
+    lang = "en"
+    pipe_names = ["stub_tagger"]
+
+    def __init__(self, lexicon_index):
+        self.meta = {"name": "stub", "version": "1"}
+        self._tags = {}  # Lemma -> tag, filled from the lexicon index
+        for lemma, pos in lexicon_index.words_by_lemma_pos:
+            if self._tags.get(lemma) != "NOUN":
+                self._tags[lemma] = pos
+
+    def __repr__(self):
+        return f"StubNlp(lemmas={len(self._tags)})"
+
+    def __call__(self, text):
+        tags = self._tags
+        tokens = []
+        for match in TOKEN.finditer(text):
+            word = match.group()
+            lemma = word.lower()
+            tokens.append(StubToken(word, match.start(), lemma, tags.get(lemma, "X")))
+        return tokens
+
+    def get_pipe(self, name):
+        if name == "lemmatizer":
+            return StubLemmatizer()
+        raise KeyError(name)
+
+    def pipe(self, texts, batch_size=1, n_process=1):
+        for text in texts:
+            yield self(text)
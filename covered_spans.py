@@ -0,0 +1,135 @@
+from array import array
+from bisect import bisect_right
+from heapq import merge
+from typing import List, Sequence, Tuple
+
+"""
+covered_spans.py
+
+This module tracks the spans of text already claimed by a finding. Spans are kept as two sorted arrays of start and end
+positions, so the memory used grows with the number of findings instead of the number of characters they cover, and
+every query is answered with a binary search. Queries usually move left to right through the text, so the position of
+the previous query is remembered and tried first.
+
+Claiming a span in the middle of the arrays shifts everything after it. Spans claimed by priority rather than by
+position, such as the 'Other' type matches taken in lexicon order, go through claim_by_priority, which settles the
+priorities over the spans sorted by position and adds the claimed ones in a single merge.
+"""
+
+
+class CoveredSpans:
+    """
+    This class represents a set of disjoint, half-open [start, end) spans of a text.
+    Spans that would overlap one already claimed are rejected, which keeps both arrays sorted by start and by end.
+    """
+
+    def __init__(self):
+        self.starts = array('q')  # Start position of each span, sorted
+        self.ends = array('q')  # End position of each span, sorted as well since the spans are disjoint
+        self._hint = 0  # Insertion index found by the previous query
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"CoveredSpans(spans={len(self.starts)})"
+
+    def __contains__(self, position: int) -> bool:
+        # A single character is covered if the span on its left ends after it
+        index = self._locate(position) - 1
+        return index >= 0 and self.ends[index] > position
+
+    def _locate(self, position: int) -> int:
+        # Same as bisect_right(self.starts, position), skipping the search when the previous answer still holds
+        starts = self.starts
+        index = self._hint
+        if (index == 0 or starts[index - 1] <= position) and (index == len(starts) or starts[index] > position):
+            return index
+        index = bisect_right(starts, position)
+        self._hint = index
+        return index
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """
+        Checks whether any character of the span [start, end) is already covered, including partial overlaps.
+
+        :param start: The start position of the span.
+        :param end: The end position of the span, excluded.
+        :return: True if the span shares at least one character with a covered span.
+        """
+        index = self._locate(start)
+        if index > 0 and self.ends[index - 1] > start:
+            return True
+        return index < len(self.starts) and self.starts[index] < end
+
+    def claim(self, start: int, end: int) -> bool:
+        """
+        Marks the span [start, end) as covered, unless it overlaps a span that is already covered.
+
+        :param start: The start position of the span.
+        :param end: The end position of the span, excluded.
+        :return: True if the span was claimed, False if it overlaps a covered span.
+        """
+        if self.overlaps(start, end):
+            return False
+        index = self._locate(start)
+        if index == len(self.starts):
+            # Spans are usually claimed left to right, appending avoids shifting the arrays
+            self.starts.append(start)
+            self.ends.append(end)
+        else:
+            self.starts.insert(index, start)
+            self.ends.insert(index, end)
+        self._hint = index + 1
+        return True
+
+    def claim_by_priority(self, spans: Sequence[Tuple[int, int]]) -> List[int]:
+        """
+        Claims spans as claim() would if it was called on each of them in turn, without inserting in the middle of
+        the arrays: the spans are sorted by position, and only the spans of a run of overlapping ones compete.
+
+        :param spans: A list of (start, end) tuples in priority order: a span is claimed unless it overlaps a covered
+                      span or a span claimed before it in the list.
+        :return: The indices in spans of the claimed spans, sorted by position.
+        """
+        claimed = []
+        run = []  # Indices of the spans of the current run of overlapping spans
+        run_end = 0
+        for index in sorted(range(len(spans)), key=spans.__getitem__):
+            start, end = spans[index]
+            if run and start >= run_end:
+                self._settle_run(spans, run, claimed)
+                run = []
+            run.append(index)
+            run_end = max(run_end, end) if len(run) > 1 else end
+        if run:
+            self._settle_run(spans, run, claimed)
+        self._merge([spans[index] for index in claimed])
+        return claimed
+
+    def _settle_run(self, spans, run, claimed):
+        # Claim the spans of a run in priority order, a run is usually a single span
+        if len(run) == 1:
+            if not self.overlaps(*spans[run[0]]):
+                claimed.append(run[0])
+            return
+        run_spans = CoveredSpans()
+        winners = []
+        for index in sorted(run):
+            start, end = spans[index]
+            if not self.overlaps(start, end) and run_spans.claim(start, end):
+                winners.append(index)
+        claimed.extend(sorted(winners, key=spans.__getitem__))
+
+    def _merge(self, spans):
+        # Add disjoint spans sorted by position that overlap no covered span
+        if not spans:
+            return
+        if not self.starts or spans[0][0] >= self.ends[-1]:
+            self.starts.extend(start for start, _ in spans)
+            self.ends.extend(end for _, end in spans)
+            return
+        merged = list(merge(zip(self.starts, self.ends), spans))
+        self.starts = array('q', (start for start, _ in merged))
+        self.ends = array('q', (end for _, end in merged))
+        self._hint = 0
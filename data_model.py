@@ -1,7 +1,12 @@
+import hashlib
 import json
-from typing import List
+import os
+import pickle
+from typing import Dict, List, Optional, Pattern, Tuple
 from enum import Enum
 
+from text_matcher import WordBoundaryMatcher, compile_prefix_pattern
+
 """
 data_model.py
 
@@ -9,6 +14,10 @@ This module defines the core data structures and operations for the ambiguous wo
 - An enumeration to categorize word types in a human-readable format.
 - The AmbiguousWord class to represent words with multiple meanings, including their context, possible meanings, and relationships with other ambiguous words.
 - Functions to load these ambiguous words from and save them to JSON files, facilitating persistence and data exchange.
+- The LexiconIndex class, built once per lexicon, which gives the analyzer constant-time access to the words it looks for,
+  and the pattern of surface forms it uses to skip the paragraphs where no noun or verb of the lexicon can appear.
+- The CompiledLexicon class, which bundles the words with their id table, related words and indexes, and is persisted as
+  a binary cache next to the JSON file so it does not have to be rebuilt at every startup.
 
 These components are essential for identifying, categorizing, and resolving ambiguities in technical writing, making them foundational to the system's functionality.
 """
@@ -27,6 +36,8 @@ class AmbiguousWord:
     It is designed to be a part of a larger system that helps in identifying and resolving ambiguities in technical writing.
     """
 
+    __slots__ = ('Id', 'Word', 'Meaning', 'Type', 'Ambiguities', 'Variants', '_related_words_cache')
+
     def __init__(self, Id: int, Word: str, Meaning: str, Type: int, Ambiguities: List[int], Variants: List[str] = None):
         self.Id = Id  # Unique identifier for the word
         self.Word = Word  # The ambiguous word itself
@@ -38,7 +49,7 @@ class AmbiguousWord:
 
     def __repr__(self):
         return (f"AmbiguousWord(Id={self.Id}, Word='{self.Word}', Meaning='{self.Meaning}', Type={self.Type}, "
-                f"Ambiguities={self.Ambiguities})", f"Variants={self.Variants})")
+                f"Ambiguities={self.Ambiguities}, Variants={self.Variants})")
 
     def find_related_ambiguities(self, words: List['AmbiguousWord']) -> List['AmbiguousWord']:
         """
@@ -58,6 +69,389 @@ class AmbiguousWord:
 
         return self._related_words_cache
 
+    def to_dict(self) -> dict:
+        # The JSON representation of the word, without the cache
+        return {'Id': self.Id, 'Word': self.Word, 'Meaning': self.Meaning, 'Type': self.Type,
+                'Ambiguities': self.Ambiguities, 'Variants': self.Variants}
+
+
+# spaCy part-of-speech tag matched by each word type analyzed with NLP
+POS_TAGS = {
+    TypeReadable.Noun.value: "NOUN",
+    TypeReadable.Verb.value: "VERB",
+}
+
+
+class LexiconIndex:
+    """
+    This class indexes a list of AmbiguousWord instances for the text analyzer.
+    Nouns and verbs are keyed on (lowercased word, spaCy POS tag), so each token costs one dictionary lookup,
+    while 'Other' type words are compiled into a single-pass WordBoundaryMatcher.
+    The surface forms of the nouns and verbs are compiled into a candidate pattern, which finds the places of a text
+    where one of them may start, see candidate_pattern().
+    The index can be updated in place when the lexicon changes, see update().
+    """
+
+    def __init__(self, ambiguous_words: List[AmbiguousWord]):
+        self.words_by_lemma_pos: Dict[Tuple[str, str], List[AmbiguousWord]] = {}
+        self.other_words: List[Optional[AmbiguousWord]] = []  # By pattern index of the matcher, None once removed
+
+        for word in ambiguous_words:
+            if word.Type == TypeReadable.Other.value:
+                self.other_words.append(word)
+            elif word.Type in POS_TAGS:
+                self.words_by_lemma_pos.setdefault(_lemma_pos_key(word), []).append(word)
+
+        self.other_words_matcher = WordBoundaryMatcher([word.Word for word in self.other_words])
+        # Position of each 'Other' word in the lexicon, overlapping matches are claimed in that order
+        self.other_word_ranks: List[int] = list(range(len(self.other_words)))
+        self._candidate_patterns = {}  # InflectionRules -> candidate pattern, or None if it cannot be compiled
+
+    def __repr__(self):
+        return (f"LexiconIndex(lemma_pos_keys={len(self.words_by_lemma_pos)}, "
+                f"other_words={len(self.other_words)})")
+
+    def __getstate__(self):
+        # The candidate patterns belong to the lemmatizers of the running process, they are not cached on disk
+        state = dict(self.__dict__)
+        state['_candidate_patterns'] = {}
+        return state
+
+    def candidate_pattern(self, inflections: 'InflectionRules') -> Optional[Pattern]:
+        """
+        Returns the pattern of the places of a text where a token lemmatized as one of the nouns or verbs may start.
+
+        :param inflections: The rules of the lemmatizer the text is analyzed with.
+        :return: The compiled pattern, see compile_prefix_pattern, or None if the forms of one of the nouns or verbs
+                 cannot be listed, in which case every part of a text may hold one.
+        """
+        if inflections not in self._candidate_patterns:
+            prefixes = [candidate_prefixes(word, inflections) for words in self.words_by_lemma_pos.values()
+                        for word in words]
+            self._candidate_patterns[inflections] = None if None in prefixes else \
+                compile_prefix_pattern(prefix for word_prefixes in prefixes for prefix in word_prefixes)
+        return self._candidate_patterns[inflections]
+
+    def update(self, ambiguous_words: List[AmbiguousWord], removed: List[AmbiguousWord], added: List[AmbiguousWord]):
+        """
+        Applies a change of the lexicon to the index in place, touching only the entries of the words involved.
+        The lemma and POS lists of the affected keys are rebuilt, the patterns of the 'Other' words are removed from
+        and added to the matcher, and the candidate pattern is compiled again if a noun or verb changed.
+
+        :param ambiguous_words: The whole lexicon after the change, in order.
+        :param removed: The words to take out of the index, as they were indexed: removed words and the former
+                        version of the changed ones.
+        :param added: The words to put in the index: new words and the current version of the changed ones.
+        """
+        keys = {_lemma_pos_key(word) for word in removed + added if word.Type in POS_TAGS}
+        if keys:
+            for key in keys:
+                self.words_by_lemma_pos.pop(key, None)
+            for word in ambiguous_words:  # Keep the lexicon order within each list
+                if word.Type in POS_TAGS and _lemma_pos_key(word) in keys:
+                    self.words_by_lemma_pos.setdefault(_lemma_pos_key(word), []).append(word)
+            self._candidate_patterns = {}
+
+        removed_ids = {word.Id for word in removed if word.Type == TypeReadable.Other.value}
+        added_words = [word for word in added if word.Type == TypeReadable.Other.value]
+        if removed_ids or added_words:
+            removed_indexes = [pattern_index for pattern_index, word in enumerate(self.other_words)
+                               if word is not None and word.Id in removed_ids]
+            self.other_words_matcher.remove_patterns(removed_indexes)
+            for pattern_index in removed_indexes:
+                self.other_words[pattern_index] = None
+            self.other_words_matcher.add_patterns([word.Word for word in added_words])
+            self.other_words.extend(added_words)
+
+            positions = {id(word): position for position, word in enumerate(ambiguous_words)}
+            self.other_word_ranks = [positions[id(word)] if word is not None else -1 for word in self.other_words]
+
+    def find_words_by_lemma_and_pos(self, lemma: str, pos: str) -> List[AmbiguousWord]:
+        """
+        Returns the nouns and verbs whose word matches the given lemma and POS tag, in lexicon order.
+
+        :param lemma: The lemma of a token, in any case.
+        :param pos: The spaCy coarse-grained POS tag of the token.
+        :return: A list of matching AmbiguousWord instances, empty if none matches.
+        """
+        return self.words_by_lemma_pos.get((lemma.lower(), pos), [])
+
+
+def _lemma_pos_key(word: AmbiguousWord) -> Tuple[str, str]:
+    return word.Word.lower(), POS_TAGS[word.Type]
+
+
+class InflectionRules:
+    """
+    This class represents the ways a lemmatizer derives the lemma of a noun or verb from its surface form, so the
+    surface forms of a lemma can be listed the other way round:
+    - rules: the suffix rules of each POS tag, as (form suffix, lemma suffix) tuples; a form ending with the form
+      suffix gets the lemma suffix instead, such as ('ied', 'y') for 'carried'.
+    - exceptions: the irregular forms of each (lemma, POS tag) key, such as 'ran' for ('run', 'VERB').
+    - unlisted: the (lemma, POS tag) keys the lemmatizer may give to forms it does not list, such as lemmas set by
+      patterns matching on other attributes than the text.
+    InflectionRules() stands for a lemmatizer whose lemma is always the lowercased form.
+    """
+
+    def __init__(self, rules: Dict[str, List[Tuple[str, str]]] = None,
+                 exceptions: Dict[Tuple[str, str], List[str]] = None, unlisted=()):
+        self.rules = rules or {}
+        self.exceptions = exceptions or {}
+        self.unlisted = frozenset(unlisted)
+
+    def __repr__(self):
+        return (f"InflectionRules(rules={sum(len(rules) for rules in self.rules.values())}, "
+                f"exceptions={len(self.exceptions)}, unlisted={len(self.unlisted)})")
+
+    def forms(self, lemma: str, pos: str) -> Optional[List[str]]:
+        """
+        Lists the lowercased surface forms the lemmatizer may turn into a lemma.
+
+        :param lemma: The lemma, in any case.
+        :param pos: The spaCy coarse-grained POS tag the lemma is looked up with.
+        :return: The forms, the lemma itself first, or None if the lemmatizer may reach the lemma from forms it
+                 does not list.
+        """
+        lemma = lemma.lower()
+        if (lemma, pos) in self.unlisted:
+            return None
+        forms = [lemma]
+        for form_suffix, lemma_suffix in self.rules.get(pos, ()):
+            if lemma.endswith(lemma_suffix):
+                forms.append(lemma[:len(lemma) - len(lemma_suffix)] + form_suffix)
+        forms.extend(self.exceptions.get((lemma, pos), ()))
+        return forms
+
+
+def candidate_prefixes(word: AmbiguousWord, inflections: Optional[InflectionRules]) -> Optional[List[str]]:
+    """
+    Returns the lowercased prefixes one of which starts every token the lemmatizer may turn into the word: the word
+    itself, its variants, and the forms the rules and irregular forms of the lemmatizer lead to, such as 'carried' or
+    'ran'. Spellings the lemmatizer does not know, such as 'counselled', keep the spelling they were written with as
+    their lemma, so they cannot match the word. An 'Other' type word is only found as it is written.
+
+    :param word: A word of the lexicon.
+    :param inflections: The rules of the lemmatizer the text is analyzed with, None if they are unknown.
+    :return: The list of prefixes, without duplicates, or None if they cannot be listed.
+    """
+    if word.Type not in POS_TAGS:
+        return [word.Word.lower()]
+    forms = inflections.forms(word.Word, POS_TAGS[word.Type]) if inflections is not None else None
+    if forms is None:
+        return None
+    forms += [variant.lower() for variant in word.Variants]
+    return list(dict.fromkeys(form for form in forms if form))
+
+
+class LexiconDiff:
+    """
+    This class represents the changes between two versions of a lexicon, as sets of word ids:
+    - added, removed and changed: the words added, removed, or with any field changed.
+    - matching: the words whose occurrences in a text may differ, because they were added, removed, or their Word,
+      Type or Variants changed. Texts only need to be checked again for these words.
+    - options: the words whose options in the side panel changed, so the decisions taken on them no longer apply.
+    """
+
+    __slots__ = ('added', 'removed', 'changed', 'matching', 'options')
+
+    def __init__(self, added=(), removed=(), changed=(), matching=(), options=()):
+        self.added = frozenset(added)
+        self.removed = frozenset(removed)
+        self.changed = frozenset(changed)
+        self.matching = frozenset(matching)
+        self.options = frozenset(options)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return (f"LexiconDiff(added={sorted(self.added)}, removed={sorted(self.removed)}, "
+                f"changed={sorted(self.changed)})")
+
+
+def build_lexicon_index(ambiguous_words: List[AmbiguousWord]) -> LexiconIndex:
+    # Build the analyzer index once per lexicon, a compiled lexicon already holds one.
+    if isinstance(ambiguous_words, CompiledLexicon):
+        return ambiguous_words.index
+    return LexiconIndex(ambiguous_words)
+
+
+def validate_ambiguous_words(ambiguous_words: List[AmbiguousWord]):
+    """
+    Checks the type of every field of the words, as read from a JSON file, before they are compiled.
+
+    :param ambiguous_words: The words to check.
+    :raises ValueError: If a field of a word has the wrong type, naming the word and the field.
+    """
+    types = {word_type.value for word_type in TypeReadable}
+    for position, word in enumerate(ambiguous_words):
+        if not isinstance(word.Id, int) or isinstance(word.Id, bool):
+            problem = "Id must be an integer"
+        elif not isinstance(word.Word, str) or not word.Word:
+            problem = "Word must be a non-empty string"
+        elif not isinstance(word.Meaning, str):
+            problem = "Meaning must be a string"
+        elif not isinstance(word.Type, int) or isinstance(word.Type, bool) or word.Type not in types:
+            problem = f"Type must be one of {sorted(types)}"
+        elif not isinstance(word.Ambiguities, list) or \
+                not all(isinstance(id, int) and not isinstance(id, bool) for id in word.Ambiguities):
+            problem = "Ambiguities must be a list of integers"
+        elif not isinstance(word.Variants, list) or not all(isinstance(variant, str) for variant in word.Variants):
+            problem = "Variants must be a list of strings"
+        else:
+            continue
+        raise ValueError(f"Word {position} (Id {word.Id!r}): {problem}")
+
+
+# Bump when the pickled layout of CompiledLexicon changes, so old caches are rebuilt
+LEXICON_CACHE_VERSION = 4
+LEXICON_CACHE_SUFFIX = '.cache'
+
+
+class CompiledLexicon:
+    """
+    This class represents a lexicon compiled for fast lookups. It keeps the words in lexicon order and can be used
+    wherever a list of AmbiguousWord instances is expected, while also providing:
+    - An id to word table, so a word is found in constant time.
+    - The related words of every word, precomputed in the order find_related_ambiguities returns them.
+    - An index of surface forms, mapping every lowercased word and variant to the words it may stand for.
+    - The LexiconIndex used by the text analyzer.
+    A new version of the lexicon can be applied in place with update(), so every holder of the lexicon or of its
+    index sees the change.
+    """
+
+    __slots__ = ('words', 'words_by_id', 'related_words', 'surface_forms', 'index', 'source_hash')
+
+    def __init__(self, ambiguous_words: List[AmbiguousWord], source_hash: str = ""):
+        self._set_words(ambiguous_words)
+        self.index = LexiconIndex(self.words)
+        self.source_hash = source_hash  # SHA-256 of the JSON file the lexicon was compiled from
+
+    def _set_words(self, ambiguous_words: List[AmbiguousWord]):
+        # Fill every table except the index from the words
+        self.words: Tuple[AmbiguousWord, ...] = tuple(ambiguous_words)
+        self.words_by_id: Dict[int, AmbiguousWord] = {}
+        for word in self.words:
+            self.words_by_id.setdefault(word.Id, word)  # The first word wins, as in find_ambiguous_word_by_id
+
+        positions_by_id: Dict[int, List[int]] = {}
+        for position, word in enumerate(self.words):
+            positions_by_id.setdefault(word.Id, []).append(position)
+
+        # Related words keep the lexicon order, the option indexes stored with the results depend on it
+        self.related_words: Dict[int, Tuple[AmbiguousWord, ...]] = {}
+        for word in self.words:
+            positions = sorted(position for id in set(word.Ambiguities) for position in positions_by_id.get(id, []))
+            related = [self.words[position] for position in positions]
+            word._related_words_cache = related
+            self.related_words[word.Id] = tuple(related)
+
+        self.surface_forms: Dict[str, Tuple[int, ...]] = {}
+        for word in self.words:
+            for form in [word.Word] + word.Variants:
+                ids = self.surface_forms.get(form.lower(), ())
+                if word.Id not in ids:
+                    self.surface_forms[form.lower()] = ids + (word.Id,)
+
+    def update(self, ambiguous_words: List[AmbiguousWord], source_hash: str = "") -> 'LexiconDiff':
+        """
+        Applies a new version of the lexicon in place. Words are matched by Id: unchanged words keep their
+        AmbiguousWord object, changed words are updated in place, and the index is only updated for the words whose
+        Word, Type or Variants changed. The related words of every word are computed again, which also refreshes
+        their _related_words_cache.
+
+        :param ambiguous_words: The words of the new version, in order.
+        :param source_hash: The SHA-256 of the JSON file of the new version.
+        :return: The changes between the two versions.
+        :raises ValueError: If a word of the new version is invalid, see validate_ambiguous_words; the lexicon is then
+                            left as it was.
+        """
+        new_words = list(ambiguous_words)
+        validate_ambiguous_words(new_words)  # Before anything changes, so a bad version cannot be half applied
+        new_by_id = {word.Id: word for word in new_words}
+        if len(new_by_id) != len(new_words) or len(self.words_by_id) != len(self.words):
+            return self._rebuild(new_words, source_hash)  # Words sharing an Id cannot be matched between versions
+        if [word.Id for word in self.words if word.Id in new_by_id] != \
+                [word.Id for word in new_words if word.Id in self.words_by_id]:
+            return self._rebuild(new_words, source_hash)  # Moving words changes which one wins overlapping matches
+
+        old_related = {id: [word.Id for word in related] for id, related in self.related_words.items()}
+        added = set(new_by_id) - set(self.words_by_id)
+        removed = set(self.words_by_id) - set(new_by_id)
+        changed = set()
+        shown = set()  # Changed words whose options in the side panel changed
+        matching = added | removed  # Words whose occurrences in a text may have changed
+        removed_versions = [self.words_by_id[id] for id in removed]
+        added_versions = [new_by_id[id] for id in added]
+
+        words = []
+        for new_word in new_words:
+            word = self.words_by_id.get(new_word.Id)
+            if word is None:
+                words.append(new_word)
+                continue
+            old_values = word.to_dict()
+            new_values = new_word.to_dict()
+            if old_values != new_values:
+                changed.add(word.Id)
+                if any(old_values[field] != new_values[field] for field in ('Word', 'Ambiguities', 'Variants')):
+                    shown.add(word.Id)
+                if any(old_values[field] != new_values[field] for field in ('Word', 'Type', 'Variants')):
+                    matching.add(word.Id)
+                    removed_versions.append(AmbiguousWord(**old_values))
+                    added_versions.append(word)
+                for field, value in new_values.items():
+                    setattr(word, field, value)
+            words.append(word)
+
+        for word in self.words:
+            if word.Id in removed:
+                word._related_words_cache = None
+        self._set_words(words)
+        if removed_versions or added_versions:
+            self.index.update(self.words, removed_versions, added_versions)
+        self.source_hash = source_hash
+
+        # The decisions taken on a word refer to its options by position, which change with its related words
+        options = set(shown)
+        for id, related in self.related_words.items():
+            if [word.Id for word in related] != old_related.get(id) or any(word.Id in shown for word in related):
+                options.add(id)
+        return LexiconDiff(added, removed, changed, matching, options)
+
+    def _rebuild(self, ambiguous_words: List[AmbiguousWord], source_hash: str) -> 'LexiconDiff':
+        # Compile the new version from scratch, keeping the index object, and report every word as changed
+        old_ids = set(self.words_by_id)
+        for word in self.words:
+            word._related_words_cache = None
+        self._set_words(ambiguous_words)
+        self.index.__init__(self.words)
+        self.source_hash = source_hash
+        new_ids = set(self.words_by_id)
+        every_id = old_ids | new_ids
+        return LexiconDiff(new_ids - old_ids, old_ids - new_ids, old_ids & new_ids, every_id, every_id)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __getitem__(self, position):
+        return self.words[position]
+
+    def __repr__(self):
+        return f"CompiledLexicon(words={len(self.words)}, source_hash='{self.source_hash[:12]}')"
+
+    def find_by_id(self, id):
+        return self.words_by_id.get(id)
+
+    def find_related(self, word: AmbiguousWord) -> Tuple[AmbiguousWord, ...]:
+        return self.related_words.get(word.Id, ())
+
+    def find_by_surface_form(self, form: str) -> List[AmbiguousWord]:
+        return [self.words_by_id[id] for id in self.surface_forms.get(form.lower(), ())]
+
 
 def load_ambiguous_words_from_json(file_path: str) -> List[AmbiguousWord]:
     # Load ambiguous words from a JSON file.
@@ -69,8 +463,82 @@ def load_ambiguous_words_from_json(file_path: str) -> List[AmbiguousWord]:
 def save_ambiguous_words_to_json(file_path: str, ambiguous_words: List[AmbiguousWord]):
     # Save ambiguous words to a JSON file.
     with open(file_path, 'w', encoding='utf-8') as file:
-        json_data = [word.__dict__ for word in ambiguous_words]
+        json_data = [word.to_dict() for word in ambiguous_words]
         json.dump(json_data, file, indent=4)
 
+
+def compile_lexicon_from_json(file_path: str) -> CompiledLexicon:
+    # Compile a lexicon straight from its JSON file, without using the binary cache.
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    words = [AmbiguousWord(**word_data) for word_data in json.loads(content.decode('utf-8'))]
+    return CompiledLexicon(words, hashlib.sha256(content).hexdigest())
+
+
+def load_compiled_lexicon(file_path: str) -> CompiledLexicon:
+    """
+    Loads a compiled lexicon from the binary cache stored next to the JSON file, rebuilding the cache when the JSON
+    file changed. The cache is trusted when the modification time and size of the JSON file match; otherwise the hash
+    of its content is compared, so touching the file without editing it does not trigger a rebuild.
+
+    :param file_path: The path to the JSON file of the lexicon.
+    :return: The compiled lexicon.
+    """
+    cache_path = file_path + LEXICON_CACHE_SUFFIX
+    stat = os.stat(file_path)
+
+    header = _read_lexicon_cache(cache_path, header_only=True)
+    if header is not None and (header['mtime_ns'], header['size']) == (stat.st_mtime_ns, stat.st_size):
+        lexicon = _read_lexicon_cache(cache_path)
+        if lexicon is not None:
+            return lexicon
+
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    source_hash = hashlib.sha256(content).hexdigest()
+
+    lexicon = None
+    if header is not None and header['sha256'] == source_hash:
+        # Only the modification time changed, the cached lexicon is still valid
+        lexicon = _read_lexicon_cache(cache_path)
+    if lexicon is None:
+        words = [AmbiguousWord(**word_data) for word_data in json.loads(content.decode('utf-8'))]
+        lexicon = CompiledLexicon(words, source_hash)
+
+    save_compiled_lexicon(cache_path, lexicon, stat)
+    return lexicon
+
+
+def _read_lexicon_cache(cache_path: str, header_only: bool = False):
+    # Read the header or the lexicon of a cache file, or None if the cache is missing, unreadable or outdated
+    try:
+        with open(cache_path, 'rb') as cache:
+            header = pickle.load(cache)
+            if header.get('version') != LEXICON_CACHE_VERSION:
+                return None
+            return header if header_only else pickle.load(cache)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring the lexicon cache {cache_path}: {e}")
+        return None
+
+
+def save_compiled_lexicon(cache_path: str, lexicon: CompiledLexicon, source_stat: os.stat_result):
+    # Write the cache atomically, so a crash never leaves a truncated cache behind
+    header = {'version': LEXICON_CACHE_VERSION, 'mtime_ns': source_stat.st_mtime_ns, 'size': source_stat.st_size,
+              'sha256': lexicon.source_hash}
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, 'wb') as cache:
+            pickle.dump(header, cache, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(lexicon, cache, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, cache_path)
+    except OSError as e:
+        print(f"Failed to write the lexicon cache {cache_path}: {e}")
+
+
 def find_ambiguous_word_by_id(words, id):
+    if isinstance(words, CompiledLexicon):
+        return words.find_by_id(id)
     return next((word for word in words if word.Id == id), None)
\ No newline at end of file
@@ -0,0 +1,215 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from array import array
+from bisect import bisect_right
+from typing import List, Tuple
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+
+"""
+docx_io.py
+
+This module reads the text of Word (.docx) files and writes replacements back into them. The main part of the document
+is streamed through an incremental XML parser, so no object model of the document is built, and the position of every
+text node (w:t) is recorded both in the extracted text and in the XML bytes. Replacements are then written by patching
+the content of those text nodes, leaving every other byte of the package untouched, so the formatting is kept.
+"""
+
+DOCUMENT_PART = 'word/document.xml'
+WORD_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+READ_BLOCK_SIZE = 64 * 1024
+
+# Elements, with the namespace separated by a space as reported by the parser
+_PARAGRAPH = f'{WORD_NAMESPACE} p'
+_TEXT = f'{WORD_NAMESPACE} t'
+_TAB = f'{WORD_NAMESPACE} tab'
+_BREAKS = (f'{WORD_NAMESPACE} br', f'{WORD_NAMESPACE} cr')
+# Text boxes are anchored inside a paragraph run, their paragraphs are left out like python-docx does
+_TEXT_BOX = f'{WORD_NAMESPACE} txbxContent'
+
+
+class DocxDocument:
+    """
+    This class represents the text of a .docx file with its run-level offset map: for every text node, its start and
+    length in the text, and the byte position of its start tag and of the end of its content in word/document.xml.
+    Paragraphs are separated by a newline, tabs and line breaks become tab and newline characters.
+    """
+
+    __slots__ = ('path', 'text', 'node_offsets', 'node_lengths', 'tag_starts', 'content_ends')
+
+    def __init__(self, path: str, text: str, node_offsets: array, node_lengths: array, tag_starts: array,
+                 content_ends: array):
+        self.path = path
+        self.text = text
+        self.node_offsets = node_offsets
+        self.node_lengths = node_lengths
+        self.tag_starts = tag_starts
+        self.content_ends = content_ends
+
+    def __repr__(self):
+        return f"DocxDocument(path='{self.path}', characters={len(self.text)}, text_nodes={len(self.node_offsets)})"
+
+    def nodes_in(self, start: int, end: int) -> List[int]:
+        # Indices of the text nodes sharing at least one character with [start, end)
+        index = max(bisect_right(self.node_offsets, start) - 1, 0)
+        nodes = []
+        while index < len(self.node_offsets) and self.node_offsets[index] < end:
+            if self.node_offsets[index] + self.node_lengths[index] > start:
+                nodes.append(index)
+            index += 1
+        return nodes
+
+
+class _DocumentReader:
+    # Expat handlers building the text and the offset map of word/document.xml
+
+    def __init__(self):
+        self.parser = expat.ParserCreate(namespace_separator=' ')
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start_element
+        self.parser.EndElementHandler = self.end_element
+        self.parser.CharacterDataHandler = self.character_data
+        self.parts = []
+        self.length = 0
+        self.paragraphs = 0
+        self.text_box_depth = 0
+        self.node_start = -1  # Text offset of the text node being read, -1 outside text nodes
+        self.tag_start = 0
+        self.node_offsets = array('q')
+        self.node_lengths = array('q')
+        self.tag_starts = array('q')
+        self.content_ends = array('q')
+
+    def append(self, text):
+        self.parts.append(text)
+        self.length += len(text)
+
+    def start_element(self, name, attributes):
+        if name == _TEXT_BOX:
+            self.text_box_depth += 1
+        elif self.text_box_depth:
+            return
+        elif name == _PARAGRAPH:
+            if self.paragraphs:
+                self.append('\n')
+            self.paragraphs += 1
+        elif name == _TEXT:
+            self.node_start = self.length
+            self.tag_start = self.parser.CurrentByteIndex
+        elif name == _TAB:
+            self.append('\t')
+        elif name in _BREAKS:
+            self.append('\n')
+
+    def end_element(self, name):
+        if name == _TEXT_BOX:
+            self.text_box_depth -= 1
+        elif name == _TEXT and self.node_start >= 0:
+            self.node_offsets.append(self.node_start)
+            self.node_lengths.append(self.length - self.node_start)
+            self.tag_starts.append(self.tag_start)
+            self.content_ends.append(self.parser.CurrentByteIndex)
+            self.node_start = -1
+
+    def character_data(self, data):
+        if self.node_start >= 0:
+            self.append(data)
+
+
+def read_docx(file_path: str) -> DocxDocument:
+    """
+    Streams the text of a .docx file and the position of its text nodes.
+
+    :param file_path: The path to the .docx file to be read.
+    :return: The DocxDocument holding the text and its offset map.
+    """
+    reader = _DocumentReader()
+    with zipfile.ZipFile(file_path) as package, package.open(DOCUMENT_PART) as part:
+        while True:
+            block = part.read(READ_BLOCK_SIZE)
+            reader.parser.Parse(block, not block)
+            if not block:
+                break
+    return DocxDocument(file_path, ''.join(reader.parts), reader.node_offsets, reader.node_lengths, reader.tag_starts,
+                        reader.content_ends)
+
+
+def _patch_nodes(document: DocxDocument, edits: List[Tuple[int, str, str]]) -> dict:
+    # New text of each text node touched by the edits. A word split across runs is written in its first run
+    patches = {}
+    for position, current_word, new_word in sorted(edits):
+        end = position + len(current_word)
+        assert document.text[position:end] == current_word, f"Text at {position} does not match '{current_word}'"
+        for order, node in enumerate(document.nodes_in(position, end)):
+            offset = document.node_offsets[node]
+            local_start = max(position, offset) - offset
+            local_end = min(end, offset + document.node_lengths[node]) - offset
+            patches.setdefault(node, []).append((local_start, local_end, new_word if order == 0 else ''))
+
+    node_texts = {}
+    for node, node_edits in patches.items():
+        offset = document.node_offsets[node]
+        text = document.text[offset:offset + document.node_lengths[node]]
+        for local_start, local_end, replacement in reversed(node_edits):  # Right to left keeps offsets valid
+            text = text[:local_start] + replacement + text[local_end:]
+        node_texts[node] = text
+    return node_texts
+
+
+def _patch_document_part(document: DocxDocument, data: bytes, node_texts: dict) -> bytes:
+    # Replace the content of the patched text nodes, copying the bytes in between unchanged
+    parts = []
+    cursor = 0
+    for node in sorted(node_texts):
+        tag_start = document.tag_starts[node]
+        content_start = data.index(b'>', tag_start) + 1
+        text = node_texts[node]
+        start_tag = data[tag_start:content_start]
+        if text != text.strip() and b'xml:space' not in start_tag:
+            # Leading or trailing spaces are dropped by Word unless they are marked as significant
+            start_tag = start_tag[:-1] + b' xml:space="preserve">'
+        parts.append(data[cursor:tag_start])
+        parts.append(start_tag)
+        parts.append(escape(text).encode('utf-8'))
+        cursor = document.content_ends[node]
+    parts.append(data[cursor:])
+    return b''.join(parts)
+
+
+def _copy_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    # A fresh entry with the same name, date, compression and attributes, since writing an entry updates its ZipInfo
+    copy = zipfile.ZipInfo(info.filename, info.date_time)
+    copy.compress_type = info.compress_type
+    copy.external_attr = info.external_attr
+    copy.create_system = info.create_system
+    copy.file_size = info.file_size
+    return copy
+
+
+def save_docx_with_replacements(document: DocxDocument, target_path: str, edits: List[Tuple[int, str, str]]) -> None:
+    """
+    Writes a copy of the .docx file a document was read from, with words replaced in place in their runs.
+    Every part of the package other than word/document.xml is copied as is.
+
+    :param document: The document returned by read_docx, whose file must not have changed since.
+    :param target_path: The path of the .docx file to write, which may be the source file itself.
+    :param edits: A list of (position, current_word, new_word) tuples, positions referring to document.text.
+    """
+    node_texts = _patch_nodes(document, edits)
+    directory = os.path.dirname(os.path.abspath(target_path))
+    handle, temporary_path = tempfile.mkstemp(suffix='.docx', dir=directory)
+    os.close(handle)
+    try:
+        with zipfile.ZipFile(document.path) as source, zipfile.ZipFile(temporary_path, 'w') as target:
+            for info in source.infolist():
+                if info.filename == DOCUMENT_PART:
+                    target.writestr(_copy_info(info), _patch_document_part(document, source.read(info), node_texts))
+                else:
+                    with source.open(info) as part, target.open(_copy_info(info), 'w') as copy:
+                        shutil.copyfileobj(part, copy, READ_BLOCK_SIZE)
+        os.replace(temporary_path, target_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
@@ -0,0 +1,76 @@
+from html import escape
+
+from settings import SELECTED_COLOR
+
+"""
+html_renderer.py
+
+This module renders a text with its ambiguous words highlighted as HTML. The output is built in a single pass over the
+text and the results, escaping the text as it goes, so the cost grows with the length of the rendered part instead of
+with the number of findings times the length of the document. Any slice of the document can be rendered on its own,
+which lets the viewer paint the part the user is looking at first.
+"""
+
+# The look of the words is set once by the "ambiguous" class of settings.formatHTMLPage, keeping every span short
+SPAN_CLASS = "ambiguous"
+RESOLVED_CLASS = "resolved"  # Added to the words the user already replaced
+
+
+def escape_text_as_html(text):
+    # Escape the characters HTML would interpret and keep the line breaks of the text
+    return escape(text, quote=True).replace('\n', '<br>')
+
+
+def find_first_result(results, position, low=0, high=None):
+    """
+    Finds the index of the first result starting at or after a position, with a binary search.
+
+    :param results: The result tuples, sorted by position.
+    :param position: The position in the text.
+    :return: The index of the first result whose position is greater than or equal to position.
+    """
+    high = len(results) if high is None else high
+    while low < high:
+        middle = (low + high) // 2
+        if results[middle][1] < position:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def render_highlighted_html(text, results, start=0, end=None, selected_index=-1, replacements=None):
+    """
+    Renders a slice of a text as HTML, wrapping each ambiguous word in a span whose id is its position in the text.
+
+    :param text: The whole source text.
+    :param results: The result tuples of the text, sorted by position.
+    :param start: The start of the slice to render.
+    :param end: The end of the slice to render, excluded; the end of the text when omitted.
+    :param selected_index: The index in results of the word shown as selected, -1 for none.
+    :param replacements: Optional dictionary mapping the position of a word to the text shown in its place.
+    :return: The HTML of the slice, with the text escaped and line breaks converted to <br>.
+    """
+    end = len(text) if end is None else end
+    parts = []
+    cursor = start
+
+    index = find_first_result(results, start)
+    while index < len(results) and results[index][1] < end:
+        word, position = results[index][0], results[index][1]
+        if position >= cursor:  # Skip a second result for the same word
+            parts.append(escape_text_as_html(text[cursor:position]))
+            shown = replacements.get(position) if replacements else None
+            classes = SPAN_CLASS if shown is None else f"{SPAN_CLASS} {RESOLVED_CLASS}"
+            if index == selected_index:
+                parts.append(f'<span id="{position}" class="{classes}" '
+                             f'style="color: {SELECTED_COLOR}; font-weight: bold;">')
+            else:
+                parts.append(f'<span id="{position}" class="{classes}">')
+            parts.append(escape_text_as_html(word if shown is None else shown))
+            parts.append('</span>')
+            cursor = position + len(word)
+        index += 1
+
+    parts.append(escape_text_as_html(text[cursor:end]))
+    return ''.join(parts)
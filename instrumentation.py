@@ -0,0 +1,116 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+"""
+instrumentation.py
+
+This module measures where the time goes in ConfuCheck. Stages are wrapped in named spans and quantities such as the
+size of the document or the number of findings are recorded as counters. Nothing is recorded until tracing is enabled,
+with the --trace option of main.py or the CONFUCHECK_TRACE environment variable, in which case the events are written
+as a Chrome trace-event JSON file on exit, to be opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+TRACE_ENVIRONMENT_VARIABLE = "CONFUCHECK_TRACE"
+
+
+class Tracer:
+    """
+    This class represents the recorder of the spans and counters of one process, as trace events.
+    Spans can be recorded from any thread.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.events = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def __repr__(self):
+        return f"Tracer(enabled={self.enabled}, events={len(self.events)})"
+
+    def _timestamp(self):
+        return (time.perf_counter_ns() - self._origin) / 1000  # Microseconds, as trace events expect
+
+    def enable(self, path):
+        # Record events from now on and write them to path when the process exits
+        self.enabled = True
+        self.path = path
+        atexit.register(self.dump)
+
+    def add_span(self, name, start, end, args):
+        event = {"name": name, "ph": "X", "ts": start, "dur": end - start, "pid": os.getpid(),
+                 "tid": threading.get_ident(), "args": args}
+        with self._lock:
+            self.events.append(event)
+
+    def add_counter(self, name, value):
+        event = {"name": name, "ph": "C", "ts": self._timestamp(), "pid": os.getpid(), "args": {name: value}}
+        with self._lock:
+            self.events.append(event)
+
+    def dump(self, path=None):
+        """
+        Writes the events recorded so far as a Chrome trace-event JSON file.
+
+        :param path: The file to write, the one given to enable() when omitted.
+        """
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            events = list(self.events)
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        except OSError as e:
+            print(f"Failed to write the trace {path}: {e}")
+
+
+TRACER = Tracer()
+
+
+@contextmanager
+def _recorded_span(name, args):
+    start = TRACER._timestamp()
+    try:
+        yield
+    finally:
+        TRACER.add_span(name, start, TRACER._timestamp(), args)
+
+
+@contextmanager
+def _no_span():
+    yield
+
+
+def span(name, **args):
+    """
+    Measures the block of a with statement as a named span, when tracing is enabled.
+
+    :param name: The name of the stage.
+    :param args: Values shown with the span, such as the number of characters processed.
+    """
+    if not TRACER.enabled:
+        return _no_span()
+    return _recorded_span(name, args)
+
+
+def counter(name, value):
+    # Record the current value of a quantity, such as the size of the document
+    if TRACER.enabled:
+        TRACER.add_counter(name, value)
+
+
+def enable_tracing(path):
+    TRACER.enable(path)
+
+
+def enable_tracing_from_environment():
+    path = os.environ.get(TRACE_ENVIRONMENT_VARIABLE)
+    if path:
+        enable_tracing(path)
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+from data_model import AmbiguousWord, CompiledLexicon, LexiconDiff, LEXICON_CACHE_SUFFIX, save_compiled_lexicon
+
+"""
+lexicon_reload.py
+
+This module applies the edits made to the lexicon JSON file while ConfuCheck is running. The file is polled: a change of
+its modification time or size is confirmed by hashing its content, and the new version is applied to the loaded
+CompiledLexicon in place, see CompiledLexicon.update, so the spaCy model and everything holding the lexicon stay as
+they are. A file that cannot be read or parsed, such as one saved halfway, or holding a field of the wrong type, is
+ignored until the next change.
+"""
+
+
+class LexiconReloader:
+    """
+    This class represents the watch of a lexicon JSON file for the compiled lexicon loaded from it.
+    """
+
+    def __init__(self, path: str, lexicon: CompiledLexicon):
+        self.path = path
+        self.lexicon = lexicon
+        self._stat = self._read_stat()  # Status of the file when the current version was read
+
+    def __repr__(self):
+        return f"LexiconReloader(path='{self.path}', source_hash='{self.lexicon.source_hash[:12]}')"
+
+    def _read_stat(self):
+        try:
+            return os.stat(self.path)
+        except OSError:
+            return None
+
+    def _is_unchanged(self, stat):
+        previous = self._stat
+        return previous is not None and (stat.st_mtime_ns, stat.st_size) == (previous.st_mtime_ns, previous.st_size)
+
+    def poll(self) -> Optional[LexiconDiff]:
+        """
+        Checks the file and applies its new version to the lexicon if it changed. Must not run while the lexicon or its
+        index is being used by another thread.
+
+        :return: The changes applied, or None if the lexicon did not change.
+        """
+        stat = self._read_stat()
+        if stat is None or self._is_unchanged(stat):
+            return None
+
+        try:
+            with open(self.path, 'rb') as file:
+                content = file.read()
+            source_hash = hashlib.sha256(content).hexdigest()
+            if source_hash == self.lexicon.source_hash:
+                self._stat = stat  # Touched without being edited
+                return None
+            words = [AmbiguousWord(**word_data) for word_data in json.loads(content.decode('utf-8'))]
+            diff = self.lexicon.update(words, source_hash)  # Leaves the lexicon as it was if a word is invalid
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Ignoring the lexicon {self.path} until its next change: {e}")
+            self._stat = stat
+            return None
+
+        self._stat = stat
+        # Keep the binary cache in step, so the next start does not compile the lexicon again. The file is stat'ed
+        # before being read, so a write racing with this one makes the cache fail its check rather than look current
+        save_compiled_lexicon(self.path + LEXICON_CACHE_SUFFIX, self.lexicon, stat)
+        return diff
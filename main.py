@@ -1,20 +1,46 @@
-from data_model import AmbiguousWord, load_ambiguous_words_from_json
+from data_model import AmbiguousWord, load_ambiguous_words_from_json, load_compiled_lexicon
+from instrumentation import enable_tracing, enable_tracing_from_environment, span
 from text_analyzer import find_ambiguous_words
 from text_replacer import replace_word_and_calculate_offset
-import spacy
+from nlp_loader import load_nlp
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTextEdit, QPushButton, QVBoxLayout, QWidget, QFileDialog
-from UI.window_text_input import MainWindow
-
-nlp = spacy.load("en_core_web_sm")
 
 # Path to the JSON file (adjust the path according to your directory structure)
 json_file_path = 'ambiguous_words.json'
 
-# Read the JSON file and convert it into a list of AmbiguousWord objects
-ambiguous_words = load_ambiguous_words_from_json(json_file_path)
 
-app = QApplication(sys.argv)
-window = MainWindow(nlp, ambiguous_words)
-window.show()
-sys.exit(app.exec_())
\ No newline at end of file
+def run_gui():
+    # PyQt is imported here, so the headless mode runs on machines without a display or PyQt
+    from PyQt5.QtWidgets import QApplication
+    from UI.window_text_input import MainWindow
+
+    with span("load_nlp"):
+        nlp = load_nlp()
+
+    # Read the JSON file, or its binary cache, and compile it into a lexicon of AmbiguousWord objects
+    with span("load_lexicon"):
+        ambiguous_words = load_compiled_lexicon(json_file_path)
+
+    app = QApplication(sys.argv)
+    window = MainWindow(nlp, ambiguous_words, json_file_path)
+    window.show()
+    return app.exec_()
+
+
+# Guard the startup code, spaCy worker processes started for chunked analysis may import this module again
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "check":
+        # Headless batch mode: python main.py check <files, directories or globs>
+        from batch_cli import main as run_batch
+        sys.exit(run_batch(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        # Local analysis server: python main.py serve [--port N]
+        from analysis_server import main as run_server
+        sys.exit(run_server(sys.argv[2:]))
+    # python main.py --trace trace.json writes the timing of every stage as a Chrome trace on exit
+    if len(sys.argv) > 2 and sys.argv[1] == "--trace":
+        enable_tracing(sys.argv[2])
+        del sys.argv[1:3]
+    else:
+        enable_tracing_from_environment()
+    sys.exit(run_gui())
@@ -0,0 +1,50 @@
+import spacy
+
+from settings import SPACY_MODEL, ANALYSIS_PROFILE
+
+"""
+nlp_loader.py
+
+This module loads the spaCy model used by the text analyzer. The analyzer only reads token.lemma_, token.pos_ and
+token.idx, so a profile can leave out the components that do not contribute to them, such as the dependency parser
+and the named entity recognizer, which would otherwise run on every document for nothing.
+"""
+
+# Components excluded from the model by each analysis profile
+ANALYSIS_PROFILES = {
+    "full": [],  # Every component of the model
+    "fast": ["parser", "ner"],  # Only what POS tagging and lemmatization need
+}
+
+# A sentence whose tokens must all be tagged and lemmatized by a usable pipeline
+PROBE_TEXT = "The council members cited the principal effects of the new law."
+
+
+def load_nlp(model_name: str = SPACY_MODEL, profile: str = ANALYSIS_PROFILE):
+    """
+    Loads a spaCy model with the components of an analysis profile and verifies it can still feed the analyzer.
+
+    :param model_name: The name of the spaCy model to load.
+    :param profile: The name of the analysis profile, one of ANALYSIS_PROFILES.
+    :return: The loaded spaCy language model.
+    """
+    if profile not in ANALYSIS_PROFILES:
+        raise ValueError(f"Unknown analysis profile '{profile}'. Available profiles: {', '.join(ANALYSIS_PROFILES)}")
+
+    nlp = spacy.load(model_name, exclude=ANALYSIS_PROFILES[profile])
+    verify_nlp(nlp)
+    return nlp
+
+
+def verify_nlp(nlp):
+    """
+    Checks that a spaCy pipeline still produces the token attributes the analyzer reads.
+
+    :param nlp: The spaCy language model to check.
+    :raises RuntimeError: If POS tags or lemmas are missing.
+    """
+    doc = nlp(PROBE_TEXT)
+    missing = [attribute for attribute in ("POS", "LEMMA") if not doc.has_annotation(attribute, require_complete=True)]
+    if missing:
+        raise RuntimeError(f"The spaCy pipeline {nlp.pipe_names} does not set {', '.join(missing)} on every token, "
+                           f"which the text analyzer requires.")
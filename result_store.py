@@ -0,0 +1,110 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, Tuple
+
+"""
+result_store.py
+
+This module keeps the ambiguous words found in a document, and the decisions taken on them, in parallel typed arrays
+instead of one tuple per finding. A finding takes a couple of dozen bytes whatever the document size, a decision
+updates a few array slots in place, and the number of resolved findings is maintained as decisions are taken, so the
+progress shown after each click does not depend on the number of findings.
+"""
+
+ResultTuple = Tuple[str, int, int, bool, int, int]  # (word, position, id, resolved, option, sub_option)
+
+
+class ResultStore:
+    """
+    This class represents the results of the analysis of a text, sorted by position.
+    It behaves as a read-only sequence of (word, position, id, resolved, option, sub_option) tuples, built on access
+    from the arrays and the source text, so code written for the plain result lists keeps working with it.
+    """
+
+    def __init__(self, text: str, results: Iterable[ResultTuple] = ()):
+        self.text = text
+        self.positions = array('q')
+        self.lengths = array('i')
+        self.word_ids = array('i')
+        self.resolved = array('b')
+        self.options = array('i')
+        self.sub_options = array('i')
+        self.resolved_count = 0
+        self.extend(results)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __repr__(self):
+        return f"ResultStore(results={len(self.positions)}, resolved={self.resolved_count})"
+
+    def __getitem__(self, index: int) -> ResultTuple:
+        position = self.positions[index]
+        return (self.text[position:position + self.lengths[index]], position, self.word_ids[index],
+                bool(self.resolved[index]), self.options[index], self.sub_options[index])
+
+    def __iter__(self) -> Iterator[ResultTuple]:
+        for index in range(len(self.positions)):
+            yield self[index]
+
+    @property
+    def unresolved_count(self) -> int:
+        return len(self.positions) - self.resolved_count
+
+    def append(self, result: ResultTuple):
+        word, position, word_id, resolved, option, sub_option = result
+        self.positions.append(position)
+        self.lengths.append(len(word))
+        self.word_ids.append(word_id)
+        self.resolved.append(bool(resolved))
+        self.options.append(option)
+        self.sub_options.append(sub_option)
+        self.resolved_count += bool(resolved)
+
+    def extend(self, results: Iterable[ResultTuple]):
+        # Results must come after the ones already stored, as the chunks of an analysis do
+        for result in results:
+            self.append(result)
+
+    def position(self, index: int) -> int:
+        return self.positions[index]
+
+    def word(self, index: int) -> str:
+        position = self.positions[index]
+        return self.text[position:position + self.lengths[index]]
+
+    def word_id(self, index: int) -> int:
+        return self.word_ids[index]
+
+    def is_resolved(self, index: int) -> bool:
+        return bool(self.resolved[index])
+
+    def resolve(self, index: int, option: int, sub_option: int):
+        """
+        Records the option chosen for a result, in constant time.
+
+        :param index: The index of the result.
+        :param option: The index of the chosen entry: 0 for the word itself, n for its n-th related ambiguity.
+        :param sub_option: The index of the chosen variant of that entry.
+        """
+        if not self.resolved[index]:
+            self.resolved[index] = 1
+            self.resolved_count += 1
+        self.options[index] = option
+        self.sub_options[index] = sub_option
+
+    def unresolve(self, index: int):
+        if self.resolved[index]:
+            self.resolved[index] = 0
+            self.resolved_count -= 1
+        self.options[index] = -1
+        self.sub_options[index] = -1
+
+    def indices(self, resolved: bool) -> Iterator[int]:
+        # Indices of the resolved or of the unresolved results, in order
+        flag = int(resolved)
+        return (index for index, value in enumerate(self.resolved) if value == flag)
+
+    def find_index(self, position: int) -> int:
+        # Index of the first result starting at or after a position
+        return bisect_left(self.positions, position)
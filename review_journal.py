@@ -0,0 +1,176 @@
+import hashlib
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+from analysis_cache import lexicon_hash
+from text_replacer import build_replacement_edits
+
+"""
+review_journal.py
+
+This module saves the decisions taken while reviewing a document, so closing the application loses nothing. Every
+decision, and every move to another word, is appended to a journal file as one fixed-size record, which costs the same
+whatever the number of decisions already taken. There is one journal per document text and lexicon version, since
+the decisions refer to the findings by position and to the options by index. Reopening the same text with the same
+lexicon replays the journal: the last decision taken on each finding is restored, as is the word being reviewed.
+
+A record written halfway, by a crash in the middle of a write, is ignored when the journal is read.
+"""
+
+JOURNAL_MAGIC = b'CFJ1'  # Starts every journal, changes with the record layout
+JOURNAL_SUFFIX = '.journal'
+RECORD = struct.Struct('<Bqiii')  # Kind, position, word id, option, sub-option
+RECORD_DECISION = 1
+RECORD_CURRENT = 2  # The word being reviewed, by position; the other fields are unused
+
+
+class ReviewJournal:
+    """
+    This class represents the append-only journal of the decisions taken on one document.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records = 0  # Records in the file, including the ones overridden by later ones
+        self._file = None
+
+    def __repr__(self):
+        return f"ReviewJournal(path='{self.path}', records={self.records})"
+
+    def load(self) -> Tuple[Dict[Tuple[int, int], Tuple[int, int]], Optional[int]]:
+        """
+        Reads the journal.
+
+        :return: A tuple containing the decisions, as a dictionary from (position, word id) to (option, sub-option),
+                 and the position of the word being reviewed, or None if the journal holds none.
+        """
+        try:
+            with open(self.path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return {}, None
+        except OSError as e:
+            print(f"Failed to read the review journal {self.path}: {e}")
+            return {}, None
+        if not data.startswith(JOURNAL_MAGIC):
+            print(f"Ignoring the review journal {self.path}: unknown format")
+            return {}, None
+
+        decisions = {}
+        current_position = None
+        body = memoryview(data)[len(JOURNAL_MAGIC):]
+        complete = len(body) - len(body) % RECORD.size  # A partly written last record is dropped
+        for kind, position, word_id, option, sub_option in RECORD.iter_unpack(body[:complete]):
+            if kind == RECORD_DECISION:
+                decisions[(position, word_id)] = (option, sub_option)
+            elif kind == RECORD_CURRENT:
+                current_position = position
+        self.records = complete // RECORD.size
+        if complete != len(body):
+            self.compact(decisions, current_position)  # New records must not be appended after a partial one
+        return decisions, current_position
+
+    def _append(self, data: bytes):
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'ab')
+                if self._file.tell() == 0:
+                    self._file.write(JOURNAL_MAGIC)
+            self._file.write(data)
+            self._file.flush()  # Written through to the operating system at every click, so a crash loses nothing
+        except OSError as e:
+            print(f"Failed to write the review journal {self.path}: {e}")
+            return
+        self.records += 1
+
+    def record_decision(self, position: int, word_id: int, option: int, sub_option: int):
+        self._append(RECORD.pack(RECORD_DECISION, position, word_id, option, sub_option))
+
+    def record_current(self, position: int):
+        self._append(RECORD.pack(RECORD_CURRENT, position, 0, 0, 0))
+
+    def compact(self, decisions: Dict[Tuple[int, int], Tuple[int, int]], current_position: Optional[int]):
+        """
+        Replaces the journal with one record per decision, and one for the word being reviewed.
+
+        :param decisions: The decisions, as returned by load().
+        :param current_position: The position of the word being reviewed, or None.
+        """
+        self.close()
+        records = [RECORD.pack(RECORD_DECISION, position, word_id, option, sub_option)
+                   for (position, word_id), (option, sub_option) in sorted(decisions.items())]
+        if current_position is not None:
+            records.append(RECORD.pack(RECORD_CURRENT, current_position, 0, 0, 0))
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary_path, 'wb') as file:
+                file.write(JOURNAL_MAGIC + b''.join(records))
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            print(f"Failed to write the review journal {self.path}: {e}")
+            return
+        self.records = len(records)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def journal_path(directory: str, text: str, ambiguous_words) -> str:
+    # One journal per document text and lexicon version
+    text_hash = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+    return os.path.join(directory, f"{text_hash[:32]}-{lexicon_hash(ambiguous_words)[:16]}{JOURNAL_SUFFIX}")
+
+
+def open_review_journal(directory: str, text: str, ambiguous_words, max_files: int = 0) -> Optional[ReviewJournal]:
+    """
+    Opens the journal of a document for a lexicon version, creating its directory if needed.
+
+    :param directory: The directory of the journals.
+    :param text: The text of the document.
+    :param ambiguous_words: The lexicon the document is reviewed with.
+    :param max_files: The number of journals kept, the least recently written ones are deleted beyond it; 0 keeps all.
+    :return: The journal, or None if the directory cannot be used, in which case the review simply is not saved.
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = journal_path(directory, text, ambiguous_words)
+        if max_files > 0:
+            _prune_journals(directory, max_files, keep=path)
+    except OSError as e:
+        print(f"Failed to open the review journal in {directory}: {e}")
+        return None
+    return ReviewJournal(path)
+
+
+def _prune_journals(directory: str, max_files: int, keep: str):
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(JOURNAL_SUFFIX)]
+    paths = [path for path in paths if path != keep]
+    if len(paths) < max_files:
+        return
+    paths.sort(key=os.path.getmtime)
+    for path in paths[:len(paths) - max_files + 1]:
+        os.remove(path)
+
+
+def restore_decisions(results, decisions, ambiguous_words, start=0):
+    """
+    Applies the decisions read from a journal to the results of an analysis.
+
+    :param results: A ResultStore holding the results.
+    :param decisions: The decisions, as returned by ReviewJournal.load().
+    :param ambiguous_words: The lexicon the results refer to.
+    :param start: The index of the first result to restore, the ones before are left as they are.
+    :return: A dictionary from the position of each restored word to the text replacing it.
+    """
+    restored = []
+    if not decisions:
+        return {}
+    for index in range(start, len(results)):
+        decision = decisions.get((results.position(index), results.word_id(index)))
+        if decision is not None:
+            results.resolve(index, *decision)
+            restored.append(results[index])
+    return {position: new_word for position, _, new_word in build_replacement_edits(restored, ambiguous_words)}
@@ -1,5 +1,7 @@
+import os
+
 MAX_CHARACTERS = 10000000  # Example limit for maximum characters allowed
-ALLOWED_FORMATS = ['.docx','.txt','.doc',]  # List of allowed file formats, extendable for future formats
+ALLOWED_FORMATS = ['.docx','.txt',]  # List of allowed file formats, extendable for future formats
 WINDOW_WIDTH = 1024
 WINDOW_HEIGHT = 768
 FONT_SIZE = 14
@@ -8,11 +10,38 @@ UNSELECTED_COLOR = "#000000"
 BACKGROUND_COLOR = "#faebcd"
 APP_NAME = "ConfuCheck"
 APP_VERSION = "1.0.0"
+SPACY_MODEL = "en_core_web_sm"
+ANALYSIS_PROFILE = "fast"  # spaCy components to load, see nlp_loader.ANALYSIS_PROFILES
+ANALYSIS_CHUNK_SIZE = 100000  # Maximum characters per chunk streamed through spaCy, well below nlp.max_length
+ANALYSIS_BATCH_SIZE = 8  # Number of chunks spaCy processes together
+ANALYSIS_N_PROCESS = -1  # Number of spaCy worker processes for chunked analysis, -1 to use every CPU core
+ANALYSIS_CACHE_ENABLED = True  # Skip spaCy for paragraphs that were already analyzed
+# Words of the text around a part spaCy analyzes on its own, such as the paragraphs missing from the analysis cache.
+# The tagger of the spaCy v3 CNN pipelines looks at 4 tokens on each side of a word, so with at least as many words
+# around it a part is tagged as in the whole text.
+ANALYSIS_CONTEXT_WORDS = 8
+# Skip spaCy for paragraphs holding no surface form of a noun or verb of the lexicon. The paragraphs left are sent with
+# their context, see ANALYSIS_CONTEXT_WORDS; tests/test_prefilter.py checks the results stay the same with the model.
+ANALYSIS_PREFILTER_ENABLED = True
+ANALYSIS_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".confucheck", "analysis_cache.sqlite3")
+ANALYSIS_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Least recently used paragraphs are evicted beyond this size
+VIEWER_PAGE_SIZE = 20000  # Maximum characters per page of the document view, pages are loaded on demand
+VIEWER_PAGES_AROUND = 1  # Pages kept loaded on each side of the current word
+VIEWER_MAX_LOADED_PAGES = 8  # Pages beyond this count are unloaded, the farthest from the current word first
+RESOLVED_COLOR = "#e0ffcd"
+SIDE_PANEL_CACHE_SIZE = 32  # Option groups of the side panel kept built, by lexicon entry
+LEXICON_RELOAD_INTERVAL = 2000  # Milliseconds between checks of the lexicon file for edits, 0 to never reload it
+LIVE_HIGHLIGHTING_ENABLED = False  # Underline the ambiguous words of the input editor while typing
+LIVE_HIGHLIGHTING_DELAY = 400  # Milliseconds without typing before the edited paragraphs are analyzed
+LIVE_HIGHLIGHTING_CACHE_SIZE = 5000  # Results of paragraphs kept for the input editor, by paragraph text
+LIVE_HIGHLIGHTING_MAX_BATCH_CHARACTERS = 50000  # Characters analyzed at most per batch, so a batch stays short
+REVIEW_JOURNAL_ENABLED = True  # Save the decisions taken on a document, and restore them when it is opened again
+REVIEW_JOURNAL_DIRECTORY = os.path.join(os.path.expanduser("~"), ".confucheck", "journals")
+REVIEW_JOURNAL_MAX_FILES = 200  # Journals kept, the least recently written ones are deleted beyond this count
 
-def formatTextAsHTML(text):
+def formatHTMLPage(body, script=""):
     #font_stack = "system-ui, -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Ubuntu, 'Helvetica Neue', sans-serif"
     font_stack = "'Times New Roman', Times, serif"
-    text = text.replace('\n', '<br>')
     return f"""
     <html>
     <head>
@@ -20,10 +49,22 @@ def formatTextAsHTML(text):
             body {{
                 font-family: {font_stack};
             }}
+            .ambiguous {{
+                text-decoration: underline;
+                color: {UNSELECTED_COLOR};
+                background-color: {BACKGROUND_COLOR};
+            }}
+            .page {{
+                display: block;
+            }}
+            .resolved {{
+                background-color: {RESOLVED_COLOR};
+            }}
         </style>
     </head>
     <body>
-        <p>{text}</p>
+        <p>{body}</p>
+        <script>{script}</script>
     </body>
     </html>
     """
\ No newline at end of file
@@ -0,0 +1,117 @@
+import glob
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_cache import open_analysis_cache
+from data_model import build_lexicon_index, load_ambiguous_words_from_json
+from settings import SPACY_MODEL, ANALYSIS_PROFILE, ANALYSIS_CONTEXT_WORDS
+from text_analyzer import _group_parts, _part_docs, candidate_pattern, find_ambiguous_words, \
+    find_ambiguous_words_in_chunks, find_candidate_spans, read_inflection_rules
+
+"""
+test_prefilter.py
+
+Checks with the configured spaCy model that the prefilter of text_analyzer leaves the results unchanged on the
+documents of benchmarks/reference_corpus: every token the lexicon index knows is matched by the candidate pattern, the
+parts sent to spaCy with their context are tagged as in the whole text, and the results of every analysis path are
+the same with and without the prefilter. The analysis cache, which tags the paragraphs it misses with their context
+as well, is checked against the analysis without it.
+
+The tests are skipped when spaCy or the model is not installed. CONFUCHECK_SPACY_MODEL selects another model, by name
+or path.
+"""
+
+spacy = pytest.importorskip("spacy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEXICON_PATH = os.path.join(ROOT, 'ambiguous_words.json')
+REFERENCE_DOCUMENTS = sorted(glob.glob(os.path.join(ROOT, 'benchmarks', 'reference_corpus', '*.txt')))
+MODEL = os.environ.get("CONFUCHECK_SPACY_MODEL", SPACY_MODEL)
+CHUNK_SIZE = 1000  # Small enough to cut every reference document into several chunks
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    from nlp_loader import load_nlp
+    try:
+        return load_nlp(MODEL, ANALYSIS_PROFILE)
+    except OSError:
+        pytest.skip(f"The spaCy model {MODEL} is not installed")
+
+
+@pytest.fixture(scope="module")
+def ambiguous_words():
+    return load_ambiguous_words_from_json(LEXICON_PATH)
+
+
+@pytest.fixture(scope="module")
+def lexicon_index(ambiguous_words):
+    return build_lexicon_index(ambiguous_words)
+
+
+@pytest.fixture(scope="module", params=REFERENCE_DOCUMENTS, ids=os.path.basename)
+def text(request):
+    with open(request.param, encoding='utf-8') as file:
+        return file.read()
+
+
+def test_lemmatizer_forms_are_listed(nlp, lexicon_index):
+    inflections = read_inflection_rules(nlp)
+    assert inflections is not None
+    assert "carried" in inflections.forms("carry", "VERB")
+    assert "ran" in inflections.forms("run", "VERB")
+    assert "lay" in inflections.forms("lie", "VERB")
+    assert candidate_pattern(lexicon_index, nlp) is not None
+
+
+def test_candidate_pattern_matches_every_lexicon_token(text, nlp, lexicon_index):
+    pattern = candidate_pattern(lexicon_index, nlp)
+    missed = [(token.text, token.lemma_, token.pos_) for token in nlp(text)
+              if lexicon_index.find_words_by_lemma_and_pos(token.lemma_, token.pos_)
+              and not pattern.match(text, token.idx)]
+    assert missed == []
+
+
+def test_parts_are_tagged_as_in_the_whole_text(text, nlp, lexicon_index):
+    tags = {token.idx: (token.pos_, token.lemma_) for token in nlp(text)}
+    groups = _group_parts(text, find_candidate_spans(text, candidate_pattern(lexicon_index, nlp)),
+                          ANALYSIS_CONTEXT_WORDS)
+    different = []
+    for group, doc in zip(groups, nlp.pipe(text[context_start:context_end] for context_start, context_end, _ in groups)):
+        for start, tokens in _part_docs(group, doc):
+            # A run of whitespace cut by the edge of a part is not a word, its tags do not matter
+            different += [(token.text, start + token.idx) for token in tokens
+                          if not token.is_space and tags[start + token.idx] != (token.pos_, token.lemma_)]
+    assert different == []
+
+
+def test_single_pass_results_are_identical(text, nlp, ambiguous_words, lexicon_index):
+    expected = find_ambiguous_words(text, ambiguous_words, nlp, lexicon_index, prefilter=False)
+    assert find_ambiguous_words(text, ambiguous_words, nlp, lexicon_index, prefilter=True) == expected
+
+
+def test_chunked_results_are_identical(text, nlp, ambiguous_words, lexicon_index):
+    expected = find_ambiguous_words_in_chunks(text, ambiguous_words, nlp, lexicon_index, CHUNK_SIZE, n_process=1,
+                                              prefilter=False)
+    assert find_ambiguous_words_in_chunks(text, ambiguous_words, nlp, lexicon_index, CHUNK_SIZE, n_process=1,
+                                          prefilter=True) == expected
+
+
+@pytest.mark.parametrize("prefilter", [False, True])
+def test_cached_results_are_identical(text, nlp, ambiguous_words, lexicon_index, prefilter, tmp_path):
+    expected = find_ambiguous_words_in_chunks(text, ambiguous_words, nlp, lexicon_index, CHUNK_SIZE, n_process=1,
+                                              prefilter=False)
+    cache = open_analysis_cache(nlp, ambiguous_words, str(tmp_path / "cache.sqlite3"), 64 * 1024 * 1024)
+    # Every other paragraph is cached first, so the analysis mixes cached paragraphs and runs of missing ones
+    paragraphs = text.split('\n')
+    partial = '\n'.join(paragraph if index % 2 else '' for index, paragraph in enumerate(paragraphs))
+    find_ambiguous_words_in_chunks(partial, ambiguous_words, nlp, lexicon_index, CHUNK_SIZE, n_process=1,
+                                   analysis_cache=cache, prefilter=prefilter)
+    for _ in range(2):  # Cold for the missing paragraphs, then warm
+        assert find_ambiguous_words_in_chunks(text, ambiguous_words, nlp, lexicon_index, CHUNK_SIZE, n_process=1,
+                                              analysis_cache=cache, prefilter=prefilter) == expected
+    cache.close()
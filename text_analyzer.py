@@ -1,60 +1,662 @@
-from data_model import AmbiguousWord, TypeReadable
-from typing import List
+from analysis_cache import AnalysisCache
+from covered_spans import CoveredSpans
+from data_model import AmbiguousWord, CompiledLexicon, InflectionRules, LexiconDiff, LexiconIndex, POS_TAGS, \
+    build_lexicon_index, candidate_prefixes
+from instrumentation import counter, span
+from text_matcher import compile_prefix_pattern
+from settings import ANALYSIS_CHUNK_SIZE, ANALYSIS_BATCH_SIZE, ANALYSIS_N_PROCESS, ANALYSIS_PREFILTER_ENABLED, \
+    ANALYSIS_CONTEXT_WORDS
+from typing import List, Optional, Pattern, Sized
+from bisect import bisect_left
+from itertools import tee
+import os
 import re
+import sys
+import weakref
 
 """
 text_analyzer.py
 
-This module handles analysis of text for ambiguous words using regex and spaCy NLP. 
+This module handles analysis of text for ambiguous words using a multi-pattern matcher and spaCy NLP. 
 It identifies words with multiple meanings and categorizes them based on context and part of speech. 
 This aids in enhancing clarity in technical documents by resolving linguistic ambiguities.
+Long documents can be analyzed in chunks cut at paragraph or sentence boundaries and streamed through nlp.pipe,
+which spreads the work across processes and keeps every chunk below spaCy's max_length. With an analysis cache,
+paragraphs that were already analyzed, in this text or an earlier one, are not sent through spaCy again. The runs of
+paragraphs that still have to be analyzed are sent with the words around them, see ANALYSIS_CONTEXT_WORDS, so spaCy
+tags them as it would in the whole chunk.
+With the prefilter, paragraphs where no surface form of a noun or verb of the lexicon appears are not sent through
+spaCy either, since only 'Other' type words, matched without spaCy, can be found there. The surface forms are listed
+from the rules of the lemmatizer of the pipeline, see read_inflection_rules, and the runs of paragraphs left are sent
+with their context as well, so the results are the same as without the prefilter.
 """
 
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+WHITESPACE = re.compile(r'\s+')
+CONTEXT_WORD = re.compile(r'\S+')
 
-def find_ambiguous_words(text, ambiguous_words: List[AmbiguousWord], nlp):
+
+def find_other_words(text, lexicon_index: LexiconIndex):
+    """
+    Finds every 'Other' type word of the lexicon in the text with a single scan.
+
+    :param text: The text in which to find the words.
+    :param lexicon_index: The index of the lexicon, holding the compiled matcher for 'Other' type words.
+    :return: A list of (start, end, AmbiguousWord) tuples, in the order a one-regex-per-word search would visit them:
+             by position in the lexicon first and by start position second.
+    """
+    ranks = lexicon_index.other_word_ranks
+    matches = [(ranks[pattern_index], start, end, pattern_index)
+               for start, end, pattern_index in lexicon_index.other_words_matcher.iter_matches(text)]
+    matches.sort()
+    return [(start, end, lexicon_index.other_words[pattern_index]) for _, start, end, pattern_index in matches]
+
+
+_inflection_rules = weakref.WeakKeyDictionary()  # Pipeline -> its InflectionRules, or None
+
+
+def read_inflection_rules(nlp) -> Optional[InflectionRules]:
+    """
+    Reads how the lemmatizer of a spaCy pipeline derives the lemmas of nouns and verbs, so the surface forms of the
+    nouns and verbs of the lexicon can be listed, see InflectionRules. Only a rule-based lemmatizer can be read: its
+    suffix rules and exception tables, and the lemmas the attribute ruler sets on the texts its patterns list.
+
+    :param nlp: An initialized spaCy language model.
+    :return: The rules, or None if the pipeline lemmatizes in another way, in which case every paragraph goes through
+             spaCy.
+    """
+    try:
+        return _inflection_rules[nlp]
+    except (KeyError, TypeError):
+        pass
+
+    inflections = None
+    try:
+        lemmatizer = nlp.get_pipe("lemmatizer")
+    except (AttributeError, KeyError):
+        lemmatizer = None
+    if getattr(lemmatizer, 'mode', None) == "rule":
+        lookups = lemmatizer.lookups
+        rules_table = lookups.get_table("lemma_rules") if lookups.has_table("lemma_rules") else {}
+        exceptions_table = lookups.get_table("lemma_exc") if lookups.has_table("lemma_exc") else {}
+        rules = {}
+        exceptions = {}
+        unlisted = set()
+        for tag in POS_TAGS.values():
+            rules[tag] = [(form_suffix, lemma_suffix) for form_suffix, lemma_suffix in rules_table.get(tag.lower(), [])]
+            for form, lemmas in exceptions_table.get(tag.lower(), {}).items():
+                for lemma in lemmas:
+                    exceptions.setdefault((lemma.lower(), tag), []).append(form.lower())
+        for lemma, forms in _attribute_ruler_lemmas(nlp):
+            for tag in POS_TAGS.values():  # The rule may set any POS tag as well
+                if forms is None:
+                    unlisted.add((lemma.lower(), tag))
+                else:
+                    exceptions.setdefault((lemma.lower(), tag), []).extend(form.lower() for form in forms)
+        inflections = InflectionRules(rules, exceptions, unlisted)
+
+    try:
+        _inflection_rules[nlp] = inflections
+    except TypeError:
+        pass  # Not weakly referenceable, read again next time
+    return inflections
+
+
+def _attribute_ruler_lemmas(nlp):
+    # The lemmas set by the attribute ruler, with the texts of the tokens they are set on, or None if the pattern
+    # does not match on the text
+    try:
+        patterns = nlp.get_pipe("attribute_ruler").patterns
+    except (AttributeError, KeyError):
+        return
+    for rule in patterns:
+        lemma = rule.get("attrs", {}).get("LEMMA")
+        if not isinstance(lemma, str):
+            continue
+        for pattern in rule.get("patterns", []):
+            try:
+                token = pattern[rule.get("index", 0)]
+            except IndexError:
+                continue
+            forms = []
+            for key in ("ORTH", "LOWER", "TEXT", "NORM"):
+                value = token.get(key)
+                if isinstance(value, dict):
+                    value = value.get("IN")
+                if isinstance(value, str):
+                    forms.append(value)
+                elif isinstance(value, list):
+                    forms.extend(value)
+                if forms:
+                    break
+            yield lemma, forms or None
+
+
+def candidate_pattern(lexicon_index: LexiconIndex, nlp) -> Optional[Pattern]:
+    """
+    Returns the pattern of the places of a text where a token nlp may lemmatize as a noun or verb of the lexicon
+    starts, see LexiconIndex.candidate_pattern.
+
+    :param lexicon_index: The index of the lexicon.
+    :param nlp: An initialized spaCy language model.
+    :return: The compiled pattern, or None if the surface forms cannot be listed for this pipeline.
+    """
+    inflections = read_inflection_rules(nlp)
+    return None if inflections is None else lexicon_index.candidate_pattern(inflections)
+
+
+def find_candidate_spans(text, pattern: Pattern):
+    """
+    Finds the parts of a text spaCy has to analyze: the runs of consecutive paragraphs where a surface form of a noun
+    or verb of the lexicon starts. The other paragraphs can only hold 'Other' type words.
+
+    :param text: The text to filter.
+    :param pattern: The pattern of the surface forms, as returned by candidate_pattern.
+    :return: A list of (start, end) tuples in text order, each run ending after the newline of its last paragraph.
+    """
+    return _find_paragraphs_matching(text, pattern)
+
+
+def _find_paragraphs_matching(text, pattern):
+    # Runs of consecutive paragraphs where the pattern matches, as (start, end) tuples
+    spans = []
+    match = pattern.search(text)
+    while match:
+        start = text.rfind('\n', 0, match.start()) + 1
+        end = text.find('\n', match.end()) + 1 or len(text)
+        if spans and spans[-1][1] == start:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+        match = pattern.search(text, end)  # The rest of the paragraph is already selected
+    return spans
+
+
+def find_ambiguous_words_in_docs(text, docs, lexicon_index: LexiconIndex, offset=0):
+    """
+    Identifies the ambiguous words of a text whose parts that may hold nouns and verbs were processed by spaCy.
+
+    :param text: The text that was processed.
+    :param docs: A list of (start, doc) tuples, the spaCy Doc produced for each part of the text, or the list of its
+                 tokens to search, and the position of that part in the text; token positions are remapped with it.
+    :param lexicon_index: The index of the lexicon to search for.
+    :param offset: The position of the text in the whole document, added to every reported position.
+    :return: A list of result tuples sorted by position, as returned by find_ambiguous_words.
+    """
+    results = []
+    covered_spans = CoveredSpans()
+
+    # Search for 'Other' type words with one scan of the text, the first words of the lexicon take precedence
+    with span("match_other_words", characters=len(text)):
+        matches = find_other_words(text, lexicon_index)
+        for index in covered_spans.claim_by_priority([(start, end) for start, end, _ in matches]):
+            start, end, word = matches[index]
+            results.append((text[start:end], start + offset, word.Id, False, -1, -1))
+
+    # Use spaCy NLP to find and categorize nouns and verbs
+    # Tokens come left to right and do not overlap, so instead of being claimed between the 'Other' words they are
+    # only checked against those and against the end of the last token taken
+    with span("match_tokens", tokens=sum(len(doc) for _, doc in docs)):
+        tokens_end = 0
+        for doc_start, doc in docs:
+            for token in doc:
+                words = lexicon_index.find_words_by_lemma_and_pos(token.lemma_, token.pos_)
+                if not words:
+                    continue
+
+                start = doc_start + token.idx
+                end = start + len(token.text)
+                if start < tokens_end or covered_spans.overlaps(start, end):
+                    continue  # Skip if any character of this token is already covered
+
+                for word in words:
+                    results.append((token.text, start + offset, word.Id, False, -1, -1))
+                tokens_end = end
+
+    results.sort(key=lambda x: x[1])
+    return results
+
+
+def find_ambiguous_words_in_doc(text, doc, lexicon_index: LexiconIndex, offset=0):
+    """
+    Identifies the ambiguous words of a text that has already been processed by spaCy.
+
+    :param text: The text that was processed.
+    :param doc: The spaCy Doc produced for the text.
+    :param lexicon_index: The index of the lexicon to search for.
+    :param offset: The position of the text in the whole document, added to every reported position.
+    :return: A list of result tuples sorted by position, as returned by find_ambiguous_words.
+    """
+    return find_ambiguous_words_in_docs(text, [(0, doc)], lexicon_index, offset)
+
+
+def find_ambiguous_words(text, ambiguous_words: List[AmbiguousWord], nlp, lexicon_index: LexiconIndex = None,
+                         prefilter=ANALYSIS_PREFILTER_ENABLED):
     """
     Identifies and returns a list of ambiguous words found in the provided text, based on a list of AmbiguousWord instances.
-    It distinguishes between different types of words (e.g., nouns, verbs, others) using both regular expressions and spaCy NLP analysis,
+    It distinguishes between different types of words (e.g., nouns, verbs, others) using both a multi-pattern matcher and spaCy NLP analysis,
     to ensure accurate matching according to the word type and context.
 
     :param text: The text in which to find ambiguous words.
     :param ambiguous_words: A list of AmbiguousWord instances to search for in the text.
     :param nlp: An initialized spaCy language model for natural language processing.
+    :param lexicon_index: The index built from ambiguous_words; it is built on the fly when omitted.
+    :param prefilter: Only send spaCy the paragraphs where a surface form of a noun or verb appears, see
+                      find_candidate_spans. Each run of such paragraphs is sent with the words around it, see
+                      ANALYSIS_CONTEXT_WORDS, so it is tagged as in the whole text.
     :return: A sorted list of tuples, each containing the matched word, its start position in the text, and its ID from the ambiguous words list.
 
-    The function first searches for 'other' types of words using regular expressions for exact matches.
-    Then, it uses spaCy's tokenization and part-of-speech tagging to identify nouns and verbs accurately.
+    The function first searches for 'other' types of words with a single-pass multi-pattern matcher for exact matches.
+    Then, it uses spaCy's tokenization and part-of-speech tagging to identify nouns and verbs accurately,
+    looking each token up in the lexicon index by lemma and POS tag.
+    A match is skipped when any of its characters is already claimed by an earlier one.
     Results are sorted by the start position of each found word to maintain their order in the text.
     """
+    if lexicon_index is None:
+        lexicon_index = build_lexicon_index(ambiguous_words)
 
-    results = []
-    covered_positions = set()
-
-    # Search for 'Other' type words using regular expressions
-    for word in ambiguous_words:
-        if word.Type == TypeReadable.Other.value:
-            pattern = re.compile(r'\b' + re.escape(word.Word) + r'\b', re.IGNORECASE)
-            matches = pattern.finditer(text)
-            for match in matches:
-                start = match.start()
-                if start not in covered_positions:
-                    results.append((match.group(), start, word.Id, False, -1, -1))
-                    covered_positions.update(range(start, match.end()))
+    pattern = candidate_pattern(lexicon_index, nlp) if prefilter else None
+    if pattern is None:
+        with span("spacy", characters=len(text)):
+            doc = nlp(text)
+        return find_ambiguous_words_in_doc(text, doc, lexicon_index)
 
-    # Use spaCy NLP to find and categorize nouns and verbs
-    doc = nlp(text)
+    groups = _group_parts(text, find_candidate_spans(text, pattern), ANALYSIS_CONTEXT_WORDS)
+    with span("spacy", characters=sum(context_end - context_start for context_start, context_end, _ in groups)):
+        docs = nlp.pipe(text[context_start:context_end] for context_start, context_end, _ in groups)
+        docs = [entry for group, doc in zip(groups, docs) for entry in _part_docs(group, doc)]
+    return find_ambiguous_words_in_docs(text, docs, lexicon_index)
+
+
+def _find_split_position(text, start, limit):
+    # Cut after the last sentence boundary before the limit, or after the last whitespace, or at the limit itself
+    for pattern in (SENTENCE_BOUNDARY, WHITESPACE):
+        split_position = None
+        for match in pattern.finditer(text, start, limit):
+            split_position = match.end()
+        if split_position is not None and split_position < limit:
+            return split_position
+    return limit
+
+
+def split_text_into_chunks(text, max_chunk_size=ANALYSIS_CHUNK_SIZE):
+    """
+    Splits a text into consecutive chunks of at most max_chunk_size characters, cut at paragraph boundaries.
+    Paragraphs longer than max_chunk_size are cut at sentence boundaries, or at whitespace as a last resort.
+
+    :param text: The text to split.
+    :param max_chunk_size: The maximum number of characters of a chunk.
+    :return: A list of (offset, chunk) tuples; joining the chunks gives back the original text.
+    """
+    chunks = []
+    chunk_start = 0
+    length = len(text)
+
+    while chunk_start < length:
+        limit = chunk_start + max_chunk_size
+        if limit >= length:
+            chunk_end = length
+        else:
+            # Keep the newline with the paragraph it ends, so every chunk starts at the beginning of a paragraph
+            chunk_end = text.rfind('\n', chunk_start, limit) + 1
+            if chunk_end <= chunk_start:
+                chunk_end = _find_split_position(text, chunk_start, limit)
+        chunks.append((chunk_start, text[chunk_start:chunk_end]))
+        chunk_start = chunk_end
+
+    return chunks
+
+
+def split_paragraphs(text):
+    # Split a text after every newline, returning (offset, paragraph) tuples that keep their newline
+    paragraphs = []
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start) + 1 or len(text)
+        paragraphs.append((start, text[start:end]))
+        start = end
+    return paragraphs
+
+
+def _context_bounds(text, start, end, words):
+    # Widen the part [start, end) of a text by whole words on each side, so spaCy analyzing it on its own sees the
+    # tokens its tagger looks at around the edges of the part. Every word holds at least one token.
+    context_start = start
+    if words > 0 and start > 0:
+        window = 16 * words
+        while True:
+            window_start = max(0, start - window)
+            starts = [match.start() for match in CONTEXT_WORD.finditer(text, window_start, start)]
+            if len(starts) > words or window_start == 0:  # The first word may be cut by the window
+                context_start = starts[-words] if len(starts) >= words else 0
+                break
+            window *= 4
+    context_end = end
+    if words > 0:
+        for count, match in enumerate(CONTEXT_WORD.finditer(text, end), 1):
+            context_end = match.end()
+            if count == words:
+                break
+    return context_start, context_end
+
+
+def _group_parts(text, parts, words):
+    # Widen each (start, end) part of a text, in text order, by its context and merge the parts whose widened ranges
+    # overlap, returning (context start, context end, parts) tuples; spaCy analyzes each group as one text
+    groups = []
+    for start, end in parts:
+        context_start, context_end = _context_bounds(text, start, end, words)
+        if groups and context_start <= groups[-1][1]:
+            groups[-1][1] = max(context_end, groups[-1][1])
+            groups[-1][2].append((start, end))
+        else:
+            groups.append([context_start, context_end, [(start, end)]])
+    return [tuple(group) for group in groups]
+
+
+def _split_tokens(doc, parts):
+    # The tokens of a doc starting in each (start, end) part, given in order and relative to the doc
+    tokens = [[] for _ in parts]
+    index = 0
     for token in doc:
-        start = token.idx
-        end = start + len(token.text)
-        if start in covered_positions:
-            continue  # Skip if this start position is already covered
-
-        for word in ambiguous_words:
-            if word.Type != TypeReadable.Other.value and token.lemma_.lower() == word.Word.lower():
-                if (word.Type == TypeReadable.Noun.value and token.pos_ == "NOUN") or \
-                        (word.Type == TypeReadable.Verb.value and token.pos_ == "VERB"):
-                    results.append((token.text, start, word.Id, False, -1, -1))
-                    covered_positions.update(range(start, end))
+        while token.idx >= parts[index][1]:
+            index += 1
+            if index == len(parts):
+                return tokens
+        if token.idx >= parts[index][0]:
+            tokens[index].append(token)
+    return tokens
 
-    results.sort(key=lambda x: x[1])
+
+def _part_docs(group, doc):
+    # The (start, tokens) entries of a group analyzed by spaCy, as find_ambiguous_words_in_docs takes them: the tokens
+    # of each of its parts, without those of its context
+    context_start, context_end, parts = group
+    if parts == [(context_start, context_end)]:
+        return [(context_start, doc)]
+    tokens = _split_tokens(doc, [(start - context_start, end - context_start) for start, end in parts])
+    return [(context_start, part_tokens) for part_tokens in tokens]
+
+
+def _effective_n_process(n_process, units):
+    if n_process == -1:
+        n_process = os.cpu_count() or 1
+    return max(1, min(n_process, units))  # Starting processes is only worth it with enough units of work
+
+
+def analyze_chunks(chunks, nlp, lexicon_index: LexiconIndex, batch_size=ANALYSIS_BATCH_SIZE,
+                   n_process=ANALYSIS_N_PROCESS, analysis_cache: AnalysisCache = None,
+                   prefilter=ANALYSIS_PREFILTER_ENABLED):
+    """
+    Streams chunks through nlp.pipe and yields the ambiguous words of each chunk as soon as it is ready.
+
+    :param chunks: A list of (offset, chunk) tuples, as returned by split_text_into_chunks, or an iterator of them,
+                   as returned by text_io_operations.iter_text_file_chunks, consumed as the analysis goes.
+    :param nlp: An initialized spaCy language model for natural language processing.
+    :param lexicon_index: The index of the lexicon to search for.
+    :param batch_size: The number of chunks spaCy processes together.
+    :param n_process: The number of processes spaCy uses, -1 for one per CPU core, never more than the chunks.
+    :param analysis_cache: A cache of paragraph results; when given, the chunks are analyzed paragraph by paragraph
+                           and only the runs of paragraphs missing from the cache go through spaCy, with the words
+                           around them, so the results are the same as without cache. The cache lookups are batched
+                           over the whole text, so an iterator of chunks is read entirely first.
+    :param prefilter: Only send spaCy the paragraphs where a surface form of a noun or verb appears, see
+                      find_candidate_spans.
+    :return: An iterator of (offset, chunk, results) tuples in text order, where results hold global positions.
+    """
+    pattern = candidate_pattern(lexicon_index, nlp) if prefilter else None
+    if analysis_cache is not None:
+        yield from _analyze_chunks_with_cache(list(chunks), nlp, lexicon_index, batch_size, n_process, analysis_cache,
+                                              pattern)
+        return
+
+    # A stream of chunks cannot be counted, it is assumed to be long enough for every process
+    n_process = _effective_n_process(n_process, len(chunks) if isinstance(chunks, Sized) else sys.maxsize)
+    if pattern is not None:
+        chunks = ((offset, chunk, _group_parts(chunk, find_candidate_spans(chunk, pattern), ANALYSIS_CONTEXT_WORDS))
+                  for offset, chunk in chunks)
+    else:
+        chunks = ((offset, chunk, [(0, len(chunk), [(0, len(chunk))])]) for offset, chunk in chunks)
+    chunks, texts = tee(chunks)  # Only the chunks spaCy has read ahead are buffered
+    docs = nlp.pipe((chunk[context_start:context_end] for _, chunk, groups in texts
+                     for context_start, context_end, _ in groups), batch_size=batch_size, n_process=n_process)
+    for offset, chunk, groups in chunks:
+        with span("spacy", characters=sum(context_end - context_start for context_start, context_end, _ in groups)):
+            chunk_docs = [entry for group in groups for entry in _part_docs(group, next(docs))]
+        results = find_ambiguous_words_in_docs(chunk, chunk_docs, lexicon_index, offset)
+        counter("chunk_findings", len(results))
+        yield offset, chunk, results
+
+
+def _paragraph_results(paragraph, docs, lexicon_index: LexiconIndex):
+    # Results of a paragraph as stored in the analysis cache, (start, end, word id) tuples relative to the paragraph
+    return [(start, start + len(word), word_id)
+            for word, start, word_id, _, _, _ in find_ambiguous_words_in_docs(paragraph, docs, lexicon_index)]
+
+
+def _analyze_chunks_with_cache(chunks, nlp, lexicon_index: LexiconIndex, batch_size, n_process,
+                               analysis_cache: AnalysisCache, pattern, context_words=ANALYSIS_CONTEXT_WORDS):
+    # Results of every paragraph by key, relative to the paragraph, as (start, end, word id) tuples
+    known = {}
+    paragraphs_by_chunk = []
+    for offset, chunk in chunks:
+        paragraphs = []
+        for start, paragraph in split_paragraphs(chunk):
+            end = start + len(paragraph)
+            if not paragraph.strip():
+                key = analysis_cache.key(paragraph)
+                known[key] = []  # Blank lines cannot hold any word
+            elif pattern is not None and not pattern.search(paragraph):
+                key = analysis_cache.key(paragraph)
+                if key not in known:  # No noun or verb, spaCy is not needed
+                    known[key] = _paragraph_results(paragraph, [], lexicon_index)
+            else:
+                # The tags spaCy gives may depend on the words around the paragraph, they are part of the key
+                context_start, context_end = _context_bounds(chunk, start, end, context_words)
+                key = analysis_cache.key(paragraph, chunk[context_start:start], chunk[end:context_end])
+            paragraphs.append((start, paragraph, key))
+        paragraphs_by_chunk.append(paragraphs)
+
+    keys = {key for paragraphs in paragraphs_by_chunk for _, _, key in paragraphs if key not in known}
+    with span("cache_lookup", paragraphs=len(keys)):
+        known.update(analysis_cache.get_many(keys))
+
+    # Paragraphs to analyze, each one once even if it appears several times in the text. Consecutive ones are grouped
+    # with their context and tagged together, as the chunk would have been.
+    queued = set()
+    groups_by_chunk = []
+    for (_, chunk), paragraphs in zip(chunks, paragraphs_by_chunk):
+        missing = {}
+        for start, paragraph, key in paragraphs:
+            if key not in known and key not in queued:
+                queued.add(key)
+                missing[start] = (paragraph, key)
+        parts = [(start, start + len(paragraph)) for start, (paragraph, _) in missing.items()]
+        groups_by_chunk.append([(context_start, context_end, [(start, missing[start]) for start, _ in group_parts])
+                                for context_start, context_end, group_parts in _group_parts(chunk, parts,
+                                                                                            context_words)])
+
+    n_process = _effective_n_process(n_process, sum(map(len, groups_by_chunk)) // max(batch_size, 1))
+    docs = nlp.pipe((chunk[context_start:context_end] for (_, chunk), groups in zip(chunks, groups_by_chunk)
+                     for context_start, context_end, _ in groups), batch_size=batch_size, n_process=n_process)
+
+    for (offset, chunk), paragraphs, groups in zip(chunks, paragraphs_by_chunk, groups_by_chunk):
+        # Groups are sent in text order, so the ones of this chunk are the next ones out of the pipe
+        new_entries = {}
+        for context_start, context_end, group_paragraphs in groups:
+            with span("spacy", characters=context_end - context_start):
+                doc = next(docs)
+            parts = [(start - context_start, start - context_start + len(paragraph))
+                     for start, (paragraph, _) in group_paragraphs]
+            for (start, (paragraph, key)), tokens in zip(group_paragraphs, _split_tokens(doc, parts)):
+                known[key] = new_entries[key] = _paragraph_results(paragraph, [(context_start - start, tokens)],
+                                                                   lexicon_index)
+        with span("cache_store", paragraphs=len(new_entries)):
+            analysis_cache.put_many(new_entries)
+
+        results = []
+        for paragraph_start, paragraph, key in paragraphs:
+            for start, end, word_id in known[key]:
+                results.append((paragraph[start:end], offset + paragraph_start + start, word_id, False, -1, -1))
+        counter("chunk_findings", len(results))
+        yield offset, chunk, results
+
+
+def iter_ambiguous_words_by_chunk(text, ambiguous_words: List[AmbiguousWord], nlp, lexicon_index: LexiconIndex = None,
+                                  chunk_size=ANALYSIS_CHUNK_SIZE, batch_size=ANALYSIS_BATCH_SIZE,
+                                  n_process=ANALYSIS_N_PROCESS, analysis_cache: AnalysisCache = None,
+                                  prefilter=ANALYSIS_PREFILTER_ENABLED):
+    """
+    Splits a text into chunks and yields the ambiguous words of each chunk as soon as it is ready, see analyze_chunks.
+
+    :param text: The text in which to find ambiguous words.
+    :param ambiguous_words: A list of AmbiguousWord instances to search for in the text.
+    :param nlp: An initialized spaCy language model for natural language processing.
+    :param lexicon_index: The index built from ambiguous_words; it is built on the fly when omitted.
+    :param chunk_size: The maximum number of characters of a chunk, see split_text_into_chunks.
+    :param batch_size: The number of chunks spaCy processes together.
+    :param n_process: The number of processes spaCy uses, -1 for one per CPU core.
+    :param analysis_cache: A cache of paragraph results, see analyze_chunks.
+    :param prefilter: Only send spaCy the paragraphs that may hold a noun or verb, see analyze_chunks.
+    :return: An iterator of (offset, chunk, results) tuples in text order, where results hold global positions.
+    """
+    if lexicon_index is None:
+        lexicon_index = build_lexicon_index(ambiguous_words)
+
+    chunks = split_text_into_chunks(text, chunk_size)
+    return analyze_chunks(chunks, nlp, lexicon_index, batch_size, n_process, analysis_cache, prefilter)
+
+
+def find_ambiguous_words_in_chunks(text, ambiguous_words: List[AmbiguousWord], nlp, lexicon_index: LexiconIndex = None,
+                                   chunk_size=ANALYSIS_CHUNK_SIZE, batch_size=ANALYSIS_BATCH_SIZE,
+                                   n_process=ANALYSIS_N_PROCESS, analysis_cache: AnalysisCache = None,
+                                   prefilter=ANALYSIS_PREFILTER_ENABLED):
+    """
+    Chunked counterpart of find_ambiguous_words for long documents, see iter_ambiguous_words_by_chunk.
+    Matches never span a paragraph, so the results are the same as a single pass, except where spaCy tags a word
+    differently because the text across a chunk boundary is no longer part of its context.
+
+    :return: A sorted list of result tuples, as returned by find_ambiguous_words.
+    """
+    results = []
+    for _, _, chunk_results in iter_ambiguous_words_by_chunk(text, ambiguous_words, nlp, lexicon_index,
+                                                             chunk_size, batch_size, n_process, analysis_cache,
+                                                             prefilter):
+        results.extend(chunk_results)
     return results
+
+
+def reanalyze_after_edit(text, results, edit_start, edit_end, replacement, nlp, lexicon_index: LexiconIndex,
+                         analysis_cache: AnalysisCache = None):
+    """
+    Updates the results of an analysis after a part of the text is replaced, re-analyzing only the paragraphs the edit
+    touches instead of the whole text.
+
+    :param text: The text the results were computed on.
+    :param results: The sorted result tuples of the previous analysis of text.
+    :param edit_start: The start position of the replaced range in text.
+    :param edit_end: The end position of the replaced range in text, excluded.
+    :param replacement: The text inserted in place of the range.
+    :param nlp: An initialized spaCy language model for natural language processing.
+    :param lexicon_index: The index of the lexicon to search for.
+    :param analysis_cache: A cache of paragraph results, see analyze_chunks.
+    :return: A tuple containing the edited text and its sorted results.
+
+    Results before the affected paragraphs are kept as they are and results after them are shifted by the change in
+    length. Inside the affected paragraphs, a word found again at the same place keeps the decision taken on it.
+    """
+    new_text = text[:edit_start] + replacement + text[edit_end:]
+    delta = len(replacement) - (edit_end - edit_start)
+
+    # Affected paragraphs, from the start of the first one to the newline ending the last one
+    region_start = text.rfind('\n', 0, edit_start) + 1
+    region_end = text.find('\n', edit_end) + 1 or len(text)
+
+    positions = [result[1] for result in results]
+    first = bisect_left(positions, region_start)
+    last = bisect_left(positions, region_end)
+
+    # Decisions taken on the words of the affected paragraphs that the edit did not touch, by their new position
+    decisions = {}
+    for word, position, word_id, *decision in results[first:last]:
+        if position + len(word) <= edit_start:
+            decisions[(word, position, word_id)] = decision
+        elif position >= edit_end:
+            decisions[(word, position + delta, word_id)] = decision
+
+    chunk = (region_start, new_text[region_start:region_end + delta])
+    new_results = []
+    for _, _, chunk_results in analyze_chunks([chunk] if chunk[1] else [], nlp, lexicon_index, n_process=1,
+                                              analysis_cache=analysis_cache):
+        for word, position, word_id, *decision in chunk_results:
+            decision = decisions.get((word, position, word_id), decision)
+            new_results.append((word, position, word_id, *decision))
+
+    shifted = [(word, position + delta, word_id, *decision) for word, position, word_id, *decision in results[last:]]
+    return new_text, results[:first] + new_results + shifted
+
+
+def reanalyze_after_lexicon_change(text, results, diff: LexiconDiff, lexicon: CompiledLexicon, nlp,
+                                   analysis_cache: AnalysisCache = None):
+    """
+    Updates the results of an analysis after the lexicon changed, re-analyzing only the paragraphs where the changed
+    words were found before or may be found now, instead of the whole text.
+
+    :param text: The text the results were computed on.
+    :param results: The sorted result tuples of the previous analysis of text.
+    :param diff: The changes of the lexicon, as returned by CompiledLexicon.update.
+    :param lexicon: The lexicon, already updated.
+    :param nlp: An initialized spaCy language model for natural language processing.
+    :param analysis_cache: A cache of paragraph results, see analyze_chunks; its namespace must match the new lexicon.
+    :return: The sorted results of the text with the new lexicon.
+
+    Results outside the re-analyzed paragraphs are kept. A word found again at the same place keeps the decision taken
+    on it, unless the options of its entry changed, in which case it is unresolved wherever it is.
+    """
+    if not diff.matching and not diff.options:
+        return list(results)
+
+    # Paragraphs where a changed word may appear now, and paragraphs where one was found
+    inflections = read_inflection_rules(nlp)
+    prefixes = [candidate_prefixes(word, inflections) for word in map(lexicon.find_by_id, diff.matching)
+                if word is not None]
+    if None in prefixes:
+        # The forms of a changed noun or verb cannot be listed, check the whole text again
+        regions = [(start, start + len(chunk)) for start, chunk in split_text_into_chunks(text)]
+    else:
+        regions = _find_paragraphs_matching(text, compile_prefix_pattern(prefix for word_prefixes in prefixes
+                                                                         for prefix in word_prefixes))
+    for word, position, word_id, *_ in results:
+        if word_id in diff.matching:
+            regions.append((text.rfind('\n', 0, position) + 1, text.find('\n', position) + 1 or len(text)))
+    regions.sort()
+    merged = []
+    for start, end in regions:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+
+    unresolved = (False, -1, -1)
+    decisions = {(word, position, word_id): decision for word, position, word_id, *decision in results
+                 if word_id not in diff.options}
+    new_results = []
+    region_index = 0
+    chunks = [(start, text[start:end]) for start, end in merged]
+    with span("lexicon_recheck", paragraphs=len(chunks), characters=sum(len(chunk) for _, chunk in chunks)):
+        analyzed = analyze_chunks(chunks, nlp, lexicon.index, n_process=1, analysis_cache=analysis_cache)
+        for word, position, word_id, *decision in results:
+            # Add the results of the regions before this one, and skip the old results inside them
+            while region_index < len(merged) and merged[region_index][1] <= position:
+                for chunk_result in next(analyzed)[2]:
+                    key = chunk_result[:3]
+                    new_results.append((*key, *decisions.get(key, unresolved)))
+                region_index += 1
+            if region_index < len(merged) and merged[region_index][0] <= position:
+                continue
+            new_results.append((word, position, word_id, *(decision if word_id not in diff.options else unresolved)))
+        for _, _, chunk_results in analyzed:
+            for chunk_result in chunk_results:
+                key = chunk_result[:3]
+                new_results.append((*key, *decisions.get(key, unresolved)))
+    return new_results
@@ -1,3 +1,10 @@
+import codecs
+import os
+
+from docx_io import read_docx
+from settings import ANALYSIS_CHUNK_SIZE
+from text_analyzer import split_text_into_chunks
+
 """
 text_io_operations.py
 
@@ -5,8 +12,186 @@ This module manages text input and output operations, focusing on reading from a
 It abstracts away the complexity of file I/O, enabling the application to handle text data seamlessly
 without getting entangled in the specifics of the filesystem. Designed to support reusability and ease
 of management, it plays a critical role in applications where efficient text data manipulation is crucial.
+Large text files are read in blocks, with their encoding detected from a sample of the first bytes, and can be
+handed to the analyzer as a stream of chunks without ever holding the whole file in memory. A file whose first bytes
+are valid UTF-8 but whose rest is not is read again with the Windows code page, see iter_text_file.
 """
 
+ENCODING_SAMPLE_SIZE = 64 * 1024  # Bytes read to detect the encoding of a text file
+READ_BLOCK_CHARACTERS = 1024 * 1024  # Characters decoded at a time
+MAX_BYTES_PER_CHARACTER = 4  # No supported encoding takes more bytes for a single character
+
+# Byte order marks and the codec that decodes the text after them, longer marks first since the UTF-32 LE mark starts
+# with the UTF-16 LE one
+BYTE_ORDER_MARKS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Bytes cp1252 leaves undefined, text holding them is read as latin-1 instead
+CP1252_UNDEFINED = b'\x81\x8d\x8f\x90\x9d'
+
+
+class TextTooLongError(ValueError):
+    """
+    Raised when a text file holds more characters than allowed.
+    """
+
+    def __init__(self, file_path: str, max_characters: int):
+        super().__init__(f"The text of {file_path} exceeds the maximum limit of {max_characters} characters.")
+        self.file_path = file_path
+        self.max_characters = max_characters
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Guesses the encoding of a text from its first bytes: a byte order mark if there is one, then UTF-16 without mark if
+    every other byte is zero, then UTF-8 if the sample is valid UTF-8, and the Windows code page otherwise.
+
+    :param sample: The first bytes of the text.
+    :return: The name of a codec able to decode the text.
+    """
+    for mark, encoding in BYTE_ORDER_MARKS:
+        if sample.startswith(mark):
+            return encoding
+
+    if sample.count(0) > len(sample) // 4:
+        # Mostly ASCII text in UTF-16 has a zero in every other byte
+        even_zeros = sample[0::2].count(0)
+        odd_zeros = sample[1::2].count(0)
+        return 'utf-16-be' if even_zeros > odd_zeros else 'utf-16-le'
+
+    try:
+        # The sample may end in the middle of a character, which is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    return _single_byte_encoding(sample)
+
+
+def _single_byte_encoding(data: bytes) -> str:
+    # The Windows code page, or latin-1 if the text holds bytes the code page leaves undefined
+    if any(byte in CP1252_UNDEFINED for byte in data):
+        return 'latin-1'
+    return 'cp1252'
+
+
+def detect_file_encoding(file_path: str) -> str:
+    with open(file_path, 'rb') as file:
+        return detect_encoding(file.read(ENCODING_SAMPLE_SIZE))
+
+
+def _detect_single_byte_file_encoding(file_path: str) -> str:
+    # Same as _single_byte_encoding for the whole file, read in blocks
+    with open(file_path, 'rb') as file:
+        while True:
+            data = file.read(READ_BLOCK_CHARACTERS)
+            if not data:
+                return 'cp1252'
+            if _single_byte_encoding(data) == 'latin-1':
+                return 'latin-1'
+
+
+def iter_text_file(file_path: str, encoding: str = None, max_characters: int = None,
+                   block_characters: int = READ_BLOCK_CHARACTERS):
+    """
+    Reads a text file in blocks, decoding it with the given or the detected encoding and converting line endings to
+    newlines.
+
+    The encoding is detected from the first bytes only. If the file was detected as UTF-8 and turns out not to be
+    valid UTF-8 further on, it is read again from the start with the Windows code page, or latin-1, and the
+    characters already returned are skipped. They were plain ASCII, the same in either encoding. A file that already
+    returned other UTF-8 characters cannot be read again that way. It stays UTF-8, and its invalid bytes are
+    replaced with U+FFFD.
+
+    :param file_path: The path to the text file to be read.
+    :param encoding: The encoding of the file, detected from its first bytes when omitted.
+    :param max_characters: The maximum number of characters allowed, checked before reading from the size of the file
+                           and then while reading, so longer files are rejected without being decoded entirely.
+    :param block_characters: The number of characters of each block.
+    :return: An iterator of the blocks of text.
+    :raises TextTooLongError: If the file holds more than max_characters characters.
+    :raises UnicodeDecodeError: If the file cannot be decoded with the encoding given.
+    """
+    if max_characters is not None and os.path.getsize(file_path) // MAX_BYTES_PER_CHARACTER > max_characters:
+        raise TextTooLongError(file_path, max_characters)
+    detected = encoding is None
+    if detected:
+        encoding = detect_file_encoding(file_path)
+
+    characters = 0  # Characters returned so far
+    ascii_only = True  # Whether they are all plain ASCII
+    errors = 'strict'
+    while True:
+        try:
+            with open(file_path, 'r', encoding=encoding, errors=errors) as file:
+                skipped = 0
+                while skipped < characters:  # Returned before the file was read again
+                    skipped_block = file.read(min(characters - skipped, block_characters))
+                    if not skipped_block:
+                        break
+                    skipped += len(skipped_block)
+                while True:
+                    block = file.read(block_characters)
+                    if not block:
+                        return
+                    characters += len(block)
+                    if max_characters is not None and characters > max_characters:
+                        raise TextTooLongError(file_path, max_characters)
+                    ascii_only = ascii_only and block.isascii()
+                    yield block
+        except UnicodeDecodeError:
+            if not detected or encoding != 'utf-8':
+                raise
+            if ascii_only:
+                encoding = _detect_single_byte_file_encoding(file_path)
+            else:
+                errors = 'replace'
+
+
+def iter_text_file_chunks(file_path: str, max_chunk_size: int = ANALYSIS_CHUNK_SIZE, encoding: str = None,
+                          max_characters: int = None):
+    """
+    Reads a text file as a stream of (offset, chunk) tuples cut at paragraph boundaries, the same chunks
+    text_analyzer.split_text_into_chunks returns for the whole text, ready for text_analyzer.analyze_chunks.
+    Only about one chunk of text is held in memory at a time.
+
+    :param file_path: The path to the text file to be read.
+    :param max_chunk_size: The maximum number of characters of a chunk.
+    :param encoding: The encoding of the file, detected from its first bytes when omitted.
+    :param max_characters: The maximum number of characters allowed, see iter_text_file.
+    :return: An iterator of (offset, chunk) tuples.
+    """
+    offset = 0
+    pending = ''
+    for block in iter_text_file(file_path, encoding, max_characters, max(max_chunk_size, READ_BLOCK_CHARACTERS)):
+        pending += block
+        chunks = split_text_into_chunks(pending, max_chunk_size)
+        # The last chunk may be cut short by the end of the block, it is split again with the text that follows
+        for chunk_offset, chunk in chunks[:-1]:
+            yield offset + chunk_offset, chunk
+        last_offset, pending = chunks[-1]
+        offset += last_offset
+    if pending:
+        yield offset, pending
+
+
+def read_text_file(file_path: str, max_characters: int = None) -> str:
+    """
+    Reads a whole text file in blocks, detecting its encoding. Unlike read_text_from_file, errors are raised to the
+    caller.
+
+    :param file_path: The path to the text file to be read.
+    :param max_characters: The maximum number of characters allowed, see iter_text_file.
+    :return: The content of the file as a string.
+    """
+    return ''.join(iter_text_file(file_path, max_characters=max_characters))
+
 
 def read_text_from_file(file_path: str) -> str:
     """
@@ -26,6 +211,30 @@ def read_text_from_file(file_path: str) -> str:
         return ""
 
 
+def read_text_from_docx(file_path: str) -> str:
+    """
+    Extracts the text of a .docx file, one line per paragraph. See docx_io.read_docx to also get the position of the
+    runs, needed to write replacements back into the file.
+
+    :param file_path: The path to the .docx file to be read.
+    :return: The text of the document.
+    """
+    return read_docx(file_path).text
+
+
+def read_document(file_path: str) -> str:
+    """
+    Reads the text of a document in any of the supported formats, choosing the reader from the file extension.
+    Unlike read_text_from_file, errors are raised to the caller.
+
+    :param file_path: The path to the document to be read.
+    :return: The text of the document.
+    """
+    if file_path.lower().endswith('.docx'):
+        return read_text_from_docx(file_path)
+    return read_text_file(file_path)
+
+
 def save_text_to_file(file_path: str, text: str) -> None:
     """
     Saves the given text into a text file specified by file_path.
@@ -0,0 +1,196 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Pattern, Tuple
+
+"""
+text_matcher.py
+
+This module provides a multi-pattern matcher based on the Aho-Corasick automaton. The automaton is compiled once
+from a list of patterns and then finds every occurrence of every pattern in a single pass over the text, so the cost
+of a scan no longer grows with the number of patterns. Matching is case-insensitive and honours word boundaries with
+the same rules as the regular expression r'\b' + re.escape(pattern) + r'\b' compiled with re.IGNORECASE.
+It also compiles lists of word prefixes into a single regular expression shaped like a trie, which the re module scans
+much faster than an alternation of the prefixes.
+"""
+
+
+def _fold(char: str) -> str:
+    # Lowercase a single character without changing the length of the text, so indexes keep matching the source.
+    folded = char.lower()
+    return folded if len(folded) == 1 else char
+
+
+def _is_word_char(char: str) -> bool:
+    # Mirrors the definition of \w used by the re module for str patterns.
+    return char.isalnum() or char == '_'
+
+
+class WordBoundaryMatcher:
+    """
+    This class represents a compiled Aho-Corasick automaton for a list of patterns.
+    Each match is reported with the index of the pattern in the list used to build the matcher. Patterns can be added
+    and removed afterwards without building the trie again; a removed pattern keeps its index, as an empty string.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]  # Transitions of each state of the trie
+        self._fail: List[int] = [0]  # Failure link of each state
+        self._own_output: List[List[int]] = [[]]  # Indexes of the patterns spelled by the path to each state
+        self._output: List[List[int]] = [[]]  # Indexes of the patterns ending in each state, through failure links too
+
+        for pattern_index, pattern in enumerate(self.patterns):
+            if pattern:
+                self._add_pattern(pattern_index, pattern)
+        self._build_failure_links()
+
+    def __repr__(self):
+        return f"WordBoundaryMatcher(patterns={len(self.patterns)}, states={len(self._goto)})"
+
+    def _add_pattern(self, pattern_index: int, pattern: str):
+        state = 0
+        for char in pattern:
+            char = _fold(char)
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._own_output.append([])
+                self._output.append([])
+            state = next_state
+        self._own_output[state].append(pattern_index)
+
+    def _find_state(self, pattern: str) -> int:
+        state = 0
+        for char in pattern:
+            state = self._goto[state][_fold(char)]
+        return state
+
+    def add_patterns(self, patterns: List[str]) -> List[int]:
+        """
+        Adds patterns to the matcher, after the existing ones.
+
+        :param patterns: The patterns to add.
+        :return: The indexes the patterns are reported with.
+        """
+        indexes = []
+        for pattern in patterns:
+            pattern_index = len(self.patterns)
+            self.patterns.append(pattern)
+            if pattern:
+                self._add_pattern(pattern_index, pattern)
+            indexes.append(pattern_index)
+        self._build_failure_links()
+        return indexes
+
+    def remove_patterns(self, indexes: List[int]):
+        # The states of a removed pattern stay in the trie, they simply no longer report it
+        for pattern_index in indexes:
+            pattern = self.patterns[pattern_index]
+            if pattern:
+                self._own_output[self._find_state(pattern)].remove(pattern_index)
+                self.patterns[pattern_index] = ''
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        # Breadth-first traversal of the trie, so the failure link of a parent is always known before its children.
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+            self._output[state] = self._own_output[state]
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Patterns that end in the failure state also end here
+                self._output[next_state] = self._own_output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Scans the text once and yields every occurrence of every pattern that is delimited by word boundaries.
+
+        :param text: The text to scan.
+        :return: An iterator of (start, end, pattern_index) tuples, ordered by end position.
+
+        Occurrences of the same pattern never overlap, matching the behaviour of re.finditer, while occurrences of
+        different patterns may overlap; it is up to the caller to decide which one wins.
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        patterns = self.patterns
+        last_end = {}  # End of the last accepted match of each pattern
+        length = len(text)
+        state = 0
+
+        for position, char in enumerate(text):
+            char = _fold(char)
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+
+            end = position + 1
+            for pattern_index in output[state]:
+                start = end - len(patterns[pattern_index])
+                if start < last_end.get(pattern_index, 0):
+                    continue
+                if not self._is_boundary(text, start, length) or not self._is_boundary(text, end, length):
+                    continue
+                last_end[pattern_index] = end
+                yield start, end, pattern_index
+
+    @staticmethod
+    def _is_boundary(text: str, index: int, length: int) -> bool:
+        before = index > 0 and _is_word_char(text[index - 1])
+        after = index < length and _is_word_char(text[index])
+        return before != after
+
+
+def _trie_to_regex(node: dict) -> str:
+    # Prefixes never extend one another, so every prefix ends on a leaf and no branch is optional
+    branches = [re.escape(char) + _trie_to_regex(child) for char, child in sorted(node.items())]
+    if len(branches) <= 1:
+        return ''.join(branches)
+    return '(?:' + '|'.join(branches) + ')'
+
+
+def compile_prefix_pattern(prefixes: Iterable[str]) -> Pattern:
+    """
+    Compiles a case-insensitive pattern matching the places of a text where a word starts with one of the prefixes.
+    A prefix starting with another character than a letter, digit or underscore matches wherever it appears.
+
+    :param prefixes: The prefixes, in any case.
+    :return: The compiled pattern; it never matches when there is no non-empty prefix.
+    """
+    prefixes = sorted({prefix.lower() for prefix in prefixes if prefix})
+    if not prefixes:
+        return re.compile(r'(?!)')
+
+    # A prefix that starts with another one adds no match
+    minimal = []
+    for prefix in prefixes:  # Sorted, so a prefix comes right before the prefixes that extend it
+        if not minimal or not prefix.startswith(minimal[-1]):
+            minimal.append(prefix)
+
+    trie = {}
+    for prefix in minimal:
+        node = trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+    # A word boundary only comes before the prefixes starting with a word character, not before one such as "'s"
+    word_trie = {char: child for char, child in trie.items() if _is_word_char(char)}
+    other_trie = {char: child for char, child in trie.items() if not _is_word_char(char)}
+    alternatives = [r'\b' + _trie_to_regex(word_trie)] if word_trie else []
+    if other_trie:
+        alternatives.append(_trie_to_regex(other_trie))
+    return re.compile('|'.join(alternatives), re.IGNORECASE)
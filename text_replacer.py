@@ -1,7 +1,13 @@
+from bisect import bisect_right
+from typing import List, Tuple
+
+from data_model import find_ambiguous_word_by_id
+
 """
 text_replacer.py
 
 This module is responsible for replacing ambiguous words in a text with their selected alternatives. It not only performs the replacement but also calculates the offset resulting from the change in word length. This functionality is crucial for maintaining the correct positions of words in the text after a replacement, especially when processing multiple replacements in a single document. The module ensures that the integrity of the text structure is preserved while accommodating updates to ambiguous word instances.
+Many replacements can also be applied in bulk, building the updated text in a single pass and returning an offset map between the original and the updated text.
 """
 
 def replace_word_and_calculate_offset(text: str, current_word_position: int, current_word: str, new_word: str) -> (str, int):
@@ -23,3 +29,123 @@ def replace_word_and_calculate_offset(text: str, current_word_position: int, cur
     offset = len(new_word) - len(current_word)
 
     return updated_text, offset
+
+
+class OffsetMap:
+    """
+    This class maps positions in an original text to positions in the text produced by replace_words.
+    Each query is a binary search over the replaced ranges.
+    """
+
+    def __init__(self):
+        self.starts = []  # Start of each replaced range in the original text, sorted
+        self.ends = []  # End of each replaced range in the original text
+        self.new_starts = []  # Start of each replacement in the updated text
+        self.new_lengths = []  # Length of each replacement
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"OffsetMap(edits={len(self.starts)})"
+
+    def add(self, start: int, end: int, new_start: int, new_length: int):
+        # Ranges must be added in increasing order
+        self.starts.append(start)
+        self.ends.append(end)
+        self.new_starts.append(new_start)
+        self.new_lengths.append(new_length)
+
+    def map_position(self, position: int) -> int:
+        """
+        Returns the position in the updated text corresponding to a position in the original text.
+        A position inside a replaced word maps to the same distance into its replacement, clamped to its end.
+
+        :param position: A position in the original text.
+        :return: The corresponding position in the updated text.
+        """
+        index = bisect_right(self.starts, position) - 1
+        if index < 0:
+            return position
+        if position < self.ends[index]:
+            return self.new_starts[index] + min(position - self.starts[index], self.new_lengths[index])
+        # After the replaced range, shift by the total change in length up to and including it
+        return position - self.ends[index] + self.new_starts[index] + self.new_lengths[index]
+
+
+def replace_words(text: str, edits: List[Tuple[int, str, str]]) -> Tuple[str, OffsetMap]:
+    """
+    Applies many word replacements to a text at once, building the updated text in a single pass.
+
+    :param text: The original text.
+    :param edits: A list of (position, current_word, new_word) tuples, with positions in the original text.
+    :return: A tuple containing the updated text and the OffsetMap from original to updated positions.
+
+    As with replace_word_and_calculate_offset, every current word must match the text at its position; the edits must
+    not overlap each other.
+    """
+    parts = []
+    offset_map = OffsetMap()
+    previous_end = 0
+    new_position = 0
+
+    for position, current_word, new_word in sorted(edits, key=lambda edit: edit[0]):
+        end_position = position + len(current_word)
+        assert position >= previous_end, "The replaced words overlap each other."
+        assert text[position:end_position] == current_word, "The current word does not match the specified position in the text."
+
+        parts.append(text[previous_end:position])
+        new_position += position - previous_end
+        parts.append(new_word)
+        offset_map.add(position, end_position, new_position, len(new_word))
+        new_position += len(new_word)
+        previous_end = end_position
+
+    parts.append(text[previous_end:])
+    return ''.join(parts), offset_map
+
+
+def adapt_case(source: str, target: str) -> str:
+    # Give the target word the case of the source word
+    # Uppercase
+    if source.isupper():
+        return target.upper()
+    # Lowercase
+    elif source.islower():
+        return target.lower()
+    # Capitalized
+    elif source.istitle():
+        return target.capitalize()
+    # Handle more specific mixed case scenarios here if needed
+    else:
+        return target
+
+
+def build_replacement_edits(ambiguous_words_results, ambiguous_words) -> List[Tuple[int, str, str]]:
+    """
+    Turns the decisions taken on the results of an analysis into the edits to apply to the source text.
+
+    :param ambiguous_words_results: The result tuples, where resolved ones hold the chosen option and sub-option.
+    :param ambiguous_words: The lexicon the results refer to.
+    :return: A list of (position, current_word, new_word) tuples, one per resolved result.
+    """
+    edits = []
+    for result in ambiguous_words_results:
+        if result[3] != False:
+            ambiguousWord = find_ambiguous_word_by_id(ambiguous_words, result[2])
+            if result[4] > 0:
+                ambiguities = ambiguousWord.find_related_ambiguities(ambiguous_words)
+                currentAmbiguity = ambiguities[result[4]-1]
+
+                if not currentAmbiguity.Variants or len(currentAmbiguity.Variants) == 0:
+                    correctWord = currentAmbiguity.Word
+                else:
+                    correctWord = currentAmbiguity.Variants[result[5]]
+            else:
+                if not ambiguousWord.Variants or len(ambiguousWord.Variants) == 0:
+                    correctWord = ambiguousWord.Word
+                else:
+                    correctWord = ambiguousWord.Variants[result[5]]
+
+            edits.append((result[1], result[0], adapt_case(result[0], correctWord)))
+    return edits